@@ -0,0 +1,566 @@
+"""
+Benchmarks for The Unsung Heroines data pipeline.
+Times DataMerger.merge_datasets against synthetic datasets of growing size.
+
+Usage:
+    python benchmark.py                 # default sizes
+    python benchmark.py 1000 5000 20000 # custom sizes
+    python benchmark.py --similarity    # similarity backends vs. the reference
+    python benchmark.py --html [DIR]    # NWHM page parsing over saved .html pages
+    python benchmark.py --suite [--baseline FILE]  # hot paths at 1k/10k, JSON results
+"""
+
+import argparse
+import contextlib
+import gc
+import glob
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from data_merger import DataMerger, write_canonical_json
+from nobel_scraper import NobelScraper
+from nwhm_scraper import FAST_PARSER, parse_biography_fast, parse_biography_soup
+from similarity import get_backend
+from wikidata_scraper import WikidataScraper
+
+HTML_FIXTURES = os.path.join('fixtures', 'nwhm')
+
+# 100k is opt-in: python benchmark.py --suite 1000 10000 100000
+SUITE_SIZES = [1000, 10000]
+# Larger sizes are timed only; the traced run would double their cost
+MEMORY_MAX_SIZE = 10000
+SUITE_RESULTS = 'benchmark_results.json'
+# Allowed growth over the baseline before --suite fails; timings that move by
+# less than NOISE_FLOOR_SECS are never counted as regressions
+REGRESSION_BUDGET = {'secs': 0.25, 'peak_mb': 0.10}
+NOISE_FLOOR_SECS = 0.05
+
+FIRST_NAMES = [
+    'Ada', 'Grace', 'Marie', 'Rosalind', 'Katherine', 'Dorothy', 'Mary', 'Emmy',
+    'Lise', 'Barbara', 'Rachel', 'Hedy', 'Chien-Shiung', 'Sophie', 'Henrietta',
+    'Annie', 'Margaret', 'Elizabeth', 'Florence', 'Harriet', 'Sojourner', 'Ida',
+    'Frida', 'Zaha', 'Amelia', 'Valentina', 'Wangari', 'Malala', 'Nellie', 'Jane',
+]
+
+SURNAMES = [
+    'Lovelace', 'Hopper', 'Curie', 'Franklin', 'Johnson', 'Hodgkin', 'Anning',
+    'Noether', 'Meitner', 'McClintock', 'Carson', 'Lamarr', 'Wu', 'Germain',
+    'Leavitt', 'Cannon', 'Hamilton', 'Blackwell', 'Nightingale', 'Tubman',
+    'Truth', 'Wells', 'Kahlo', 'Hadid', 'Earhart', 'Tereshkova', 'Maathai',
+    'Yousafzai', 'Bly', 'Goodall', 'Müller', 'Łukasiewicz', 'Ortega', 'Okafor',
+]
+
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'bra', 'dor', 'fen', 'gil', 'hart', 'wyn']
+
+
+def surname_syllables(idx):
+    """Spell idx with syllables so every synthetic surname is distinct."""
+    suffix = ''
+    while idx:
+        idx, digit = divmod(idx, len(SYLLABLES))
+        suffix += SYLLABLES[digit]
+    return suffix
+
+
+def synthetic_people(count, seed=42):
+    """Return ``count`` distinct synthetic people with QIDs and birth dates."""
+    rng = random.Random(seed)
+    people = []
+    for idx in range(count):
+        first = rng.choice(FIRST_NAMES)
+        # The syllable prefix keeps names unique at any size while still
+        # sharing first names and surname stems the way real data does.
+        surname = (surname_syllables(idx) + rng.choice(SURNAMES).lower()).capitalize()
+        people.append({
+            'name': f"{first} {surname}",
+            'birth_date': f"{rng.randint(1700, 1990)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'wikidata_id': f"Q{1000 + idx}",
+        })
+    return people
+
+
+def name_variant(name, rng):
+    """Return a lightly corrupted spelling of a name (typo, case, accent)."""
+    choice = rng.random()
+    if choice < 0.3 and len(name) > 6:
+        pos = rng.randint(1, len(name) - 2)
+        return name[:pos] + name[pos + 1] + name[pos] + name[pos + 2:]
+    if choice < 0.6:
+        return name.upper()
+    return name.replace('e', 'é', 1)
+
+
+def synthetic_datasets(size, seed=42):
+    """Return (wikidata_like, wikipedia_like) datasets describing ``size`` people.
+
+    The second dataset overlaps the first: half its entries share a QID, a
+    quarter are name variants without a QID, the rest are new people.
+    """
+    rng = random.Random(seed)
+    people = synthetic_people(size + size // 4, seed)
+    known, extra = people[:size], people[size:]
+    wikidata_like = [
+        dict(p, sources=[{'name': 'Wikidata', 'url': f"https://www.wikidata.org/wiki/{p['wikidata_id']}",
+                          'accessed': '2025-11-29'}])
+        for p in known
+    ]
+    wikipedia_like = []
+    for p in known[: size // 2]:
+        wikipedia_like.append({'name': p['name'], 'wikidata_id': p['wikidata_id'],
+                               'biography': f"{p['name']} was a pioneer.",
+                               'sources': [{'name': 'Wikipedia', 'url': 'https://en.wikipedia.org/',
+                                            'accessed': '2025-11-29'}]})
+    for p in known[size // 2: size // 2 + size // 4]:
+        wikipedia_like.append({'name': name_variant(p['name'], rng), 'birth_date': p['birth_date'],
+                               'sources': []})
+    for p in extra:
+        wikipedia_like.append({'name': p['name'], 'wikidata_id': p['wikidata_id'], 'sources': []})
+    return wikidata_like, wikipedia_like
+
+
+def time_merge(datasets, use_index, workers=None):
+    """Merge datasets quietly and return (seconds, merged_entries)."""
+    merger = DataMerger(use_index=use_index, workers=workers)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        merged = merger.merge_datasets(*datasets)
+    return time.perf_counter() - start, merged
+
+
+def decision_agreement(merged_a, merged_b):
+    """Return the fraction of merged entries that are identical in both outputs."""
+    rows_a = {json.dumps(entry, sort_keys=True) for entry in merged_a}
+    rows_b = {json.dumps(entry, sort_keys=True) for entry in merged_b}
+    return len(rows_a & rows_b) / max(len(rows_a | rows_b), 1)
+
+
+def bench_merge(sizes, linear_max=1000, workers=None):
+    """Time indexed vs. linear-scan merging; returns one result dict per size.
+    
+    With ``workers`` the indexed merge also runs with a process pool, and
+    its output is checked to be identical to the serial merge.
+    """
+    results = []
+    print(f"{'size':>8} {'indexed (s)':>12} {'linear (s)':>12} {'speed-up':>9} {'agreement':>10}")
+    for size in sizes:
+        datasets = synthetic_datasets(size)
+        indexed_secs, indexed = time_merge(datasets, use_index=True)
+        row = {'size': size, 'indexed_secs': round(indexed_secs, 4), 'merged': len(indexed)}
+        if workers:
+            parallel_secs, parallel = time_merge(datasets, use_index=True, workers=workers)
+            row['parallel_secs'] = round(parallel_secs, 4)
+            row['parallel_identical'] = json.dumps(parallel) == json.dumps(indexed)
+            print(f"{size:>8} {'':>12} {workers} workers: {parallel_secs:.3f}s "
+                  f"({'identical' if row['parallel_identical'] else 'DIFFERENT'} output)")
+        if size <= linear_max:
+            linear_secs, linear = time_merge(datasets, use_index=False)
+            row['linear_secs'] = round(linear_secs, 4)
+            row['agreement'] = round(decision_agreement(indexed, linear), 4)
+            print(f"{size:>8} {indexed_secs:>12.3f} {linear_secs:>12.3f} "
+                  f"{linear_secs / max(indexed_secs, 1e-9):>8.1f}x {row['agreement']:>10.2%}")
+        else:
+            print(f"{size:>8} {indexed_secs:>12.3f} {'-':>12} {'-':>9} {'-':>10}")
+        results.append(row)
+    return results
+
+
+def candidate_queries(size):
+    """Return [(query name, [candidate names])] as the merger's index would pose them."""
+    first, second = synthetic_datasets(size)
+    merger = DataMerger()
+    with contextlib.redirect_stdout(io.StringIO()):
+        merger.merge_datasets(first)
+    queries = []
+    for woman in second:
+        keys = merger._candidate_keys(woman)
+        names = [merger.merged_data[key].get('name', '').lower() for key in keys]
+        if names:
+            queries.append((woman.get('name', '').lower(), names))
+    return queries
+
+
+def time_scores(backend, queries):
+    """Score every query against its candidates; returns (seconds, flat scores)."""
+    start = time.perf_counter()
+    scores = [score for query, names in queries for score in backend.scores(query, names)]
+    return time.perf_counter() - start, scores
+
+
+def threshold_agreement(reference, scores, ref_threshold, threshold):
+    """Fraction of pairs where both score lists fall on the same side of their threshold."""
+    same = sum((r > ref_threshold) == (s > threshold) for r, s in zip(reference, scores))
+    return same / max(len(reference), 1)
+
+
+def bench_similarity(size=5000, backends=('ngram',)):
+    """Compare similarity backends with the SequenceMatcher reference.
+    
+    Reports scoring time, agreement of match decisions at the merger's
+    thresholds, the best-agreeing threshold for each backend, and how many
+    merged entries come out identical to a reference merge.
+    """
+    queries = candidate_queries(size)
+    pairs = sum(len(names) for _, names in queries)
+    reference = get_backend('sequence')
+    ref_secs, ref_scores = time_scores(reference, queries)
+    print(f"{pairs} candidate pairs from {len(queries)} queries (size {size})")
+    print(f"  {reference.name:>10}: {ref_secs:.3f}s")
+
+    datasets = synthetic_datasets(size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ref_merged = DataMerger().merge_datasets(*datasets)
+
+    results = []
+    for name in backends:
+        backend = get_backend(name)
+        secs, scores = time_scores(backend, queries)
+        row = {'backend': name, 'pairs': pairs, 'secs': round(secs, 4), 'reference_secs': round(ref_secs, 4)}
+        print(f"  {name:>10}: {secs:.3f}s ({ref_secs / max(secs, 1e-9):.1f}x)")
+        for level in ('match', 'strict'):
+            ref_threshold = reference.thresholds[level]
+            agreement = threshold_agreement(ref_scores, scores, ref_threshold, backend.thresholds[level])
+            best = max((t / 100 for t in range(50, 100)),
+                       key=lambda t: threshold_agreement(ref_scores, scores, ref_threshold, t))
+            best_agreement = threshold_agreement(ref_scores, scores, ref_threshold, best)
+            row[level] = {'threshold': backend.thresholds[level], 'agreement': round(agreement, 4),
+                          'best_threshold': best, 'best_agreement': round(best_agreement, 4)}
+            print(f"{'':>14}{level} > {ref_threshold}: {agreement:.2%} agree at {backend.thresholds[level]}, "
+                  f"best {best_agreement:.2%} at {best}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            merged = DataMerger(similarity=name).merge_datasets(*datasets)
+        row['merge_agreement'] = round(decision_agreement(ref_merged, merged), 4)
+        print(f"{'':>14}merged entries identical to reference: {row['merge_agreement']:.2%} "
+              f"({len(merged)} vs {len(ref_merged)} entries)")
+        results.append(row)
+    return results
+
+
+def time_parse(parse, pages, repeat):
+    """Parse every page ``repeat`` times; returns (seconds per page, last records)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        records = [parse(html, url) for url, html in pages]
+    return (time.perf_counter() - start) / (repeat * len(pages)), records
+
+
+def bench_html(directory=HTML_FIXTURES, repeat=50):
+    """Compare the full-soup NWHM parser with the streaming one over saved pages.
+    
+    Checks that both produce the same records, so only speed differs.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, '*.html')))
+    if not paths:
+        print(f"No .html pages in {directory}")
+        return {}
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages.append((path, f.read()))
+    size = sum(len(html) for _, html in pages)
+    print(f"{len(pages)} pages ({size / 1024:.0f} KiB) from {directory}, {repeat} rounds")
+
+    soup_secs, soup_records = time_parse(parse_biography_soup, pages, repeat)
+    fast_secs, fast_records = time_parse(parse_biography_fast, pages, repeat)
+    result = {
+        'pages': len(pages),
+        'soup_ms': round(soup_secs * 1000, 3),
+        'fast_ms': round(fast_secs * 1000, 3),
+        'fast_parser': FAST_PARSER,
+        'identical': soup_records == fast_records,
+    }
+    print(f"  {'soup (html.parser)':>22}: {result['soup_ms']:.3f} ms/page")
+    print(f"  {f'streaming ({FAST_PARSER})':>22}: {result['fast_ms']:.3f} ms/page "
+          f"({soup_secs / max(fast_secs, 1e-9):.1f}x)")
+    print(f"  records {'identical' if result['identical'] else 'DIFFERENT'}")
+    return result
+
+
+OCCUPATIONS = [
+    'physicist', 'chemist', 'mathematician', 'astronomer', 'physician', 'nurse', 'computer scientist',
+    'engineer', 'biologist', 'geneticist', 'suffragist', 'abolitionist', 'writer', 'poet', 'painter',
+    'composer', 'aviator', 'explorer', 'politician', 'journalist',
+]
+
+BIO_WORDS = (
+    'research discovery laboratory university prize society journal theory experiment equal rights '
+    'movement education women science medicine hospital field expedition campaign reform lecture '
+    'published studied founded elected awarded worked taught described observed measured led '
+    'first early later important pioneering influential international national public her career'
+).split()
+
+NOBEL_CATEGORIES = ['Physics', 'Chemistry', 'Physiology or Medicine', 'Literature', 'Peace', 'Economic Sciences']
+
+
+def synthetic_biography(name, rng, min_words=150, max_words=900):
+    """Return a long pseudo-biography (roughly 1-6 kB) that opens with the name."""
+    words = [name, 'was', 'a', rng.choice(OCCUPATIONS) + '.']
+    target = rng.randint(min_words, max_words)
+    while len(words) < target:
+        sentence = rng.choices(BIO_WORDS, k=rng.randint(8, 20))
+        words.extend([sentence[0].capitalize()] + sentence[1:-1] + [sentence[-1] + '.'])
+    return ' '.join(words)
+
+
+def realistic_variant(name, rng):
+    """Return another way sources write a name: initials, inverted order,
+    an added middle name, a title, or a typo/case/accent change."""
+    parts = name.split()
+    first, last = parts[0], parts[-1]
+    choice = rng.random()
+    if choice < 0.2:
+        return f"{first[0]}. {last}"
+    if choice < 0.35:
+        return f"{last}, {first}"
+    if choice < 0.5:
+        return f"{first} {rng.choice(FIRST_NAMES)} {last}"
+    if choice < 0.6:
+        return f"{rng.choice(['Dame', 'Dr.', 'Lady', 'Sister'])} {name}"
+    return name_variant(name, rng)
+
+
+def synthetic_sources(size, seed=42):
+    """Return raw inputs for ``size`` synthetic heroines, shaped like each API's output.
+    
+    - ``sparql``: a WDQS JSON result covering 80% of them, with a row per
+      occupation (so QIDs repeat, as in the real query)
+    - ``laureates``: Nobel API v2.1 laureates for 5%, with QIDs and
+      Wikipedia links; ``extracts`` maps those links to long extracts
+    - ``wikipedia``: records for 60%; two thirds share a QID, the rest are
+      name variants without one
+    Every person gets a long biography somewhere.
+    """
+    rng = random.Random(seed)
+    people = synthetic_people(size, seed)
+    for p in people:
+        p['biography'] = synthetic_biography(p['name'], rng)
+
+    bindings = []
+    for p in people[: size * 4 // 5]:
+        qid = p['wikidata_id']
+        row = {
+            'person': {'type': 'uri', 'value': f"http://www.wikidata.org/entity/{qid}"},
+            'personLabel': {'type': 'literal', 'value': p['name']},
+            'birthDate': {'type': 'literal', 'value': f"{p['birth_date']}T00:00:00Z"},
+            'description': {'type': 'literal', 'value': p['biography'][:rng.randint(40, 200)]},
+            'wikipediaUrl': {'type': 'uri', 'value': f"https://en.wikipedia.org/wiki/{p['name'].replace(' ', '_')}"},
+        }
+        if rng.random() < 0.6:
+            row['deathDate'] = {'type': 'literal', 'value': f"{int(p['birth_date'][:4]) + rng.randint(30, 95)}-01-01T00:00:00Z"}
+        if rng.random() < 0.7:
+            row['image'] = {'type': 'uri', 'value': f"http://commons.wikimedia.org/wiki/Special:FilePath/{qid}.jpg"}
+        for occupation in rng.sample(OCCUPATIONS, rng.randint(1, 3)):
+            bindings.append(dict(row, occupationLabel={'type': 'literal', 'value': occupation}))
+    sparql = {'head': {'vars': ['person', 'personLabel', 'birthDate', 'deathDate', 'description',
+                                'occupationLabel', 'image', 'wikipediaUrl']},
+              'results': {'bindings': bindings}}
+
+    laureates, extracts = [], {}
+    for idx, p in enumerate(rng.sample(people, max(size // 20, 1))):
+        given, family = p['name'].split(' ', 1)
+        wiki_url = f"https://en.wikipedia.org/wiki/{p['name'].replace(' ', '_')}"
+        extracts[wiki_url] = (p['biography'], f"https://upload.wikimedia.org/{p['wikidata_id']}.jpg")
+        year = str(rng.randint(1901, 2024))
+        category = rng.choice(NOBEL_CATEGORIES)
+        laureates.append({
+            'id': str(1000 + idx),
+            'knownName': {'en': p['name']},
+            'givenName': {'en': given},
+            'familyName': {'en': family},
+            'gender': 'female',
+            'birth': {'date': p['birth_date']},
+            'born': p['birth_date'],
+            'wikipedia': {'english': wiki_url},
+            'wikidata': {'id': p['wikidata_id']},
+            'nobelPrizes': [{
+                'awardYear': year,
+                'category': {'en': category},
+                'motivation': {'en': ' '.join(rng.choices(BIO_WORDS, k=15))},
+                'links': [{'href': f"https://www.nobelprize.org/prizes/{category.lower()}/{year}/summary/"}],
+            }],
+        })
+
+    wikipedia = []
+    for p in people[size // 5: size * 4 // 5]:
+        variant = rng.random() < 1 / 3
+        wikipedia.append({
+            'name': realistic_variant(p['name'], rng) if variant else p['name'],
+            'biography': p['biography'],
+            'image': None if rng.random() < 0.4 else f"https://upload.wikimedia.org/{p['wikidata_id']}.jpg",
+            'sources': [{'name': 'Wikipedia', 'url': f"https://en.wikipedia.org/wiki/{p['name'].replace(' ', '_')}",
+                         'accessed': '2025-11-29'}],
+            'wikidata_id': None if variant else p['wikidata_id'],
+            'last_updated': '2025-11-29',
+        })
+    return {'sparql': sparql, 'laureates': laureates, 'extracts': extracts, 'wikipedia': wikipedia}
+
+
+def measure(func, memory=True):
+    """Run ``func`` and return (result, seconds, peak MB or None).
+    
+    The peak comes from a second, traced run so tracing does not distort
+    the timing.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    secs = time.perf_counter() - start
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+            peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+    return result, secs, peak
+
+
+def suite_paths(sources, tmp):
+    """Return [(hot path, items, callable)] in pipeline order over one size's sources."""
+    wikidata = WikidataScraper()
+    nobel = NobelScraper()
+    state = {}
+
+    def parse_results():
+        state['wikidata'] = wikidata.parse_results(sources['sparql'])
+        return state['wikidata']
+
+    def parse_laureates():
+        # Wikipedia lookups are answered from the scraper's own cache
+        nobel._wiki_cache = dict(sources['extracts'])
+        state['nobel'] = [r for r in map(nobel.parse_laureate, sources['laureates']) if r]
+        return state['nobel']
+
+    def merge():
+        state['merged'] = DataMerger().merge_datasets(state['nobel'], state['wikidata'], sources['wikipedia'])
+        return state['merged']
+
+    path = os.path.join(tmp, 'heroines.json')
+
+    def save():
+        return write_canonical_json(state['merged'], path, compress=False)
+
+    def load():
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    return [
+        ('parse_results', len(sources['sparql']['results']['bindings']), parse_results),
+        ('parse_laureate', len(sources['laureates']), parse_laureates),
+        ('merge_datasets', None, merge),
+        ('save_json', None, save),
+        ('load_json', None, load),
+    ]
+
+
+def bench_suite(sizes=SUITE_SIZES, memory=True, seed=42):
+    """Time every hot path at each size; returns the results document.
+    
+    Each size is generated with ``synthetic_sources``, parsed, merged,
+    saved and loaded again, so every path sees the previous one's output.
+    Peak memory is traced up to MEMORY_MAX_SIZE entries.
+    """
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': importlib.util.find_spec('numpy') is not None,
+        'sizes': {},
+    }
+    print(f"{'size':>8} {'path':<16} {'items':>8} {'secs':>9} {'peak MB':>9}")
+    for size in sizes:
+        sources = synthetic_sources(size, seed)
+        rows = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, items, func in suite_paths(sources, tmp):
+                result, secs, peak = measure(func, memory and size <= MEMORY_MAX_SIZE)
+                items = items if items is not None else len(result)
+                rows[name] = {'items': items, 'secs': round(secs, 4),
+                              'peak_mb': round(peak, 2) if peak is not None else None}
+                print(f"{size:>8} {name:<16} {items:>8} {secs:>9.3f} "
+                      f"{peak if peak is not None else float('nan'):>9.1f}")
+        results['sizes'][str(size)] = rows
+    return results
+
+
+def check_budget(results, baseline, budget=REGRESSION_BUDGET):
+    """Return a message for every path that grew beyond the budget over the baseline."""
+    failures = []
+    for size, rows in results['sizes'].items():
+        for name, row in rows.items():
+            base = baseline.get('sizes', {}).get(size, {}).get(name)
+            if not base:
+                continue
+            for metric, allowed in budget.items():
+                old, new = base.get(metric), row.get(metric)
+                if not old or new is None:
+                    continue
+                if metric == 'secs' and new - old < NOISE_FLOOR_SECS:
+                    continue
+                if new > old * (1 + allowed):
+                    failures.append(f"{name} at {size}: {metric} {old} -> {new} "
+                                    f"(+{(new / old - 1):.0%}, budget +{allowed:.0%})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int)
+    parser.add_argument('--linear-max', type=int, default=1000,
+                        help='largest size to also run through the O(n^2) linear scan')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='also time the indexed merge with this many match processes')
+    parser.add_argument('--similarity', action='store_true',
+                        help='compare similarity backends with SequenceMatcher instead')
+    parser.add_argument('--html', nargs='?', const=HTML_FIXTURES, default=None, metavar='DIR',
+                        help='time NWHM page parsing over the .html pages in DIR instead')
+    parser.add_argument('--suite', action='store_true',
+                        help='time the parse/merge/JSON hot paths (default sizes 1k/10k)')
+    parser.add_argument('--output', default=SUITE_RESULTS, help='where --suite writes its JSON results')
+    parser.add_argument('--baseline', default=None,
+                        help='results JSON of another branch; --suite fails past the regression budget')
+    parser.add_argument('--max-slowdown', type=float, default=REGRESSION_BUDGET['secs'],
+                        help='allowed relative slowdown per path (default %(default)s)')
+    parser.add_argument('--max-memory-growth', type=float, default=REGRESSION_BUDGET['peak_mb'],
+                        help='allowed relative growth of peak memory per path (default %(default)s)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced peak-memory runs')
+    args = parser.parse_args()
+    if args.suite:
+        results = bench_suite(args.sizes or SUITE_SIZES, memory=not args.no_memory)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+            failures = check_budget(results, baseline,
+                                    {'secs': args.max_slowdown, 'peak_mb': args.max_memory_growth})
+            for failure in failures:
+                print(f"REGRESSION: {failure}")
+            if failures:
+                sys.exit(1)
+            print(f"Within budget of {args.baseline}")
+    elif args.html:
+        bench_html(args.html)
+    elif args.similarity:
+        bench_similarity(args.sizes[-1] if args.sizes else 5000)
+    else:
+        bench_merge(args.sizes or [250, 500, 1000, 5000, 20000, 50000],
+                    linear_max=args.linear_max, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
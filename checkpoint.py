@@ -0,0 +1,123 @@
+"""
+Checkpoint store for The Unsung Heroines scrapers
+Records how far a long run has got (SPARQL cursor, category continuation
+tokens, processed titles, enriched entries) in a small SQLite file, so a
+rerun after a timeout or crash resumes instead of starting from zero. CI
+restores the file between runs together with the HTTP cache.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+CHECKPOINT_PATH = os.environ.get("HEROINES_CHECKPOINTS", os.path.join(".checkpoints", "checkpoints.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    scope  TEXT NOT NULL,
+    source TEXT NOT NULL,
+    value  TEXT NOT NULL,
+    PRIMARY KEY (scope, source)
+);
+CREATE TABLE IF NOT EXISTS done (
+    scope  TEXT NOT NULL,
+    source TEXT NOT NULL,
+    item   TEXT NOT NULL,
+    PRIMARY KEY (scope, source, item)
+);
+"""
+
+
+class CheckpointStore:
+    """Per-source progress for one script (``scope``), persisted in SQLite.
+
+    ``get``/``set`` hold a JSON cursor per source; ``done``/``mark_done``
+    track the set of items a source has finished. ``clear`` forgets the
+    scope once its run has completed.
+    """
+
+    def __init__(self, scope, path=CHECKPOINT_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.scope = scope
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, source, default=None):
+        """Return the stored cursor for a source, or ``default``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cursors WHERE scope = ? AND source = ?",
+                (self.scope, source)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, source, value):
+        """Store a JSON-serialisable cursor for a source."""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cursors VALUES (?, ?, ?)",
+                               (self.scope, source, json.dumps(value, ensure_ascii=False)))
+            self._conn.commit()
+
+    def cursors(self, prefix=""):
+        """Return {source: cursor} for every source starting with ``prefix``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, value FROM cursors WHERE scope = ? AND substr(source, 1, ?) = ?",
+                (self.scope, len(prefix), prefix)).fetchall()
+        return {source: json.loads(value) for source, value in rows}
+
+    def done(self, source):
+        """Return the set of items already finished for a source."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item FROM done WHERE scope = ? AND source = ?",
+                (self.scope, source)).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_done(self, source, items):
+        """Record items as finished for a source."""
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO done VALUES (?, ?, ?)",
+                                   [(self.scope, source, item) for item in items])
+            self._conn.commit()
+
+    def bind(self, fingerprint):
+        """Tie this scope's progress to one input (e.g. a hash of the dataset).
+
+        Progress recorded against a different fingerprint is discarded, so a
+        resumed run never replays work done on other data. Returns True if
+        earlier progress was kept.
+        """
+        previous = self.get("input")
+        kept = previous == fingerprint
+        if not kept:
+            if previous is not None:
+                print(f"Checkpoint for '{self.scope}' belongs to another input; starting over")
+            self.clear()
+            self.set("input", fingerprint)
+        return kept
+
+    def clear(self):
+        """Forget all progress recorded for this scope."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cursors WHERE scope = ?", (self.scope,))
+            self._conn.execute("DELETE FROM done WHERE scope = ?", (self.scope,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_checkpoints(scope, path=CHECKPOINT_PATH):
+    """Return a CheckpointStore for a script, or None when disabled.
+
+    Set HEROINES_CHECKPOINTS=off to always start from scratch.
+    """
+    if path.lower() in ("off", "0", "false", ""):
+        return None
+    return CheckpointStore(scope, path)
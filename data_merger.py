@@ -3,41 +3,379 @@ Data Merger for The Unsung Heroines
 Combines and deduplicates data from multiple sources (Wikidata, Wikipedia, NWHM).
 """
 
+import gzip
+import hashlib
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from difflib import SequenceMatcher
+from itertools import islice
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+from jsonl_io import read_jsonl
+from similarity import get_backend, normalize_name
+
+try:
+    import brotli
+except ImportError:  # optional: only the .gz variant is written
+    brotli = None
+
+# Static bundle read by script.js: a small index, fixed-size shards of the
+# dataset and the entry featured this week
+BUNDLE_DIR = 'data'
+SHARD_SIZE = 16
+WEEK_SECONDS = 7 * 24 * 60 * 60
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def soundex(word, length=4):
+    """Return the American Soundex code for a word (the word itself if it has no letters).
+    
+    ``length=None`` keeps every digit instead of the usual four characters.
+    """
+    letters = [ch for ch in word if 'a' <= ch <= 'z']
+    if not letters:
+        return word
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for ch in letters[1:]:
+        digit = SOUNDEX_CODES.get(ch, '')
+        if digit and digit != previous:
+            code += digit
+        if ch not in 'hw':
+            previous = digit
+    if length is None:
+        return code
+    return (code + '000')[:length]
+
+
+def blocking_keys(name):
+    """Return the blocking keys used to pre-select fuzzy match candidates.
+
+    Names that are similar enough to merge almost always share a surname
+    within one typo (any single deletion, insertion, substitution or
+    transposition), sound alike, or differ only in spacing. The phonetic
+    key is the full-length Soundex code of the surname plus the first
+    initial: four-character codes and surname codes alone make buckets
+    that grow with the dataset.
+    """
+    tokens = normalize_name(name).split()
+    surname = tokens[-1] if tokens else ''
+    initial = tokens[0][:1] if len(tokens) > 1 else ''
+    keys = {f"c:{''.join(tokens)}", f'p:{soundex(surname, None)}:{initial}', f'd:{surname}'}
+    keys.update(f'd:{surname[:i]}{surname[i + 1:]}' for i in range(len(surname)))
+    return keys
+
+
+def record_key(record):
+    """Return a stable identity for a source record across scraper runs.
+    
+    The first source URL identifies the record within its source (Nobel API
+    laureate, Wikidata item, Wikipedia article); older records without
+    sources fall back to their Wikidata ID or name.
+    """
+    sources = record.get('sources') or [{}]
+    return sources[0].get('url') or record.get('wikidata_id') or f"name:{record.get('name', '')}"
+
+
+def record_hash(record):
+    """Hash a source record's content, ignoring run-specific dates."""
+    content = {k: v for k, v in record.items() if k != 'last_updated'}
+    content['sources'] = [
+        {k: v for k, v in source.items() if k != 'accessed'}
+        for source in record.get('sources', [])
+    ]
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def normalize_source_url(url):
+    """Canonical form of a source URL: https, lowercase host, decoded path
+    with underscores for spaces and no trailing slash, sorted query, no fragment."""
+    parts = urlsplit(url.strip())
+    scheme = 'https' if parts.scheme.lower() in ('http', 'https') else parts.scheme.lower()
+    path = unquote(parts.path).replace(' ', '_').rstrip('/')
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, parts.netloc.lower(), path, query, ''))
+
+
+def source_key(source):
+    """Identity of a source entry: its normalized URL, else its name."""
+    url = source.get('url')
+    if url:
+        return normalize_source_url(url)
+    return f"name:{(source.get('name') or '').casefold()}"
+
+
+def item_key(item):
+    """Identity of a field/accomplishment: casefolded text."""
+    if isinstance(item, str):
+        return ' '.join(item.casefold().split())
+    return json.dumps(item, sort_keys=True, ensure_ascii=False)
+
+
+def week_number(timestamp=None):
+    """Weeks since the Unix epoch, as script.js computes them.
+    
+    Epoch weeks start on Thursday 00:00 UTC, mid-way between the Monday
+    runs that export the bundle.
+    """
+    return int((time.time() if timestamp is None else timestamp) // WEEK_SECONDS)
+
+
+def canonical_order(records):
+    """Sort entries by id (then name) so output order is independent of merge order."""
+    return sorted(records, key=lambda e: (str(e.get('id') or ''), e.get('name') or ''))
+
+
+def canonical_json(data):
+    """Minified JSON with sorted keys: identical data always gives identical bytes."""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def _write_compact_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(canonical_json(data))
+
+
+def write_canonical_json(records, filename, pretty=False, compress=True):
+    """Write a dataset as canonical minified JSON; returns the ordered entries.
+    
+    With ``compress`` the same bytes are also written pre-compressed as
+    ``filename.gz`` and, when the brotli package is installed,
+    ``filename.br``. Both are reproducible (no timestamps), so they only
+    change when the data does. ``pretty=True`` adds an indented copy as
+    ``<name>.pretty.json`` for reading.
+    """
+    data = canonical_order(records)
+    payload = canonical_json(data).encode('utf-8')
+    with open(filename, 'wb') as f:
+        f.write(payload)
+    
+    if compress:
+        with open(f'{filename}.gz', 'wb') as f:
+            f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(f'{filename}.br', 'wb') as f:
+                f.write(brotli.compress(payload, quality=11))
+        else:
+            print("brotli not installed; skipping .br output")
+    
+    if pretty:
+        root, ext = os.path.splitext(filename)
+        with open(f'{root}.pretty{ext}', 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return data
+
+
+def export_bundle(records, out_dir=BUNDLE_DIR, shard_size=SHARD_SIZE, week=None):
+    """Write the static site bundle for a dataset and return its index.
+    
+    ``index.json`` lists the shard files (``shard_size`` entries each, in
+    canonical order) and ``featured.json`` holds entry ``week % count`` for
+    the current week and, under ``next``, the following one: an epoch week
+    turns over on Thursday, between two weekly runs. So the page normally
+    loads one entry; shards let it find the right entry when the bundle is
+    older than that. ``last_updated`` is the newest entry date, so unchanged
+    data gives an unchanged index.
+    """
+    records = canonical_order(records)
+    shard_dir = os.path.join(out_dir, 'shards')
+    os.makedirs(shard_dir, exist_ok=True)
+    
+    shards = []
+    for start in range(0, len(records), shard_size):
+        name = f'{start // shard_size:04d}.json'
+        _write_compact_json(os.path.join(shard_dir, name), records[start:start + shard_size])
+        shards.append(f'shards/{name}')
+    # Drop shards left over from a larger dataset
+    for name in os.listdir(shard_dir):
+        if f'shards/{name}' not in shards:
+            os.remove(os.path.join(shard_dir, name))
+    
+    index = {
+        'count': len(records),
+        'shard_size': shard_size,
+        'shards': shards,
+        'last_updated': max((e['last_updated'] for e in records if e.get('last_updated')), default=None),
+    }
+    _write_compact_json(os.path.join(out_dir, 'index.json'), index)
+    
+    week = week_number() if week is None else week
+    featured = _featured(records, week)
+    featured['next'] = _featured(records, week + 1)
+    _write_compact_json(os.path.join(out_dir, 'featured.json'), featured)
+    print(f"Exported {len(records)} entries in {len(shards)} shards to {out_dir}/")
+    return index
+
+
+def _featured(records, week):
+    """The entry featured in a given week: {week, index, heroine}."""
+    position = week % len(records) if records else None
+    return {'week': week, 'index': position, 'heroine': records[position] if records else None}
+
+
+def _discard_from_bucket(buckets, bucket_key, key):
+    """Remove key from buckets[bucket_key], dropping the bucket once empty."""
+    bucket = buckets.get(bucket_key)
+    if bucket is not None:
+        bucket.discard(key)
+        if not bucket:
+            del buckets[bucket_key]
+
+
+def _without_timestamp(entry):
+    return {k: v for k, v in entry.items() if k != 'last_updated'}
+
+
+def _similarity_batch(pairs, backend_name):
+    """Score a list of (str1, str2) pairs exactly as DataMerger.similarity_ratio does.
+    
+    Module-level so ProcessPoolExecutor workers can run it.
+    """
+    backend = get_backend(backend_name)
+    return [backend.ratio(a, b) for a, b in pairs]
+
 
 class DataMerger:
     """Merges women's data from multiple sources."""
     
-    def __init__(self):
+    # Records scored together per parallel match phase
+    MATCH_BATCH_SIZE = 2000
+    
+    def __init__(self, use_index=True, workers=None, similarity=None):
         self.merged_data = {}
+        self.use_index = use_index
+        self.workers = workers or 1
+        # Name/biography similarity backend (see similarity.py); the default
+        # SequenceMatcher backend is the reference the thresholds were set on
+        self.similarity = get_backend(similarity)
+        self.thresholds = self.similarity.thresholds
+        self.source_hashes = {}
+        self._scores = {}
+        self._positions = {}
+        self._by_wikidata_id = {}
+        self._blocks = {}
+        self._entry_keys = {}
     
     def similarity_ratio(self, str1, str2):
         """Calculate similarity between two strings."""
-        return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
+        score = self._scores.get((str1, str2))
+        if score is not None:
+            return score
+        return self.similarity.ratio(str1, str2)
     
-    def find_matching_entry(self, woman, existing_women):
-        """Find if this woman already exists in our data."""
-        name = woman.get('name', '').lower()
+    def name_scores(self, name, candidate_names):
+        """Score one lowercased name against many, in one backend call.
+        
+        Scores already computed by the parallel match phase are reused.
+        """
+        if not self._scores:
+            return self.similarity.scores(name, candidate_names)
+        return (self.similarity_ratio(name, other) for other in candidate_names)
+    
+    # ------------------------------------------------------------------
+    # Candidate index
+    # ------------------------------------------------------------------
+    
+    def rebuild_index(self):
+        """Rebuild the Wikidata ID and blocking indexes from merged_data."""
+        self._positions = {}
+        self._by_wikidata_id = {}
+        self._blocks = {}
+        self._entry_keys = {}
+        for key, entry in self.merged_data.items():
+            self._index_entry(key, entry)
+    
+    def _index_entry(self, key, entry):
+        """Add (or refresh) a single merged entry in the indexes."""
+        self._unindex_entry(key)
+        self._positions.setdefault(key, len(self._positions))
+        wikidata_id = entry.get('wikidata_id')
+        block_keys = blocking_keys(entry.get('name', ''))
+        if wikidata_id:
+            self._by_wikidata_id.setdefault(wikidata_id, set()).add(key)
+        for block_key in block_keys:
+            self._blocks.setdefault(block_key, set()).add(key)
+        self._entry_keys[key] = (wikidata_id, block_keys)
+    
+    def _unindex_entry(self, key):
+        """Remove a merged entry from the indexes (its position is kept)."""
+        wikidata_id, block_keys = self._entry_keys.pop(key, (None, ()))
+        if wikidata_id:
+            _discard_from_bucket(self._by_wikidata_id, wikidata_id, key)
+        for block_key in block_keys:
+            _discard_from_bucket(self._blocks, block_key, key)
+    
+    def _candidate_keys(self, woman):
+        """Return the keys worth comparing against, in insertion order."""
+        if len(self._entry_keys) != len(self.merged_data):
+            self.rebuild_index()
+        candidates = set()
+        wikidata_id = woman.get('wikidata_id')
+        if wikidata_id:
+            candidates |= self._by_wikidata_id.get(wikidata_id, set())
+        for index_key in blocking_keys(woman.get('name', '')):
+            candidates |= self._blocks.get(index_key, set())
+        return sorted(candidates, key=self._positions.__getitem__)
+    
+    # ------------------------------------------------------------------
+    # Matching and merging
+    # ------------------------------------------------------------------
+    
+    def is_match(self, woman, existing, name_score=None):
+        """Return True if ``woman`` describes the same person as ``existing``.
+        
+        ``name_score`` is the precomputed similarity of the two names, if known.
+        """
         birth_date = woman.get('birth_date', '')
         wikidata_id = woman.get('wikidata_id')
         
-        for key, existing in existing_women.items():
-            # Match by Wikidata ID (most reliable)
-            if wikidata_id and existing.get('wikidata_id') == wikidata_id:
+        # Match by Wikidata ID (most reliable)
+        if wikidata_id and existing.get('wikidata_id') == wikidata_id:
+            return True
+        
+        # Match by name similarity and birth date
+        if name_score is None:
+            name_score = self.similarity_ratio(woman.get('name', '').lower(),
+                                               existing.get('name', '').lower())
+        if name_score > self.thresholds['match']:
+            # If names are very similar, check birth date
+            if birth_date and existing.get('birth_date') == birth_date:
+                return True
+            # Or if no birth date, accept high name similarity
+            elif not birth_date or not existing.get('birth_date'):
+                if name_score > self.thresholds['strict']:
+                    return True
+        
+        return False
+    
+    def find_matching_entry(self, woman, existing_women):
+        """Find if this woman already exists in our data.
+        
+        When searching merged_data the Wikidata ID and blocking indexes narrow
+        the comparison to a handful of candidates; any other mapping is
+        scanned in full.
+        """
+        if self.use_index and existing_women is self.merged_data:
+            keys = self._candidate_keys(woman)
+        else:
+            keys = list(existing_women.keys())
+        
+        scores = self.name_scores(woman.get('name', '').lower(),
+                                  [existing_women[key].get('name', '').lower() for key in keys])
+        for key, score in zip(keys, scores):
+            if self.is_match(woman, existing_women[key], score):
                 return key
-            
-            # Match by name similarity and birth date
-            existing_name = existing.get('name', '').lower()
-            if self.similarity_ratio(name, existing_name) > 0.85:
-                # If names are very similar, check birth date
-                if birth_date and existing.get('birth_date') == birth_date:
-                    return key
-                # Or if no birth date, accept high name similarity
-                elif not birth_date or not existing.get('birth_date'):
-                    if self.similarity_ratio(name, existing_name) > 0.92:
-                        return key
         
         return None
     
@@ -55,22 +393,41 @@ class DataMerger:
             return existing_bio
         
         # Otherwise, combine them if they're different
-        if self.similarity_ratio(existing_bio, new_bio) < 0.7:
+        if self.similarity_ratio(existing_bio, new_bio) < self.thresholds['biography']:
             return f"{existing_bio}\n\n{new_bio}"
         
         return existing_bio
     
-    def merge_lists(self, existing_list, new_list):
-        """Merge two lists, removing duplicates."""
-        if not existing_list:
-            return new_list or []
-        if not new_list:
-            return existing_list
+    def merge_lists(self, existing_list, new_list, key=item_key):
+        """Merge two lists, dropping items whose ``key`` was already seen.
         
-        # Combine and deduplicate
-        combined = existing_list + [item for item in new_list if item not in existing_list]
+        First-seen order is kept; duplicates within either list are dropped too.
+        """
+        seen = set()
+        combined = []
+        for item in (existing_list or []) + (new_list or []):
+            item_id = key(item)
+            if item_id not in seen:
+                seen.add(item_id)
+                combined.append(item)
         return combined
     
+    def merge_sources(self, existing_sources, new_sources):
+        """Merge source lists keyed by normalized URL, keeping first-seen order.
+        
+        A source seen again keeps its first entry but takes the newest
+        ``accessed`` date, so re-scraping doesn't add a copy per run.
+        """
+        by_key = {}
+        for source in (existing_sources or []) + (new_sources or []):
+            sid = source_key(source)
+            kept = by_key.get(sid)
+            if kept is None:
+                by_key[sid] = source
+            elif source.get('accessed', '') > kept.get('accessed', ''):
+                by_key[sid] = dict(kept, accessed=source['accessed'])
+        return list(by_key.values())
+    
     def merge_woman_data(self, existing, new):
         """Merge data for a single woman from multiple sources."""
         merged = existing.copy()
@@ -107,8 +464,8 @@ class DataMerger:
             merged['image'] = new['image']
             merged['image_credit'] = new.get('image_credit', 'Source: ' + new.get('sources', [{}])[0].get('name', 'Unknown'))
         
-        # Merge sources (always add new sources)
-        merged['sources'] = self.merge_lists(
+        # Merge sources (one per URL, newest access date kept)
+        merged['sources'] = self.merge_sources(
             existing.get('sources', []),
             new.get('sources', [])
         )
@@ -117,13 +474,15 @@ class DataMerger:
         if new.get('wikidata_id') and not existing.get('wikidata_id'):
             merged['wikidata_id'] = new['wikidata_id']
         
-        # Update last_updated timestamp
-        merged['last_updated'] = datetime.now().strftime('%Y-%m-%d')
+        # Update last_updated timestamp, but only if something actually changed
+        # so that re-merging known data doesn't produce spurious diffs
+        if _without_timestamp(merged) != _without_timestamp(existing):
+            merged['last_updated'] = datetime.now().strftime('%Y-%m-%d')
         
         return merged
     
     def add_woman(self, woman_data):
-        """Add or merge a woman's data."""
+        """Add or merge a woman's data; returns the key of the affected entry."""
         # Find if this woman already exists
         match_key = self.find_matching_entry(woman_data, self.merged_data)
         
@@ -133,6 +492,9 @@ class DataMerger:
                 self.merged_data[match_key],
                 woman_data
             )
+            if self.use_index:
+                self._index_entry(match_key, self.merged_data[match_key])
+            return match_key
         else:
             # Add as new entry
             # Generate unique key
@@ -150,45 +512,206 @@ class DataMerger:
                 'birth_date': woman_data.get('birth_date', ''),
                 'death_date': woman_data.get('death_date', ''),
                 'biography': woman_data.get('biography', woman_data.get('extract', woman_data.get('description', ''))),
-                'accomplishments': woman_data.get('accomplishments', []),
-                'fields': woman_data.get('fields', [woman_data.get('occupation')] if woman_data.get('occupation') else []),
+                'accomplishments': self.merge_lists([], woman_data.get('accomplishments', [])),
+                'fields': self.merge_lists([], woman_data.get('fields', [woman_data.get('occupation')] if woman_data.get('occupation') else [])),
                 'image': woman_data.get('image'),
                 'image_credit': woman_data.get('image_credit', ''),
-                'sources': woman_data.get('sources', []),
+                'sources': self.merge_sources([], woman_data.get('sources', [])),
                 'wikidata_id': woman_data.get('wikidata_id'),
                 'last_updated': datetime.now().strftime('%Y-%m-%d')
             }
             
             self.merged_data[key] = normalized
+            if self.use_index:
+                self._index_entry(key, normalized)
+            return key
+    
+    # ------------------------------------------------------------------
+    # Parallel match phase
+    # ------------------------------------------------------------------
+    
+    def _score_pairs(self, pairs, pool):
+        """Compute similarity scores for string pairs across the process pool."""
+        pairs = [pair for pair in pairs if pair not in self._scores]
+        if not pairs:
+            return
+        size = max(1, len(pairs) // (self.workers * 4))
+        chunks = [pairs[i:i + size] for i in range(0, len(pairs), size)]
+        backend_names = [self.similarity.name] * len(chunks)
+        for chunk, scores in zip(chunks, pool.map(_similarity_batch, chunks, backend_names)):
+            self._scores.update(zip(chunk, scores))
+    
+    def _prescore(self, batch, pool):
+        """Score every name/biography comparison a batch is likely to need.
+        
+        Pairs are taken against the entries merged so far; comparisons that
+        only arise from merges inside the batch are computed on demand.
+        """
+        name_pairs, bio_pairs, likely = set(), set(), []
+        for woman in batch:
+            name = woman.get('name', '').lower()
+            wikidata_id = woman.get('wikidata_id')
+            if self.use_index:
+                keys = self._candidate_keys(woman)
+            else:
+                keys = self.merged_data.keys()
+            for key in keys:
+                existing = self.merged_data[key]
+                if wikidata_id and existing.get('wikidata_id') == wikidata_id:
+                    likely.append((woman, existing, None))
+                else:
+                    pair = (name, existing.get('name', '').lower())
+                    name_pairs.add(pair)
+                    likely.append((woman, existing, pair))
+        self._score_pairs(list(name_pairs), pool)
+        
+        # Biographies are only compared for entries that will likely merge
+        for woman, existing, pair in likely:
+            if pair and self._scores[pair] <= self.thresholds['match']:
+                continue
+            existing_bio = existing.get('biography', '')
+            new_bio = woman.get('biography', woman.get('extract', woman.get('description', '')))
+            if (existing_bio and new_bio and len(new_bio) <= len(existing_bio) * 1.5
+                    and len(existing_bio) <= len(new_bio) * 1.5):
+                bio_pairs.add((existing_bio, new_bio))
+        self._score_pairs(list(bio_pairs), pool)
+    
+    def _add_records(self, records):
+        """add_woman each record in input order; yields (record, key).
+        
+        With ``workers > 1`` records are taken in batches whose similarity
+        scores are computed in parallel first. Decisions are still applied
+        one record at a time in order with the same scores, so the result is
+        identical to the serial path.
+        """
+        if self.workers <= 1:
+            for record in records:
+                yield record, self.add_woman(record)
+            return
+        
+        records = iter(records)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                batch = list(islice(records, self.MATCH_BATCH_SIZE))
+                if not batch:
+                    break
+                self._prescore(batch, pool)
+                for record in batch:
+                    yield record, self.add_woman(record)
+                self._scores = {}
     
     def merge_datasets(self, *datasets):
-        """Merge multiple datasets."""
-        total_entries = sum(len(dataset) for dataset in datasets)
-        print(f"Merging {len(datasets)} datasets with {total_entries} total entries...")
+        """Merge multiple datasets.
+        
+        Datasets may be lists or any iterable of records (e.g. read_jsonl
+        generators); records are consumed one at a time.
+        """
+        print(f"Merging {len(datasets)} datasets...")
+        total_entries = 0
         
         for dataset_idx, dataset in enumerate(datasets, 1):
-            print(f"Processing dataset {dataset_idx}/{len(datasets)} ({len(dataset)} entries)...")
-            for woman in dataset:
-                self.add_woman(woman)
+            count = 0
+            for _ in self._add_records(dataset):
+                count += 1
+            total_entries += count
+            print(f"Processed dataset {dataset_idx}/{len(datasets)} ({count} entries)...")
         
-        print(f"Merge complete. {len(self.merged_data)} unique women identified.")
+        print(f"Merge complete. {total_entries} entries, {len(self.merged_data)} unique women identified.")
         return list(self.merged_data.values())
     
-    def save_to_json(self, filename='merged_heroines.json'):
-        """Save merged data to JSON file."""
-        data = list(self.merged_data.values())
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    # ------------------------------------------------------------------
+    # Incremental merging
+    # ------------------------------------------------------------------
+    
+    def load_snapshot(self, entries, state_file=None):
+        """Load a previously merged dataset (and its merge state) to merge into.
+        
+        Entries are keyed by their ``id``; the candidate indexes are rebuilt
+        in one pass. ``state_file`` holds the content hashes of the source
+        records merged in earlier runs (see save_state).
+        """
+        self.merged_data = {}
+        for entry in entries:
+            key = entry.get('id') or entry.get('wikidata_id') or entry.get('name', '').replace(' ', '_').lower()
+            original_key, counter = key, 1
+            while key in self.merged_data:
+                key = f"{original_key}_{counter}"
+                counter += 1
+            self.merged_data[key] = entry
+        if self.use_index:
+            self.rebuild_index()
+        
+        self.source_hashes = {}
+        if state_file and os.path.exists(state_file):
+            with open(state_file, 'r', encoding='utf-8') as f:
+                self.source_hashes = json.load(f).get('source_hashes', {})
+        print(f"Loaded snapshot with {len(self.merged_data)} entries "
+              f"and {len(self.source_hashes)} known source records.")
+    
+    def save_state(self, state_file):
+        """Save the source record hashes needed by the next incremental merge."""
+        with open(state_file, 'w', encoding='utf-8') as f:
+            json.dump({'source_hashes': self.source_hashes}, f, ensure_ascii=False,
+                      indent=0, sort_keys=True)
+    
+    def changed_records(self, records):
+        """Yield the records that are new or changed since they were last merged."""
+        for record in records:
+            if self.source_hashes.get(record_key(record)) != record_hash(record):
+                yield record
+    
+    def merge_incremental(self, records):
+        """Merge only new or changed source records into the loaded snapshot.
+        
+        ``records`` may be any iterable and is consumed once. Unchanged
+        records are skipped without any matching work, and entries whose
+        merged content doesn't change keep their last_updated date.
+        Returns the keys of the entries that were touched.
+        """
+        seen = 0
+        
+        def counted():
+            nonlocal seen
+            for record in records:
+                seen += 1
+                yield record
+        
+        touched = []
+        for record, key in self._add_records(self.changed_records(counted())):
+            touched.append(key)
+            self.source_hashes[record_key(record)] = record_hash(record)
+        print(f"Incremental merge: {len(touched)} of {seen} records new or changed.")
+        
+        touched = list(dict.fromkeys(touched))
+        print(f"Incremental merge complete. {len(touched)} entries touched, "
+              f"{len(self.merged_data)} total.")
+        return touched
+    
+    def save_to_json(self, filename='merged_heroines.json', canonical=False, pretty=False):
+        """Save merged data to JSON file.
+        
+        ``canonical=True`` writes minified canonical JSON ordered by id plus
+        pre-compressed variants (see write_canonical_json).
+        """
+        if canonical:
+            data = write_canonical_json(self.merged_data.values(), filename, pretty=pretty)
+        else:
+            data = list(self.merged_data.values())
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
         print(f"Saved {len(data)} entries to {filename}")
 
+    def export_bundle(self, out_dir=BUNDLE_DIR, shard_size=SHARD_SIZE):
+        """Write the static site bundle (see export_bundle) for the merged data."""
+        return export_bundle(self.merged_data.values(), out_dir, shard_size)
+
 def main():
     """Test the merger with sample data."""
     merger = DataMerger()
     
     # Example: Load and merge data files
     try:
-        with open('wikidata_heroines.json', 'r', encoding='utf-8') as f:
-            wikidata_data = json.load(f)
+        wikidata_data = list(read_jsonl('wikidata_heroines.jsonl'))
     except FileNotFoundError:
         wikidata_data = []
     
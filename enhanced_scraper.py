@@ -3,104 +3,167 @@ Enhanced Scraper for The Unsung Heroines
 Main orchestrator that combines data from multiple sources.
 """
 
-import json
 from datetime import datetime
+from itertools import islice
+import os
 import sys
 
 # Import our custom modules
 from wikidata_scraper import WikidataScraper
 from data_merger import DataMerger
 from nobel_scraper import NobelScraper
+from nwhm_scraper import NWHMScraper
+from checkpoint import open_checkpoints
+from fetch_engine import FetchEngine, limiter_stats
+from http_cache import cache_stats, install_cache
+from jsonl_io import read_jsonl, write_jsonl
+from wikipedia_client import DEFAULT_PAGE_PARAMS, NON_PERSON_PREFIXES, CategoryCrawler, WikipediaClient
 
-# Import enhanced Wikipedia functions
-import requests
-import time
+def cached_engine():
+    """Return a FetchEngine whose session reads through the HTTP cache."""
+    engine = FetchEngine()
+    install_cache(engine.session)
+    return engine
 
-def get_enhanced_wikipedia_data(page_title):
-    """Enhanced Wikipedia scraper with Wikidata ID linking."""
-    headers = {
-        'User-Agent': 'TheUnsungHeroines/2.0 (Educational Project)'
+def wikipedia_page_to_record(page):
+    """Convert a MediaWiki page (extracts/pageimages/info/pageprops) to a record."""
+    # Extract Wikidata ID if available
+    wikidata_id = page.get('pageprops', {}).get('wikibase_item')
+    
+    return {
+        'name': page.get('title'),
+        'biography': page.get('extract'),
+        'image': page.get('thumbnail', {}).get('source'),
+        'sources': [{
+            'name': 'Wikipedia',
+            'url': page.get('fullurl'),
+            'accessed': datetime.now().strftime('%Y-%m-%d')
+        }],
+        'wikidata_id': wikidata_id,
+        'last_updated': datetime.now().strftime('%Y-%m-%d')
     }
+
+def get_enhanced_wikipedia_batch(page_titles, client=None):
+    """Fetch many Wikipedia pages at once; returns {title: record or None}."""
+    client = client or WikipediaClient(engine=cached_engine())
+    records = {}
     
-    # Get page data including Wikidata ID
-    url = f"https://en.wikipedia.org/w/api.php?action=query&format=json&prop=extracts|pageimages|info|pageprops&titles={page_title}&exintro=true&explaintext=true&pithumbsize=500&inprop=url&ppprop=wikibase_item"
+    for title, page in client.fetch_pages(page_titles).items():
+        if page is None:
+            print(f"Warning: Page '{title}' not found.")
+            records[title] = None
+        else:
+            records[title] = wikipedia_page_to_record(page)
     
-    try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-        page = next(iter(data['query']['pages'].values()))
-        
-        if page.get('missing'):
-            print(f"Warning: Page '{page_title}' not found.")
-            return None
-        
-        # Extract Wikidata ID if available
-        wikidata_id = page.get('pageprops', {}).get('wikibase_item')
-        
-        return {
-            'name': page.get('title'),
-            'biography': page.get('extract'),
-            'image': page.get('thumbnail', {}).get('source'),
-            'sources': [{
-                'name': 'Wikipedia',
-                'url': page.get('fullurl'),
-                'accessed': datetime.now().strftime('%Y-%m-%d')
-            }],
-            'wikidata_id': wikidata_id,
-            'last_updated': datetime.now().strftime('%Y-%m-%d')
-        }
-    except Exception as e:
-        print(f"Error fetching Wikipedia data for {page_title}: {e}")
-        return None
+    return records
 
-def get_wikipedia_category_members(category_title):
-    """Get list of women from a Wikipedia category."""
-    headers = {
-        'User-Agent': 'TheUnsungHeroines/2.0 (Educational Project)'
-    }
-    url = f"https://en.wikipedia.org/w/api.php?action=query&format=json&list=categorymembers&cmtitle=Category:{category_title}&cmlimit=500"
-    
+def get_enhanced_wikipedia_data(page_title):
+    """Enhanced Wikipedia scraper with Wikidata ID linking."""
+    return get_enhanced_wikipedia_batch([page_title]).get(page_title)
+
+def get_wikipedia_category_members(category_title, engine=None, limit=500, depth=0):
+    """Get list of women from a Wikipedia category (and its subcategories up to ``depth``)."""
+    client = WikipediaClient(engine=engine or cached_engine())
+    crawler = CategoryCrawler(client, category_title, depth=depth, limit=limit,
+                              exclude=NON_PERSON_PREFIXES)
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-        return [member['title'] for member in data['query']['categorymembers']]
+        return list(crawler)
     except Exception as e:
         print(f"Error fetching category {category_title}: {e}")
         return []
 
-def scrape_wikipedia_enhanced(categories, limit_per_category=50):
-    """Scrape Wikipedia with enhanced data structure."""
-    all_women = []
+def iter_wikipedia_enhanced(categories, limit_per_category=50, chunk_size=500, checkpoint=None, depth=0,
+                            mode='titles'):
+    """Yield Wikipedia records category by category.
     
-    print(f"Scraping {len(categories)} Wikipedia categories...")
+    Each category is crawled lazily (articles only, subcategories down to
+    ``depth``). In ``'titles'`` mode up to ``chunk_size`` titles are listed
+    and then fetched in shared 50-title batches; ``'generator'`` mode asks
+    for the members and their page data in the same
+    ``generator=categorymembers`` query, skipping the separate lookups.
+    With a CheckpointStore the crawl position is saved every ``chunk_size``
+    records once the consumer has taken them, so a rerun continues the
+    listing where it stopped.
+    """
+    if mode not in ('titles', 'generator'):
+        raise ValueError(f"Unknown Wikipedia mode '{mode}' (choose from titles, generator)")
+    engine = cached_engine()
+    client = WikipediaClient(engine=engine)
     
+    print(f"Scraping {len(categories)} Wikipedia categories (depth {depth}, {mode} mode)...")
+    
+    total_found = 0
     for category in categories:
-        print(f"\nProcessing category: {category}")
-        titles = get_wikipedia_category_members(category)
-        
-        if not titles:
+        key = f'crawl:{category}'
+        state = checkpoint.get(key) if checkpoint else None
+        if state and state.get('complete'):
+            print(f"  {category}: already crawled")
             continue
+        if state:
+            print(f"  {category}: resuming after {state['count']} titles")
         
-        # Limit titles per category
-        titles = titles[:limit_per_category]
+        crawler = CategoryCrawler(client, category, depth=depth, limit=limit_per_category,
+                                  exclude=NON_PERSON_PREFIXES, state=state,
+                                  page_params=DEFAULT_PAGE_PARAMS if mode == 'generator' else None)
+        found = listed = 0
+        try:
+            while True:
+                chunk = list(islice(crawler, chunk_size))
+                if not chunk:
+                    break
+                listed += len(chunk)
+                if mode == 'generator':
+                    records = [wikipedia_page_to_record(page) for page in chunk]
+                else:
+                    batch = get_enhanced_wikipedia_batch(chunk, client)
+                    records = [batch[title] for title in chunk if batch.get(title)]
+                for record in records:
+                    found += 1
+                    yield record
+                # Reached only once the consumer has taken the whole chunk
+                if checkpoint:
+                    checkpoint.set(key, crawler.state)
+        except Exception as e:
+            print(f"Error crawling category {category}: {e}")
         
-        for idx, title in enumerate(titles, 1):
-            # Filter out non-person pages
-            if title.startswith(('Category:', 'List of', 'Index of', 'Timeline of', 'Women in')):
-                continue
-            
-            print(f"  [{idx}/{len(titles)}] Fetching: {title}")
-            woman_data = get_enhanced_wikipedia_data(title)
-            
-            if woman_data:
-                all_women.append(woman_data)
-            
-            time.sleep(2)  # Respectful delay
+        if not listed and not state:
+            print(f"No members found for category: {category}")
+        else:
+            print(f"  {category}: {found}/{listed} pages")
+        total_found += found
     
-    print(f"\nWikipedia scraping complete. Total entries: {len(all_women)}")
-    return all_women
+    print(f"\nWikipedia scraping complete. Total entries: {total_found} "
+          f"({engine.requests_made} requests)")
+
+def scrape_wikipedia_enhanced(categories, limit_per_category=50, depth=0, mode='titles'):
+    """Scrape Wikipedia with enhanced data structure.
+    
+    ``mode='generator'`` fetches members and page data in one query per
+    batch of members (see iter_wikipedia_enhanced).
+    """
+    return list(iter_wikipedia_enhanced(categories, limit_per_category, depth=depth, mode=mode))
+
+def run_stage(checkpoint, name, records, path, resumable=False):
+    """Stream a stage's records (``records()`` generator) to a JSONL file.
+    
+    A stage a previous run completed is skipped and its file reused. A
+    ``resumable`` stage (one that checkpoints its own progress) which a
+    previous run started is continued by appending; other stages rerun.
+    Returns the number of records in the file.
+    """
+    if checkpoint and name in checkpoint.done('stages'):
+        print(f"[SKIP] {name} stage finished in a previous run, reusing {path}")
+    else:
+        resume = resumable and bool(checkpoint) and name in checkpoint.done('started')
+        if checkpoint:
+            checkpoint.mark_done('started', [name])
+        write_jsonl(records(), path, append=resume)
+        if checkpoint:
+            checkpoint.mark_done('stages', [name])
+    
+    count = sum(1 for _ in read_jsonl(path))
+    print(f"[OK] {count} entries in {path}")
+    return count
 
 def main():
     """Main orchestrator for enhanced scraping."""
@@ -130,60 +193,103 @@ def main():
 
     wikidata_limit = 500
     wikipedia_limit_per_category = 50
+    # Most of these categories are containers: descend one level to reach articles
+    wikipedia_category_depth = 1
+    # 'generator' lists members and fetches their pages in the same queries
+    wikipedia_mode = 'generator'
+
+    # Each stage streams its records to a JSON Lines file as they arrive, so
+    # an interrupted run keeps everything collected so far; the checkpoint
+    # store lets a rerun skip finished stages and resume the others.
+    checkpoint = open_checkpoints('enhanced_scraper')
 
     # Step 1: Scrape Nobel Prize API
-    print("\n[1/4] Scraping Nobel Prize API...")
+    print("\n[1/5] Scraping Nobel Prize API...")
     print("-" * 70)
     nobel_scraper = NobelScraper()
-    nobel_data = nobel_scraper.scrape()
-
-    with open('nobel_heroines.json', 'w', encoding='utf-8') as f:
-        json.dump(nobel_data, f, ensure_ascii=False, indent=2)
-    print(f"[OK] Saved {len(nobel_data)} entries to nobel_heroines.json")
+    nobel_count = run_stage(checkpoint, 'nobel', lambda: nobel_scraper.iter_records(pipelined=True),
+                            'nobel_heroines.jsonl')
 
     # Step 2: Scrape Wikidata
-    print("\n[2/4] Scraping Wikidata...")
+    print("\n[2/5] Scraping Wikidata...")
     print("-" * 70)
     wikidata_scraper = WikidataScraper()
-    wikidata_data = wikidata_scraper.scrape(total_limit=wikidata_limit)
-
-    with open('wikidata_heroines.json', 'w', encoding='utf-8') as f:
-        json.dump(wikidata_data, f, ensure_ascii=False, indent=2)
-    print(f"[OK] Saved {len(wikidata_data)} entries to wikidata_heroines.json")
+    wikidata_count = run_stage(
+        checkpoint, 'wikidata',
+        lambda: wikidata_scraper.iter_records(total_limit=wikidata_limit, checkpoint=checkpoint),
+        'wikidata_heroines.jsonl', resumable=True
+    )
 
     # Step 3: Scrape Wikipedia
-    print("\n[3/4] Scraping Wikipedia...")
+    print("\n[3/5] Scraping Wikipedia...")
     print("-" * 70)
-    wikipedia_data = scrape_wikipedia_enhanced(
-        wikipedia_categories,
-        limit_per_category=wikipedia_limit_per_category
+    wikipedia_count = run_stage(
+        checkpoint, 'wikipedia',
+        lambda: iter_wikipedia_enhanced(wikipedia_categories, limit_per_category=wikipedia_limit_per_category,
+                                        checkpoint=checkpoint, depth=wikipedia_category_depth,
+                                        mode=wikipedia_mode),
+        'wikipedia_heroines.jsonl', resumable=True
     )
 
-    with open('wikipedia_heroines.json', 'w', encoding='utf-8') as f:
-        json.dump(wikipedia_data, f, ensure_ascii=False, indent=2)
-    print(f"[OK] Saved {len(wikipedia_data)} entries to wikipedia_heroines.json")
+    # Structured fields for Nobel/Wikipedia entries whose QID the SPARQL
+    # scrape did not cover, fetched 50 entities per call
+    def entity_records():
+        known_qids = {w.get('wikidata_id') for w in read_jsonl('wikidata_heroines.jsonl')}
+        missing_qids = [w['wikidata_id'] for path in ('nobel_heroines.jsonl', 'wikipedia_heroines.jsonl')
+                        for w in read_jsonl(path)
+                        if w.get('wikidata_id') and w['wikidata_id'] not in known_qids
+                        and not (w.get('birth_date') and w.get('death_date'))]
+        print(f"\nFetching Wikidata entities for {len(set(missing_qids))} known QIDs...")
+        return wikidata_scraper.fetch_entity_records(missing_qids)
+
+    entity_count = run_stage(checkpoint, 'entities', entity_records, 'wikidata_entities.jsonl')
 
-    # Step 4: Merge all data
-    print("\n[4/4] Merging data from all sources...")
+    # Step 4: NWHM biographies from the site's sitemaps; only pages whose
+    # lastmod changed since the last run are fetched
+    print("\n[4/5] Scraping NWHM...")
+    print("-" * 70)
+    nwhm_scraper = NWHMScraper(parse_workers=os.cpu_count())
+    try:
+        nwhm_count = run_stage(checkpoint, 'nwhm', nwhm_scraper.iter_records, 'nwhm_heroines.jsonl')
+    finally:
+        nwhm_scraper.close()
+
+    # Step 5: Merge all data, reading each stage back one record at a time
+    print("\n[5/5] Merging data from all sources...")
     print("-" * 70)
     merger = DataMerger()
-    merged_data = merger.merge_datasets(nobel_data, wikidata_data, wikipedia_data)
+    merged_data = merger.merge_datasets(
+        read_jsonl('nobel_heroines.jsonl'),
+        read_jsonl('wikidata_heroines.jsonl'),
+        read_jsonl('wikipedia_heroines.jsonl'),
+        read_jsonl('wikidata_entities.jsonl'),
+        read_jsonl('nwhm_heroines.jsonl'),
+    )
+
+    merger.save_to_json('unsung_heroines_data.json', canonical=True)
+    merger.export_bundle()
 
-    merger.save_to_json('unsung_heroines_data.json')
+    # The run is complete: the next one starts from scratch
+    if checkpoint:
+        checkpoint.clear()
 
     # Print statistics
     print("\n" + "="*70)
     print("SCRAPING COMPLETE - Statistics")
     print("="*70)
-    print(f"Nobel entries:       {len(nobel_data)}")
-    print(f"Wikidata entries:    {len(wikidata_data)}")
-    print(f"Wikipedia entries:   {len(wikipedia_data)}")
-    raw_total = len(nobel_data) + len(wikidata_data) + len(wikipedia_data)
+    print(f"Nobel entries:       {nobel_count}")
+    print(f"Wikidata entries:    {wikidata_count}")
+    print(f"Wikipedia entries:   {wikipedia_count}")
+    print(f"Entity lookups:      {entity_count}")
+    print(f"NWHM entries:        {nwhm_count}")
+    raw_total = nobel_count + wikidata_count + wikipedia_count + entity_count + nwhm_count
     print(f"Total raw entries:   {raw_total}")
     print(f"Merged unique women: {len(merged_data)}")
     print(f"Duplicates removed:  {raw_total - len(merged_data)}")
     images_count = sum(1 for w in merged_data if w.get('image'))
     print(f"Entries with images: {images_count}/{len(merged_data)}")
+    print(f"HTTP cache:          {cache_stats()}")
+    print(f"Request rates:       {limiter_stats()}")
     print("="*70)
     
     # Print sample entry with sources
@@ -198,7 +304,6 @@ def main():
             print(f"  - {source.get('name')}: {source.get('url')}")
     
     print("\n[OK] All data saved to unsung_heroines_data.json")
-    print("Note: To add NWHM data, manually collect URLs and run nwhm_scraper.py")
 
 if __name__ == "__main__":
     main()
@@ -1,25 +1,43 @@
 """
 Bio Enrichment Script — The Unsung Heroines
 Finds entries with thin biographies and fills them in from Wikipedia.
-Also backfills missing images where possible.
+Also checks every image (image_pipeline.py), and backfills missing or broken
+images where possible.
 Run this whenever data quality needs a refresh.
 """
 
+import hashlib
 import json
 import requests
-import time
 import sys
 from datetime import datetime
 
+from checkpoint import open_checkpoints
+from data_merger import export_bundle, write_canonical_json
+from fetch_engine import FetchEngine, limiter_stats
+from http_cache import cache_stats, install_cache
+from image_pipeline import process_images
+from wikipedia_client import SUMMARY_PARAMS, WikipediaClient, title_from_url
+
 sys.stdout.reconfigure(encoding="utf-8", errors="replace")
 
 WIKI_API   = "https://en.wikipedia.org/w/api.php"
 USER_AGENT = "TheUnsungHeroines/2.0 (Educational Project)"
 MIN_BIO_LEN = 300   # entries shorter than this get re-fetched
-SLEEP_SECS  = 2.5   # polite delay between Wikipedia calls
+CHUNK_SIZE  = 200   # entries checkpointed together
+STATE_FILE  = "enrich_state.json"   # article revision last enriched from, per entry
+SEARCH_RETRY_DAYS = 30   # how long a "not on Wikipedia" result is trusted
 
 session = requests.Session()
 session.headers.update({"User-Agent": USER_AGENT})
+install_cache(session)
+# Requests run concurrently; the engine keeps them within Wikipedia's rate budget
+engine = FetchEngine(session)
+wiki = WikipediaClient(engine=engine)
+# Revision checks, and fetches whose revision is saved, must see the live
+# article, so they bypass the HTTP cache
+# (the rate limits are per host and still shared)
+live_wiki = WikipediaClient()
 
 
 def current_bio(entry):
@@ -31,84 +49,155 @@ def wikipedia_title_from_sources(entry):
     for src in entry.get("sources", []):
         url = src.get("url", "")
         if "en.wikipedia.org/wiki/" in url:
-            raw = url.split("/wiki/")[-1]
-            return requests.utils.unquote(raw).replace("_", " ")
+            return title_from_url(url)
     return None
 
 
-def wikipedia_search(name, retries=3):
-    """Search Wikipedia for a person by name. Returns the best-matching page title,
-    or None if nothing credible is found."""
-    for attempt in range(retries):
-        try:
-            resp = session.get(
-                WIKI_API,
-                params={
-                    "action":  "query",
-                    "format":  "json",
-                    "list":    "search",
-                    "srsearch": name,
-                    "srnamespace": 0,
-                    "srlimit": 1,
-                },
-                timeout=15,
-            )
-            if resp.status_code == 429:
-                wait = 10 * (2 ** attempt)
-                print(f"    Rate-limited — waiting {wait}s…")
-                time.sleep(wait)
-                continue
-            resp.raise_for_status()
-            hits = resp.json().get("query", {}).get("search", [])
-            if not hits:
-                return None
-            result_title = hits[0]["title"]
-            # Accept if names share meaningful overlap (avoids total mismatches)
-            name_words  = set(name.lower().split())
-            title_words = set(result_title.lower().split())
-            if name_words & title_words:
-                return result_title
-            return None
-        except Exception as exc:
-            print(f"    Search warning: {exc}")
-            return None
+async def wikipedia_search_async(name):
+    """Coroutine version of :func:`wikipedia_search`; request errors propagate."""
+    resp = await engine.get(
+        WIKI_API,
+        params={
+            "action":  "query",
+            "format":  "json",
+            "list":    "search",
+            "srsearch": name,
+            "srnamespace": 0,
+            "srlimit": 1,
+        },
+        timeout=15,
+    )
+    resp.raise_for_status()
+    hits = resp.json()["query"]["search"]
+    if not hits:
+        return None
+    result_title = hits[0]["title"]
+    # Accept if names share meaningful overlap (avoids total mismatches)
+    name_words  = set(name.lower().split())
+    title_words = set(result_title.lower().split())
+    if name_words & title_words:
+        return result_title
     return None
 
 
-def fetch_wikipedia(title, retries=3):
+def wikipedia_search(name):
+    """Search Wikipedia for a person by name. Returns the best-matching page title,
+    or None if nothing credible is found (or the search failed)."""
+    try:
+        return engine.run(wikipedia_search_async(name))
+    except Exception as exc:
+        print(f"    Search warning: {exc}")
+        return None
+
+
+def fetch_wikipedia_batch(titles):
+    """Return {title: (extract, thumbnail_url)} for many article titles at once.
+
+    Titles are sent 50 per request; missing articles map to (None, None).
+    """
+    return wiki.fetch_summaries(titles)
+
+
+def fetch_wikipedia(title):
     """Return (extract, thumbnail_url) for a Wikipedia article title."""
-    for attempt in range(retries):
-        try:
-            resp = session.get(
-                WIKI_API,
-                params={
-                    "action":      "query",
-                    "format":      "json",
-                    "prop":        "extracts|pageimages",
-                    "titles":      title,
-                    "exintro":     True,
-                    "explaintext": True,
-                    "pithumbsize": 500,
-                },
-                timeout=15,
-            )
-            if resp.status_code == 429:
-                wait = 10 * (2 ** attempt)
-                print(f"    Rate-limited — waiting {wait}s…")
-                time.sleep(wait)
-                continue
-            resp.raise_for_status()
-            page = next(iter(resp.json()["query"]["pages"].values()))
-            if page.get("missing"):
-                return None, None
-            return page.get("extract") or None, page.get("thumbnail", {}).get("source")
-        except Exception as exc:
-            print(f"    Warning: {exc}")
-            return None, None
-    return None, None
-
-
-def enrich(data):
+    return fetch_wikipedia_batch([title]).get(title, (None, None))
+
+
+def fetch_revisions(titles):
+    """Return {title: latest revision id or None} with cheap batched prop=info queries."""
+    pages = live_wiki.query_titles(titles, prop="info")
+    return {title: page.get("lastrevid") if page else None for title, page in pages.items()}
+
+
+def load_state(path=STATE_FILE):
+    """Load {entry key: {"title", "lastrevid", "extract_length", "image", "checked"}}
+    saved by earlier runs."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=0, sort_keys=True)
+
+
+def offers_more(entry, known):
+    """True if the article recorded in ``known`` has a longer bio or an image
+    the entry lacks (e.g. the dataset was rebuilt from the scrapers since).
+
+    State saved without the article's content counts as offering more.
+    """
+    if "extract_length" not in known:
+        return True
+    bio = len(current_bio(entry))
+    return ((bio < MIN_BIO_LEN and known["extract_length"] > bio)
+            or (not entry.get("image") and bool(known.get("image"))))
+
+
+def skip_unchanged(entries, state):
+    """Return the entries worth fetching again, given the saved revision state.
+
+    An entry is skipped when its article's latest revision is the one it was
+    last enriched from and the entry already holds what that revision
+    offered, or when a recent check found no article for it.
+    """
+    today = datetime.now()
+    checked = {}
+    todo = []
+    for e in entries:
+        known = state.get(entry_key(e))
+        if not known:
+            todo.append(e)
+        elif known.get("title") and known.get("lastrevid"):
+            if offers_more(e, known):
+                todo.append(e)
+            else:
+                checked[id(e)] = (e, known)
+        elif (today - datetime.strptime(known["checked"], "%Y-%m-%d")).days >= SEARCH_RETRY_DAYS:
+            todo.append(e)
+
+    revisions = fetch_revisions([known["title"] for _, known in checked.values()]) if checked else {}
+    for e, known in checked.values():
+        if revisions.get(known["title"]) != known.get("lastrevid"):
+            todo.append(e)
+    return todo
+
+
+def entry_key(entry):
+    """Stable identifier for an entry, used to checkpoint enrichment progress."""
+    return entry.get("id") or entry.get("wikidata_id") or entry.get("name", "?")
+
+
+# Fields enrich_entries may change; saved per entry so a rerun can restore them
+PATCH_FIELDS = ("biography", "image", "image_credit", "image_width", "image_height",
+                "sources", "last_updated")
+
+
+def enrich(data, checkpoint=None, chunk_size=CHUNK_SIZE, state=None):
+    """Enrich thin or image-less entries in place; returns (bios, images) updated.
+
+    Entries are processed ``chunk_size`` at a time. With a CheckpointStore,
+    each finished chunk is recorded (with the fields it changed), so a rerun
+    after an interruption restores that work and skips those entries.
+    With a revision ``state`` dict (see load_state), entries whose article
+    has not changed since they were last enriched are skipped, and the
+    state is updated with what this run fetched.
+    """
+    done = set()
+    if checkpoint:
+        done = checkpoint.done("enriched")
+        patches = checkpoint.cursors("patch:")
+        for e in data:
+            patch = patches.get(f"patch:{entry_key(e)}")
+            if patch:
+                e.update(patch)
+        if done:
+            print(f"Resuming: {len(done)} entries processed by an interrupted run "
+                  f"({len(patches)} updated)")
+
     need_bio   = [e for e in data if len(current_bio(e)) < MIN_BIO_LEN]
     need_image = [e for e in data if not e.get("image")]
 
@@ -121,22 +210,70 @@ def enrich(data):
     print(f"Unique entries to process       : {len(targets)}")
     print()
 
-    updated_bio   = 0
-    updated_image = 0
+    entries = [e for e in targets.values() if entry_key(e) not in done]
+    if state is not None:
+        before = len(entries)
+        entries = skip_unchanged(entries, state)
+        print(f"Unchanged since last enrichment : {before - len(entries)}")
+    updated_bio = updated_image = 0
+    for start in range(0, len(entries), chunk_size):
+        chunk = entries[start:start + chunk_size]
+        if len(entries) > chunk_size:
+            print(f"--- Entries {start + 1}-{start + len(chunk)} of {len(entries)} ---")
+        before = [{f: e.get(f) for f in PATCH_FIELDS} for e in chunk]
+        bios, images = enrich_entries(chunk, state)
+        updated_bio += bios
+        updated_image += images
+        if checkpoint:
+            for e, old in zip(chunk, before):
+                patch = {f: e.get(f) for f in PATCH_FIELDS}
+                if patch != old:
+                    checkpoint.set(f"patch:{entry_key(e)}", patch)
+            checkpoint.mark_done("enriched", [entry_key(e) for e in chunk])
+
+    return updated_bio, updated_image
 
-    for idx, entry in enumerate(targets.values(), 1):
-        name  = entry.get("name", "?")
-        title = wikipedia_title_from_sources(entry)
 
+def enrich_entries(entries, state=None):
+    """Search, fetch and apply Wikipedia data for a list of entries.
+
+    With a revision ``state`` dict, the article (or "not found") each entry
+    was checked against is recorded, and remembered titles save a search.
+    State is only written for answers from the API; an entry whose search
+    or fetch failed keeps its old state and is tried again next run.
+    """
+    state = {} if state is None else state
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    # Pass 1: work out which Wikipedia article belongs to each entry,
+    # searching concurrently by name where the sources don't link one
+    titles  = [wikipedia_title_from_sources(e) or state.get(entry_key(e), {}).get("title")
+               for e in entries]
+    unlinked = [i for i, title in enumerate(titles) if not title]
+    print(f"Searching Wikipedia for {len(unlinked)} entries without an article link...")
+    found = engine.map(wikipedia_search_async, [entries[i].get("name", "?") for i in unlinked])
+    failed = set()
+    for i, title in zip(unlinked, found):
+        if isinstance(title, Exception):
+            print(f"    Search warning ({entries[i].get('name', '?')}): {title}")
+            failed.add(i)
+            title = None
+        titles[i] = title
+    searched = set(unlinked)
+
+    to_fetch = []
+    for idx, (entry, title) in enumerate(zip(entries, titles), 1):
+        name = entry.get("name", "?")
+
+        if idx - 1 in failed:
+            print(f"[{idx}/{len(entries)}] SKIP (search failed, retried next run): {name}")
+            continue
         if not title:
-            # Fall back to searching Wikipedia by name
-            title = wikipedia_search(name)
-            if title:
-                print(f"[{idx}/{len(targets)}] Search found '{title}' for: {name}")
-            else:
-                print(f"[{idx}/{len(targets)}] SKIP (not found on Wikipedia): {name}")
-                continue
-            time.sleep(SLEEP_SECS)
+            print(f"[{idx}/{len(entries)}] SKIP (not found on Wikipedia): {name}")
+            state[entry_key(entry)] = {"title": None, "checked": today}
+            continue
+        if idx - 1 in searched:
+            print(f"[{idx}/{len(entries)}] Search found '{title}' for: {name}")
 
         bio_short = len(current_bio(entry)) < MIN_BIO_LEN
         img_missing = not entry.get("image")
@@ -144,8 +281,38 @@ def enrich(data):
         if not bio_short and not img_missing:
             continue   # nothing to do
 
-        print(f"[{idx}/{len(targets)}] Fetching: {name}  ({title})")
-        extract, image_url = fetch_wikipedia(title)
+        to_fetch.append((entry, title))
+
+    # Pass 2: fetch every article in batched multi-title requests, with the
+    # revision each extract comes from. The revision is saved to state, so
+    # this must be the live article, not a cached copy of an older one
+    print(f"\nFetching {len(to_fetch)} articles in batches of {live_wiki.BATCH_SIZE}...")
+    pages = live_wiki.query_titles([title for _, title in to_fetch],
+                              **dict(SUMMARY_PARAMS, prop=SUMMARY_PARAMS["prop"] + "|info"))
+    fetched = {title: (page.get("extract") or None, page.get("thumbnail", {}).get("source")) if page
+               else (None, None) for title, page in pages.items()}
+
+    # Pass 3: apply the results
+    updated_bio   = 0
+    updated_image = 0
+
+    for idx, (entry, title) in enumerate(to_fetch, 1):
+        name = entry.get("name", "?")
+        bio_short = len(current_bio(entry)) < MIN_BIO_LEN
+        img_missing = not entry.get("image")
+
+        print(f"[{idx}/{len(to_fetch)}] {name}  ({title})")
+        if title not in pages:
+            print("    Fetch failed, retried next run")
+            continue
+        extract, image_url = fetched[title]
+        page = pages[title]
+        if page is None:
+            state[entry_key(entry)] = {"title": None, "checked": today}   # no such article
+        elif page.get("lastrevid"):
+            state[entry_key(entry)] = {"title": title, "lastrevid": page["lastrevid"],
+                                       "extract_length": len(extract or ""), "image": image_url,
+                                       "checked": today}
 
         if bio_short and extract and len(extract) > len(current_bio(entry)):
             entry["biography"] = extract
@@ -167,7 +334,6 @@ def enrich(data):
             print(f"    Image backfilled")
 
         entry["last_updated"] = datetime.now().strftime("%Y-%m-%d")
-        time.sleep(SLEEP_SECS)
 
     return updated_bio, updated_image
 
@@ -176,16 +342,42 @@ def main():
     input_file  = "unsung_heroines_data.json"
     output_file = "unsung_heroines_data.json"
 
-    with open(input_file, encoding="utf-8") as f:
-        data = json.load(f)
+    with open(input_file, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
 
     print(f"Loaded {len(data)} entries from {input_file}")
     print("=" * 60)
 
-    updated_bio, updated_image = enrich(data)
+    # Broken images are cleared first so enrich() backfills them, even from
+    # an article that has not changed
+    state = load_state()
+    had_image = [bool(e.get("image")) for e in data]
+    process_images(data, engine)
+    for e, had in zip(data, had_image):
+        if had and not e.get("image"):
+            state.pop(entry_key(e), None)
+    print("=" * 60)
+
+    # Saved patches only apply to the dataset they were made from
+    checkpoint = open_checkpoints("enrich_bios")
+    if checkpoint:
+        checkpoint.bind(hashlib.sha256(raw).hexdigest())
+    images_before = [e.get("image") for e in data]
+    updated_bio, updated_image = enrich(data, checkpoint, state=state)
+
+    # Normalise and check whatever the backfill added
+    print()
+    backfilled = [e for e, before in zip(data, images_before) if e.get("image") and e["image"] != before]
+    process_images(backfilled, engine)
+
+    data = write_canonical_json(data, output_file)
+    export_bundle(data)
+    save_state(state)
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # Finished: the next run starts over
+    if checkpoint:
+        checkpoint.clear()
 
     print()
     print("=" * 60)
@@ -193,6 +385,8 @@ def main():
     print(f"Images added  : {updated_image}")
     images_total = sum(1 for e in data if e.get("image"))
     print(f"Total with images: {images_total}/{len(data)}")
+    print(f"HTTP cache: {cache_stats()}")
+    print(f"Request rates: {limiter_stats()}")
     print(f"Saved to {output_file}")
 
 
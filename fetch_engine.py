@@ -0,0 +1,270 @@
+"""
+Concurrent fetch engine for The Unsung Heroines
+Runs blocking ``requests`` calls on worker threads under asyncio so network
+latency overlaps, while an adaptive token bucket per host keeps every source
+within its politeness budget: the rate creeps up while responses are healthy,
+is halved on 429/503 or a Wikimedia maxlag error, and Retry-After pauses the
+whole host.
+"""
+
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from replay import install_harness, rate_scale
+
+USER_AGENT = "TheUnsungHeroines/2.0 (Educational Project)"
+
+# Starting and maximum requests per second, burst size and simultaneous
+# requests for each host we talk to. Values follow each operator's published
+# guidance (Wikimedia: keep API clients slow and mostly serial, send maxlag;
+# WDQS: at most 5 parallel queries; NWHM robots.txt: crawl delay of a few
+# seconds, so its rate never adapts upwards — a stricter Crawl-delay read at
+# run time lowers it further, and slow pages may still overlap).
+HOST_POLICIES = {
+    "en.wikipedia.org": {"rate": 1.0, "max_rate": 5.0, "burst": 1, "concurrency": 2, "maxlag": 5},
+    "www.wikidata.org": {"rate": 1.0, "max_rate": 5.0, "burst": 1, "concurrency": 2, "maxlag": 5},
+    "query.wikidata.org": {"rate": 0.5, "max_rate": 1.0, "burst": 1, "concurrency": 2},
+    "commons.wikimedia.org": {"rate": 2.0, "max_rate": 5.0, "burst": 2, "concurrency": 4, "maxlag": 5},
+    "upload.wikimedia.org": {"rate": 5.0, "max_rate": 10.0, "burst": 5, "concurrency": 4},
+    "api.nobelprize.org": {"rate": 2.0, "max_rate": 5.0, "burst": 2, "concurrency": 4},
+    "womenshistory.org": {"rate": 1 / 3, "max_rate": 1 / 3, "burst": 1, "concurrency": 4},
+}
+DEFAULT_POLICY = {"rate": 1.0, "max_rate": 2.0, "burst": 1, "concurrency": 2}
+
+RETRY_STATUSES = (429, 503)
+
+
+def match_host(table, host, default=None):
+    """Look a host up in a per-host table, falling back to parent domains
+    (www.x.org -> x.org)."""
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        value = table.get(".".join(parts[i:]))
+        if value is not None:
+            return value
+    return default
+
+
+def host_policy(host):
+    """Return the rate policy for a host."""
+    return match_host(HOST_POLICIES, host, DEFAULT_POLICY)
+
+
+def is_maxlag_error(resp):
+    """True for a MediaWiki "maxlag" refusal (HTTP 200 with a lag header)."""
+    return "X-Database-Lag" in resp.headers
+
+
+def retry_after_seconds(value, default):
+    """Parse a Retry-After header (seconds or HTTP date); fall back to default."""
+    if not value:
+        return default
+    if value.strip().isdigit():
+        return int(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Adaptive token bucket rate limiter (GCRA virtual scheduling + AIMD).
+
+    Every healthy response raises the rate by a tenth of the starting rate,
+    up to ``max_rate``; a throttling response halves it, down to
+    ``min_rate``. Holds no asyncio primitives, so one bucket can be shared
+    by every event loop and engine in the process: all requests to a host
+    draw from it.
+    """
+
+    DECREASE = 0.5
+
+    def __init__(self, rate, burst=1, max_rate=None, min_rate=None):
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = rate if max_rate is None else max_rate
+        self.min_rate = rate / 8 if min_rate is None else min_rate
+        self.step = rate / 10
+        self.successes = 0
+        self.throttled = 0
+        self._tat = 0.0   # theoretical arrival time of the next request
+
+    def reserve(self):
+        """Claim the next slot and return how many seconds to wait for it."""
+        now = time.monotonic()
+        interval = 1.0 / self.rate
+        tat = max(self._tat, now)
+        wait = max(0.0, tat - (self.burst - 1) * interval - now)
+        self._tat = tat + interval
+        return wait
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold back every request to this host for ``seconds`` from now."""
+        self._tat = max(self._tat, time.monotonic() + seconds)
+
+    def succeed(self):
+        """Additive increase after a healthy response."""
+        self.successes += 1
+        self.rate = min(self.max_rate, self.rate + self.step)
+
+    def throttle(self, seconds):
+        """Multiplicative decrease after a 429/503/maxlag, then pause the host."""
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate * self.DECREASE)
+        self.pause(seconds)
+
+
+# One bucket per host for the whole process, shared across scrapers
+_BUCKETS = {}
+
+
+def bucket_for(host):
+    """Return the shared token bucket for a host."""
+    if host not in _BUCKETS:
+        policy = host_policy(host)
+        # Offline runs against the replay stub may scale every budget up
+        scale = rate_scale()
+        max_rate = policy.get("max_rate")
+        _BUCKETS[host] = TokenBucket(policy["rate"] * scale, policy["burst"],
+                                     max_rate * scale if max_rate else None)
+    return _BUCKETS[host]
+
+
+def limit_host(host, rate):
+    """Cap a host's rate (e.g. to a robots.txt Crawl-delay) for the whole process."""
+    bucket = bucket_for(host)
+    bucket.max_rate = min(bucket.max_rate, rate)
+    bucket.rate = min(bucket.rate, rate)
+    bucket.min_rate = min(bucket.min_rate, rate)
+    return bucket
+
+
+def limiter_stats():
+    """Return {host: current rate, healthy and throttled response counts}."""
+    return {host: {"rate": round(bucket.rate, 3), "ok": bucket.successes, "throttled": bucket.throttled}
+            for host, bucket in _BUCKETS.items()}
+
+
+class FetchEngine:
+    """Bounded-concurrency HTTP fetcher with per-host rate limiting."""
+
+    def __init__(self, session=None, max_concurrency=8, retries=3):
+        if retries < 1:
+            raise ValueError(f"retries must be at least 1 (one attempt), got {retries}")
+        if session is None:
+            session = requests.Session()
+            session.headers.update({"User-Agent": USER_AGENT})
+        # Record/replay transport when HEROINES_RECORD or HEROINES_STUB is set
+        self.session = install_harness(session)
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.requests_made = 0
+        self._semaphores = {}
+
+    def _semaphore(self, key, size):
+        """Return a semaphore bound to the running loop (created on first use)."""
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get((loop, key))
+        if sem is None:
+            sem = self._semaphores[(loop, key)] = asyncio.Semaphore(size)
+        return sem
+
+    async def request(self, method, url, **kwargs):
+        """Send one request, retrying 429/503 and maxlag refusals after the
+        server's Retry-After.
+
+        Requests to MediaWiki APIs carry the host's ``maxlag``. Connection
+        errors propagate; the final response is returned as-is (callers
+        still call ``raise_for_status``).
+        """
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        policy = host_policy(host)
+        bucket = bucket_for(host)
+        kwargs.setdefault("timeout", 30)
+        if policy.get("maxlag") and parts.path.endswith("api.php"):
+            kwargs["params"] = {**(kwargs.get("params") or {}), "maxlag": policy["maxlag"]}
+
+        async with self._semaphore(None, self.max_concurrency):
+            async with self._semaphore(host, policy["concurrency"]):
+                for attempt in range(self.retries):
+                    await bucket.acquire()
+                    resp = await asyncio.to_thread(self.session.request, method, url, **kwargs)
+                    self.requests_made += 1
+                    if resp.status_code not in RETRY_STATUSES and not is_maxlag_error(resp):
+                        # Only answers from the server say anything about its load
+                        if not getattr(resp, "from_cache", False):
+                            bucket.succeed()
+                        return resp
+                    wait = retry_after_seconds(resp.headers.get("Retry-After"), 5 * (2 ** attempt))
+                    bucket.throttle(wait)
+                    if attempt == self.retries - 1:
+                        return resp
+                    reason = "maxlag" if is_maxlag_error(resp) else resp.status_code
+                    print(f"  {host} answered {reason}; pausing host for {wait:.0f}s "
+                          f"(rate now {bucket.rate:.2f}/s)...")
+
+    async def get(self, url, **kwargs):
+        """GET a URL under the host's rate limit."""
+        return await self.request("GET", url, **kwargs)
+
+    async def get_json(self, url, **kwargs):
+        """GET a URL and return its decoded JSON body (raises on HTTP errors)."""
+        resp = await self.get(url, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    # ------------------------------------------------------------------
+    # Synchronous entry points for the (synchronous) scrapers
+    # ------------------------------------------------------------------
+
+    def run(self, coro):
+        """Run a coroutine to completion on a fresh event loop."""
+        self._semaphores = {}
+        return asyncio.run(coro)
+
+    def iterate(self, agen):
+        """Yield the items of an async generator from synchronous code.
+
+        The event loop runs whenever the caller asks for the next item, so
+        tasks the generator has started (e.g. prefetching the next page)
+        keep progressing between items.
+        """
+        self._semaphores = {}
+        loop = asyncio.new_event_loop()
+
+        async def step():
+            return await agen.__anext__()
+
+        try:
+            while True:
+                try:
+                    item = loop.run_until_complete(step())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            loop.run_until_complete(agen.aclose())
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+
+    def map(self, func, items):
+        """Run ``await func(item)`` for every item concurrently; results keep input order.
+
+        An exception raised for one item is returned in its slot instead of
+        cancelling the others.
+        """
+        async def gather():
+            return await asyncio.gather(*(func(item) for item in items), return_exceptions=True)
+
+        return self.run(gather())
@@ -0,0 +1,316 @@
+"""
+Builds fixtures/cassettes/pipeline.jsonl.gz, the cassette the Offline Pipeline
+workflow replays. Nothing is fetched from the real sites: enhanced_scraper is
+recorded against a local server that answers every source API from the small
+synthetic world below and the NWHM pages in fixtures/nwhm.
+
+Usage:
+    python fixtures/cassettes/build_pipeline.py [CASSETTE]
+"""
+
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from urllib.parse import parse_qsl, quote, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+from replay import RECORD_ENV, SERVER_HEADERS, STUB_ENV, Cassette, StubServer, source_url
+
+CASSETTE = os.path.join(ROOT, "fixtures", "cassettes", "pipeline.jsonl.gz")
+NWHM_PAGES = os.path.join(ROOT, "fixtures", "nwhm")
+ENTITY_PREFIX = "http://www.wikidata.org/entity/"
+JSON = {"Content-Type": "application/json; charset=utf-8"}
+
+# Occupation items and their English labels
+OCCUPATIONS = {"Q170790": "mathematician", "Q36180": "writer", "Q82594": "computer scientist",
+               "Q169470": "physicist", "Q593644": "chemist", "Q1622272": "university teacher",
+               "Q1476215": "human rights activist", "Q15981151": "biologist"}
+
+# The synthetic world: who exists, and which source lists whom
+PEOPLE = [
+    {"name": "Ada Lovelace", "qid": "Q7259", "born": "1815-12-10", "died": "1852-11-27",
+     "occupations": ["Q170790", "Q36180"], "image": "Ada Lovelace portrait.jpg",
+     "extract": "Augusta Ada King, Countess of Lovelace, was an English mathematician and writer "
+                "chiefly known for her work on Charles Babbage's Analytical Engine.",
+     "sparql": True, "categories": ["Women mathematicians"]},
+    {"name": "Grace Hopper", "qid": "Q11641", "born": "1906-12-09", "died": "1992-01-01",
+     "occupations": ["Q82594", "Q170790"], "image": "Commodore Grace M. Hopper, USN (covered).jpg",
+     "extract": "Grace Brewster Hopper was an American computer scientist, mathematician and "
+                "United States Navy rear admiral who devised the theory of machine-independent "
+                "programming languages.",
+     "sparql": True, "categories": ["Women mathematicians", "Women scientists"]},
+    {"name": "Sojourner Truth", "qid": "Q105180", "born": "1797-01-01", "died": "1883-11-26",
+     "occupations": ["Q1476215"], "image": "Sojourner truth c1870.jpg",
+     "extract": "Sojourner Truth was an American abolitionist and activist for African-American "
+                "civil rights, women's rights, and alcohol temperance.",
+     "categories": ["Women activists", "Feminist activists"]},
+    {"name": "Marie Curie", "qid": "Q7186", "born": "1867-11-07", "died": "1934-07-04",
+     "occupations": ["Q169470", "Q593644"], "image": "Marie Curie c. 1920s.jpg",
+     "extract": "Marie Salomea Sklodowska-Curie was a Polish and naturalised-French physicist and "
+                "chemist who conducted pioneering research on radioactivity.",
+     "sparql": True, "categories": ["Women chemists", "Women Nobel laureates"],
+     "nobel": [("1903", "physics", "in recognition of the extraordinary services they have rendered "
+                                   "by their joint researches on the radiation phenomena"),
+               ("1911", "chemistry", "in recognition of her services to the advancement of chemistry "
+                                     "by the discovery of the elements radium and polonium")]},
+    {"name": "Dorothy Crowfoot Hodgkin", "qid": "Q7099", "born": "1910-05-12", "died": "1994-07-29",
+     "occupations": ["Q593644"], "image": "Dorothy Hodgkin Nobel.jpg",
+     "extract": "Dorothy Mary Crowfoot Hodgkin was a British chemist who advanced the technique of "
+                "X-ray crystallography to determine the structure of biomolecules.",
+     "categories": ["Women chemists"],
+     "nobel": [("1964", "chemistry", "for her determinations by X-ray techniques of the structures "
+                                     "of important biochemical substances")]},
+    {"name": "Ada E. Yonath", "qid": "Q7426", "born": "1939-06-22", "died": "",
+     "occupations": ["Q593644", "Q1622272"], "image": "Ada Yonath.jpg",
+     "extract": "Ada E. Yonath is an Israeli crystallographer best known for her pioneering work "
+                "on the structure of the ribosome.",
+     "categories": ["Women Nobel laureates"],
+     "nobel": [("2009", "chemistry", "for studies of the structure and function of the ribosome")]},
+    {"name": "Rosalind Franklin", "qid": "Q7217", "born": "1920-07-25", "died": "1958-04-16",
+     "occupations": ["Q593644", "Q15981151"], "image": "Rosalind Franklin.jpg",
+     "extract": "Rosalind Elsie Franklin was a British chemist and X-ray crystallographer whose "
+                "work was central to the understanding of the molecular structures of DNA.",
+     "categories": ["Women chemists", "Jewish women scientists"]},
+]
+
+# Subcategories reached at depth 1, and a non-biography member the crawler skips
+SUBCATEGORIES = {"Women scientists": ["Women chemists"]}
+COLLECTIONS = {"Women scientists": ["List of female scientists before the 20th century"]}
+
+BY_NAME = {p["name"]: p for p in PEOPLE}
+BY_QID = {p["qid"]: p for p in PEOPLE}
+
+
+def wiki_url(person):
+    return f"https://en.wikipedia.org/wiki/{quote(person['name'].replace(' ', '_'))}"
+
+
+def thumb(person, width=500):
+    name = person["image"].replace(" ", "_")
+    return (f"https://upload.wikimedia.org/wikipedia/commons/thumb/0/00/{quote(name)}/"
+            f"{width}px-{quote(name)}")
+
+
+def wiki_page(person, pageid, params):
+    """A page as the query API returns it for the requested prop modules."""
+    page = {"pageid": pageid, "ns": 0, "title": person["name"]}
+    props = params.get("prop", "").split("|")
+    if "extracts" in props:
+        page["extract"] = person["extract"]
+    if "pageimages" in props:
+        page["thumbnail"] = {"source": thumb(person), "width": 500, "height": 640}
+        page["pageimage"] = person["image"].replace(" ", "_")
+    if "info" in props:
+        page.update(contentmodel="wikitext", pagelanguage="en", fullurl=wiki_url(person),
+                    canonicalurl=wiki_url(person))
+    if "pageprops" in props:
+        page["pageprops"] = {"wikibase_item": person["qid"]}
+    return page
+
+
+def wikipedia(params):
+    if params.get("generator") == "categorymembers":
+        category = params["gcmtitle"].split(":", 1)[1]
+        pages = {}
+        for sub in SUBCATEGORIES.get(category, []):
+            pageid = 900000 + len(pages)
+            pages[str(pageid)] = {"pageid": pageid, "ns": 14, "title": f"Category:{sub}"}
+        for title in COLLECTIONS.get(category, []):
+            pageid = 800000 + len(pages)
+            pages[str(pageid)] = {"pageid": pageid, "ns": 0, "title": title}
+        for i, person in enumerate(PEOPLE):
+            if category in person.get("categories", []):
+                pages[str(1000 + i)] = wiki_page(person, 1000 + i, params)
+        return {"batchcomplete": "", "query": {"pages": pages}} if pages else {"batchcomplete": ""}
+
+    pages = {}
+    for n, title in enumerate(params.get("titles", "").split("|")):
+        person = BY_NAME.get(title)
+        if person:
+            pageid = 1000 + PEOPLE.index(person)
+            pages[str(pageid)] = wiki_page(person, pageid, params)
+        else:
+            pages[str(-1 - n)] = {"ns": 0, "title": title, "missing": ""}
+    return {"batchcomplete": "", "query": {"pages": pages}}
+
+
+def laureate(number, person):
+    given, _, family = person["name"].rpartition(" ")
+    return {
+        "id": str(number), "knownName": {"en": person["name"]},
+        "givenName": {"en": given}, "familyName": {"en": family},
+        "gender": "female",
+        "birth": {"date": person["born"]},
+        "wikipedia": {"slug": person["name"].replace(" ", "_"), "english": wiki_url(person)},
+        "wikidata": {"id": person["qid"], "url": f"https://www.wikidata.org/wiki/{person['qid']}"},
+        "nobelPrizes": [{
+            "awardYear": year, "category": {"en": category.capitalize()},
+            "motivation": {"en": motivation},
+            "links": [{"rel": "external", "href": f"https://www.nobelprize.org/prizes/{category}/{year}/summary/"}],
+        } for year, category, motivation in person["nobel"]],
+    }
+
+
+def nobel(params):
+    laureates = [laureate(n, p) for n, p in enumerate(PEOPLE, 6) if p.get("nobel")]
+    offset, limit = int(params.get("offset", 0)), int(params.get("limit", 25))
+    return {"laureates": laureates[offset:offset + limit],
+            "meta": {"offset": offset, "limit": limit, "count": len(laureates)}}
+
+
+def sparql(params):
+    query = params["query"]
+    after = re.search(r'FILTER\(STR\(\?person\) > "([^"]+)"\)', query)
+    limit = int(re.search(r"LIMIT (\d+)", query).group(1))
+    rows = sorted((ENTITY_PREFIX + p["qid"], p) for p in PEOPLE if p.get("sparql"))
+    rows = [(iri, p) for iri, p in rows if not after or iri > after.group(1)][:limit]
+
+    def literal(value, datatype=None):
+        node = {"type": "literal", "value": value}
+        if datatype:
+            node["datatype"] = datatype
+        return node
+
+    bindings = []
+    for iri, p in rows:
+        binding = {
+            "person": {"type": "uri", "value": iri},
+            "personLabel": dict(literal(p["name"]), **{"xml:lang": "en"}),
+            "birthDate": literal(p["born"] + "T00:00:00Z", "http://www.w3.org/2001/XMLSchema#dateTime"),
+            "occupations": literal("|".join(OCCUPATIONS[o] for o in p["occupations"])),
+            "description": dict(literal(p["extract"].split(" was ", 1)[-1].rstrip(".")), **{"xml:lang": "en"}),
+            "image": {"type": "uri", "value": "http://commons.wikimedia.org/wiki/Special:FilePath/"
+                                              + quote(p["image"].replace(" ", "_"))},
+            "wikipediaUrl": literal(wiki_url(p)),
+        }
+        if p["died"]:
+            binding["deathDate"] = literal(p["died"] + "T00:00:00Z", "http://www.w3.org/2001/XMLSchema#dateTime")
+        bindings.append(binding)
+    head = ["person", "personLabel", "birthDate", "deathDate", "occupations", "description", "image",
+            "wikipediaUrl"]
+    return {"head": {"vars": head}, "results": {"bindings": bindings}}
+
+
+def claim(prop, datatype, value):
+    return {"mainsnak": {"snaktype": "value", "property": prop,
+                         "datavalue": {"value": value, "type": datatype}},
+            "type": "statement", "rank": "normal"}
+
+
+def entity(qid):
+    if qid in OCCUPATIONS:
+        return {"type": "item", "id": qid, "labels": {"en": {"language": "en", "value": OCCUPATIONS[qid]}}}
+    p = BY_QID.get(qid)
+    if p is None:
+        return {"id": qid, "missing": ""}
+
+    def time(date):
+        return {"time": f"+{date}T00:00:00Z", "timezone": 0, "before": 0, "after": 0, "precision": 11,
+                "calendarmodel": "http://www.wikidata.org/entity/Q1985727"}
+
+    claims = {"P569": [claim("P569", "time", time(p["born"]))],
+              "P106": [claim("P106", "wikibase-entityid", {"entity-type": "item", "id": o})
+                       for o in p["occupations"]],
+              "P18": [claim("P18", "string", p["image"])]}
+    if p["died"]:
+        claims["P570"] = [claim("P570", "time", time(p["died"]))]
+    return {"type": "item", "id": qid,
+            "labels": {"en": {"language": "en", "value": p["name"]}},
+            "descriptions": {"en": {"language": "en", "value": p["extract"].split(" was ", 1)[-1].rstrip(".")}},
+            "claims": claims,
+            "sitelinks": {"enwiki": {"site": "enwiki", "title": p["name"], "badges": [], "url": wiki_url(p)}}}
+
+
+def wbgetentities(params):
+    return {"entities": {qid: entity(qid) for qid in params["ids"].split("|")}, "success": 1}
+
+
+def nwhm(path):
+    if path == "/robots.txt":
+        return 200, {"Content-Type": "text/plain"}, (
+            "User-agent: *\nDisallow: /admin/\n\nSitemap: https://www.womenshistory.org/sitemap.xml\n")
+    if path == "/sitemap.xml":
+        urls = "".join(
+            f"<url><loc>https://www.womenshistory.org/education-resources/biographies/{name[:-5]}</loc>"
+            f"<lastmod>2024-03-01</lastmod></url>"
+            for name in sorted(os.listdir(NWHM_PAGES)) if name.endswith(".html"))
+        return 200, {"Content-Type": "application/xml"}, (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>')
+    match = re.fullmatch(r"/education-resources/biographies/([a-z-]+)", path)
+    if match and os.path.exists(os.path.join(NWHM_PAGES, match.group(1) + ".html")):
+        with open(os.path.join(NWHM_PAGES, match.group(1) + ".html"), "rb") as f:
+            return 200, {"Content-Type": "text/html; charset=utf-8"}, f.read()
+    return None
+
+
+def answer(method, url):
+    """Return (status, headers, content) for a request, or None if the world has no answer."""
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+    if parts.hostname == "www.womenshistory.org":
+        return nwhm(parts.path)
+    if parts.hostname == "en.wikipedia.org" and parts.path == "/w/api.php":
+        data = wikipedia(params)
+    elif parts.hostname == "api.nobelprize.org" and parts.path == "/2.1/laureates":
+        data = nobel(params)
+    elif parts.hostname == "query.wikidata.org" and parts.path == "/sparql":
+        data = sparql(params)
+    elif parts.hostname == "www.wikidata.org" and params.get("action") == "wbgetentities":
+        data = wbgetentities(params)
+    else:
+        return None
+    return 200, JSON, json.dumps(data, ensure_ascii=False)
+
+
+class FixtureServer(StubServer):
+    """Stub server that answers from the synthetic world instead of a cassette."""
+
+    def __init__(self):
+        super().__init__(Cassette())
+        self.unknown = []
+
+    def respond(self, method, path, body=None):
+        url = source_url(path)
+        response = answer(method, url)
+        if response is None:
+            self.unknown.append(f"{method} {url}")
+            return 404, JSON, b'{"error": "not in the fixture world"}'
+        status, headers, content = response
+        return status, headers, content.encode("utf-8") if isinstance(content, str) else content
+
+
+def main():
+    target = sys.argv[1] if len(sys.argv) > 1 else CASSETTE
+    with tempfile.TemporaryDirectory() as work, FixtureServer() as server:
+        recording = os.path.join(work, "recording.jsonl")
+        env = dict(os.environ, HEROINES_HTTP_CACHE="off", HEROINES_CHECKPOINTS="off",
+                   HEROINES_RATE_SCALE="100", PYTHONPATH=ROOT)
+        env[STUB_ENV] = server.url
+        env[RECORD_ENV] = recording
+        code = subprocess.call([sys.executable, os.path.join(ROOT, "enhanced_scraper.py")], cwd=work, env=env)
+        if code or server.unknown:
+            for request in server.unknown:
+                print(f"No fixture answer for {request}")
+            sys.exit(code or 1)
+
+        # Sorted by key, without the server's Date and gzipped without a
+        # timestamp: rebuilding gives the same bytes
+        with open(recording, encoding="utf-8") as f:
+            entries = sorted((json.loads(line) for line in f), key=lambda entry: entry["key"])
+        for entry in entries:
+            entry["headers"] = {k: v for k, v in entry["headers"].items() if k.lower() not in SERVER_HEADERS}
+        lines = [json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries]
+    with open(target, "wb") as raw, gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as f:
+        f.write("".join(lines).encode("utf-8"))
+    print(f"Wrote {len(lines)} responses to {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Persistent HTTP cache for The Unsung Heroines
+An SQLite-backed response store mounted on requests.Session objects as a
+transport adapter. Responses are reused while fresh (per-host TTLs), then
+revalidated with ETag / Last-Modified where the server supports it. The store
+is size-bounded with least-recently-used eviction and lives in one file, so CI
+can restore it between runs.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from fetch_engine import match_host
+
+DAY = 24 * 60 * 60
+
+# How long a response may be reused without asking the server again.
+# Article text changes slowly and the full scrape runs monthly; Nobel and
+# SPARQL results feed the weekly job, so they are kept for less than a week.
+DEFAULT_TTLS = {
+    "en.wikipedia.org": 20 * DAY,
+    "www.wikidata.org": 20 * DAY,
+    "query.wikidata.org": 6 * DAY,
+    "api.nobelprize.org": 1 * DAY,
+    "womenshistory.org": 30 * DAY,
+}
+DEFAULT_TTL = 1 * DAY
+
+CACHE_PATH = os.environ.get("HEROINES_HTTP_CACHE", os.path.join(".http_cache", "http_cache.sqlite"))
+CACHE_ENABLED = CACHE_PATH.lower() not in ("off", "0", "false", "")
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key           TEXT PRIMARY KEY,
+    status        INTEGER NOT NULL,
+    headers       TEXT NOT NULL,
+    body          BLOB NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    stored_at     REAL NOT NULL,
+    accessed_at   REAL NOT NULL,
+    size          INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+def normalize_url(url):
+    """Return a cache key for a URL: lowercase scheme/host, sorted query, no fragment."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+class HTTPCache:
+    """SQLite store of HTTP responses with per-host TTLs and LRU eviction."""
+
+    def __init__(self, path=CACHE_PATH, ttls=None, default_ttl=DEFAULT_TTL,
+                 max_bytes=MAX_CACHE_BYTES):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        # Scraper requests arrive from the fetch engine's worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl_for(self, url):
+        """Return the freshness lifetime (seconds) for a URL's host."""
+        return match_host(self.ttls, urlsplit(url).hostname or "", self.default_ttl)
+
+    def get(self, key):
+        """Return the stored entry dict for a key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, etag, last_modified, stored_at "
+                "FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                               (time.time(), key))
+            self._conn.commit()
+        status, headers, body, etag, last_modified, stored_at = row
+        return {
+            "status": status,
+            "headers": json.loads(headers),
+            "body": zlib.decompress(body),
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": stored_at,
+        }
+
+    def set(self, key, response):
+        """Store a response body and headers under a key."""
+        headers = dict(response.headers)
+        body = zlib.compress(response.content)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.status_code, json.dumps(headers), body,
+                 headers.get("ETag"), headers.get("Last-Modified"), now, now, len(body)))
+            self._total_bytes += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, key):
+        """Mark a stored response as fresh again (after a 304)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                               (now, now, key))
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used responses until the store fits max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def stats(self):
+        """Return hit/revalidation/miss counters and the store size."""
+        return {"hits": self.hits, "revalidated": self.revalidated,
+                "misses": self.misses, "bytes": self._total_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter answering GET requests from an HTTPCache.
+
+    Without an explicit cache the shared one is opened on the first request,
+    so merely constructing a scraper never touches the disk.
+    """
+
+    def __init__(self, cache=None, transport=None, **kwargs):
+        super().__init__(**kwargs)
+        self._cache = cache
+        # Adapter that misses are sent through (e.g. replay.HarnessAdapter)
+        self.transport = transport
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = shared_cache()
+        return self._cache
+
+    def _cached_response(self, request, entry):
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"]
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "OK"
+        response.from_cache = True
+        return response
+
+    def _send(self, request, **kwargs):
+        if self.transport is not None:
+            return self.transport.send(request, **kwargs)
+        return super().send(request, **kwargs)
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return self._send(request, **kwargs)
+
+        key = normalize_url(request.url)
+        entry = self.cache.get(key)
+        if entry and time.time() - entry["stored_at"] < self.cache.ttl_for(request.url):
+            self.cache.hits += 1
+            return self._cached_response(request, entry)
+
+        if entry:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._send(request, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.revalidated += 1
+            self.cache.refresh(key)
+            return self._cached_response(request, entry)
+
+        self.cache.misses += 1
+        # A maxlag refusal is also a 200; it must not be replayed later
+        if (response.status_code == 200 and "no-store" not in response.headers.get("Cache-Control", "")
+                and "X-Database-Lag" not in response.headers):
+            self.cache.set(key, response)
+        return response
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def cache_stats():
+    """Return the shared cache's counters, or "off" when caching is disabled."""
+    return shared_cache().stats() if CACHE_ENABLED else "off"
+
+
+def shared_cache():
+    """Return the process-wide cache at CACHE_PATH (opened on first use)."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = HTTPCache()
+    return _shared_cache
+
+
+def install_cache(session, cache=None):
+    """Mount the HTTP cache on a requests.Session and return the session.
+
+    Set HEROINES_HTTP_CACHE=off to disable caching.
+    """
+    if not CACHE_ENABLED:
+        return session
+    for prefix in ("https://", "http://"):
+        current = session.adapters.get(prefix)
+        if isinstance(current, CachingAdapter):
+            continue
+        # A custom transport already mounted (record/replay) moves under the cache
+        transport = current if type(current) is not HTTPAdapter else None
+        session.mount(prefix, CachingAdapter(cache, transport))
+    return session
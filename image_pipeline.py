@@ -0,0 +1,156 @@
+"""
+Image pipeline for The Unsung Heroines
+Brings every entry's portrait to one shape before the dataset ships: Wikimedia
+images (Special:FilePath redirects and thumbnails of any size) are resolved
+through the imageinfo API to a final upload.wikimedia.org thumbnail of a
+single width, with its pixel size recorded for the front end. Every image is
+then checked with a concurrent HEAD request; broken ones are removed so the
+enrichment step can backfill them. Only a definite answer removes an image
+(the file does not exist, or its URL returns 404/410); on errors and
+throttling the current image is kept for the next run to check.
+"""
+
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from fetch_engine import FetchEngine
+from wikipedia_client import WikipediaClient
+
+# HEAD statuses that mean the image is gone for good
+GONE_STATUSES = (404, 410)
+
+# One width for every portrait; 500px is a standard Wikimedia thumbnail step,
+# so the thumbnails are usually already rendered and cached
+THUMB_WIDTH = 500
+
+IMAGEINFO_PARAMS = {
+    "prop": "imageinfo",
+    "iiprop": "url|size",
+    "iiurlwidth": THUMB_WIDTH,
+}
+
+
+def wikimedia_file_name(url):
+    """Return the file name behind a Wikimedia image URL, or None for other hosts.
+
+    Understands Special:FilePath links (path or ``title=`` form) and
+    upload.wikimedia.org originals and thumbnails.
+    """
+    parts = urlsplit(url or "")
+    host = parts.hostname or ""
+    path = unquote(parts.path)
+
+    if "Special:FilePath" in path:
+        return path.split("Special:FilePath/", 1)[-1].replace("_", " ") or None
+    title = parse_qs(parts.query).get("title", [""])[0]
+    if title.startswith("Special:FilePath/"):
+        return title.split("/", 1)[-1].replace("_", " ") or None
+
+    if host == "upload.wikimedia.org":
+        segments = path.split("/")
+        if "thumb" in segments:
+            # /wikipedia/commons/thumb/a/ab/<file>/<width>px-<file>
+            index = segments.index("thumb") + 3
+        else:
+            # /wikipedia/commons/a/ab/<file>
+            index = len(segments) - 1
+        if index < len(segments):
+            return segments[index].replace("_", " ") or None
+    return None
+
+
+class ImagePipeline:
+    """Normalises and checks the ``image`` of many entries at once."""
+
+    def __init__(self, engine=None, width=THUMB_WIDTH):
+        self.engine = engine or FetchEngine()
+        self.client = WikipediaClient(engine=self.engine)
+        self.width = width
+
+    def resolve(self, file_names):
+        """Return {file name: imageinfo dict or None} via batched imageinfo queries.
+
+        File pages are looked up on en.wikipedia.org, which also answers for
+        Commons files; files that do not exist map to None. Names whose
+        lookup failed, or that came back without imageinfo, are left out.
+        """
+        pages = self.client.query_titles([f"File:{name}" for name in file_names],
+                                         **dict(IMAGEINFO_PARAMS, iiurlwidth=self.width))
+        info = {}
+        for name in file_names:
+            title = f"File:{name}"
+            if title not in pages:
+                continue
+            page = pages[title]
+            if page is None:
+                info[name] = None
+            elif page.get("imageinfo"):
+                info[name] = page["imageinfo"][0]
+        return info
+
+    async def _is_live(self, url):
+        resp = await self.engine.request("HEAD", url, allow_redirects=True, timeout=15)
+        if resp.status_code < 400:
+            return True
+        return False if resp.status_code in GONE_STATUSES else None
+
+    def check(self, urls):
+        """Return {url: True/False/None} from concurrent HEAD requests.
+
+        False means the URL is gone (404/410); errors, throttling and other
+        refusals give None (unknown).
+        """
+        urls = list(dict.fromkeys(urls))
+        results = self.engine.map(self._is_live, urls)
+        return {url: result if isinstance(result, bool) else None for url, result in zip(urls, results)}
+
+    def process(self, entries):
+        """Normalise and verify images in place; returns counters.
+
+        Wikimedia images become a ``width``-pixel upload.wikimedia.org
+        thumbnail with ``image_width``/``image_height``. Images whose file
+        no longer exists or whose URL returns 404/410 are cleared (with
+        their credit and size) so they are never shipped; images that could
+        not be checked are left as they are.
+        """
+        with_image = [e for e in entries if e.get("image")]
+        files = {id(e): wikimedia_file_name(e["image"]) for e in with_image}
+        names = sorted({name for name in files.values() if name})
+        print(f"Resolving {len(names)} Wikimedia images at {self.width}px...")
+        info = self.resolve(names) if names else {}
+
+        stats = {"checked": len(with_image), "normalized": 0, "broken": 0, "unverified": 0}
+        for entry in with_image:
+            name = files[id(entry)]
+            if not name or name not in info:
+                continue
+            image = info[name]
+            if image is None:
+                entry["image"] = None   # file deleted or renamed away
+                continue
+            url = image.get("thumburl") or image.get("url")
+            if url != entry["image"]:
+                stats["normalized"] += 1
+            entry["image"] = url
+            entry["image_width"] = image.get("thumbwidth") or image.get("width")
+            entry["image_height"] = image.get("thumbheight") or image.get("height")
+
+        live = self.check(e["image"] for e in with_image if e.get("image"))
+        for entry in with_image:
+            if entry.get("image") and live.get(entry["image"]) is None:
+                stats["unverified"] += 1
+            if not entry.get("image") or live.get(entry["image"]) is False:
+                print(f"  Broken image removed: {entry.get('name', '?')}")
+                entry["image"] = None
+                entry["image_credit"] = ""
+                entry.pop("image_width", None)
+                entry.pop("image_height", None)
+                stats["broken"] += 1
+
+        print(f"Images checked: {stats['checked']}, normalised: {stats['normalized']}, "
+              f"broken: {stats['broken']}, unverified (kept): {stats['unverified']}")
+        return stats
+
+
+def process_images(entries, engine=None, width=THUMB_WIDTH):
+    """Run the image pipeline over a list of entries (see ImagePipeline.process)."""
+    return ImagePipeline(engine, width).process(entries)
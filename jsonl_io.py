@@ -0,0 +1,51 @@
+"""
+JSON Lines helpers for The Unsung Heroines pipeline
+Scraper stages write one record per line as they go and later stages read
+them back one at a time, so memory stays flat and an interrupted run keeps
+everything written before the interruption.
+"""
+
+import json
+
+
+def write_jsonl(records, path, append=False):
+    """Write records to ``path`` one JSON object per line; returns the count.
+
+    Each line is flushed as soon as it is written, so a crash loses at most
+    the record being written. ``append=True`` adds to an existing file
+    (used when resuming an interrupted stage).
+    """
+    count = 0
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
+        # Terminate a line cut short by the interrupted run
+        if append and f.tell() and not _ends_with_newline(path):
+            f.write("\n")
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            count += 1
+    return count
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+
+def read_jsonl(path):
+    """Yield the records stored in a JSON Lines file.
+
+    Blank lines are skipped. A truncated last line (left by an interrupted
+    writer) is reported and dropped instead of failing the whole read.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Warning: skipping unreadable line {line_no} of {path}: {e}")
+
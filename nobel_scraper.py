@@ -5,12 +5,16 @@ all female laureates, then enriches each entry with a Wikipedia biography and
 portrait image.
 """
 
+import asyncio
 import requests
-import json
-import time
 import sys
 from datetime import datetime
 
+from fetch_engine import FetchEngine
+from http_cache import install_cache
+from jsonl_io import read_jsonl, write_jsonl
+from wikipedia_client import WikipediaClient, title_from_url
+
 # Ensure UTF-8 output on Windows so laureate names with special characters print correctly
 if hasattr(sys.stdout, "reconfigure"):
     sys.stdout.reconfigure(encoding="utf-8", errors="replace")
@@ -34,39 +38,48 @@ class NobelScraper:
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({"User-Agent": self.USER_AGENT})
+        install_cache(self.session)
+        # Requests run concurrently under per-host rate limits
+        self.engine = FetchEngine(self.session)
+        self.wiki = WikipediaClient(engine=self.engine)
+        self._wiki_cache = {}
 
     # ------------------------------------------------------------------
     # Nobel API
     # ------------------------------------------------------------------
 
+    async def _fetch_laureate_page(self, offset, limit):
+        return await self.engine.get_json(
+            self.NOBEL_API,
+            params={"gender": "female", "format": "json",
+                    "limit": limit, "offset": offset},
+            timeout=20,
+        )
+
     def fetch_female_laureates(self):
-        """Return raw laureate dicts for all female Nobel Prize winners."""
-        all_laureates = []
-        offset = 0
-        limit = 100
+        """Return raw laureate dicts for all female Nobel Prize winners.
 
-        while True:
-            try:
-                resp = self.session.get(
-                    self.NOBEL_API,
-                    params={"gender": "female", "format": "json",
-                            "limit": limit, "offset": offset},
-                    timeout=20,
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                batch = data.get("laureates", [])
-                if not batch:
-                    break
-                all_laureates.extend(batch)
-                # If the page was smaller than the limit we've reached the end
-                if len(batch) < limit:
-                    break
-                offset += limit
-                time.sleep(0.5)
-            except Exception as exc:
-                print(f"Error fetching Nobel laureates at offset {offset}: {exc}")
+        The first page reports the total count, so the remaining pages are
+        requested concurrently.
+        """
+        limit = 100
+        try:
+            first = self.engine.run(self._fetch_laureate_page(0, limit))
+        except Exception as exc:
+            print(f"Error fetching Nobel laureates at offset 0: {exc}")
+            return []
+
+        all_laureates = list(first.get("laureates", []))
+        # API v2.1 reports the total number of matches in meta.count
+        total = first.get("meta", {}).get("count", len(all_laureates))
+
+        offsets = list(range(limit, total, limit))
+        pages = self.engine.map(lambda offset: self._fetch_laureate_page(offset, limit), offsets)
+        for offset, page in zip(offsets, pages):
+            if isinstance(page, Exception):
+                print(f"Error fetching Nobel laureates at offset {offset}: {page}")
                 break
+            all_laureates.extend(page.get("laureates", []))
 
         return all_laureates
 
@@ -74,51 +87,37 @@ class NobelScraper:
     # Wikipedia enrichment
     # ------------------------------------------------------------------
 
-    def get_wikipedia_data(self, wiki_url):
-        """Return (extract, thumbnail_url) for a Wikipedia article URL.
-
-        Retries up to 3 times with exponential back-off on HTTP 429.
+    async def get_wikipedia_batch_async(self, wiki_urls):
+        """Coroutine version of get_wikipedia_batch."""
+        by_title = {}
+        for url in wiki_urls:
+            if url and url not in self._wiki_cache:
+                by_title.setdefault(title_from_url(url), []).append(url)
+
+        if by_title:
+            summaries = await self.wiki.fetch_summaries_async(list(by_title))
+            for title, urls in by_title.items():
+                if title not in summaries:
+                    continue   # lookup failed: not cached, so a later call retries it
+                extract, image = summaries[title]
+                for url in urls:
+                    self._wiki_cache[url] = (extract or "", image)
+
+        return {url: self._wiki_cache[url] for url in wiki_urls if url in self._wiki_cache}
+
+    def get_wikipedia_batch(self, wiki_urls):
+        """Return {url: (extract, thumbnail_url)} for many Wikipedia article URLs.
+
+        Titles are fetched 50 per request; results are cached on the scraper so
+        later lookups of the same URL cost nothing.
         """
+        return self.engine.run(self.get_wikipedia_batch_async(wiki_urls))
+
+    def get_wikipedia_data(self, wiki_url):
+        """Return (extract, thumbnail_url) for a Wikipedia article URL."""
         if not wiki_url:
             return "", None
-
-        title = wiki_url.rstrip("/").split("/wiki/")[-1]
-
-        for attempt in range(3):
-            try:
-                resp = self.session.get(
-                    self.WIKI_API,
-                    params={
-                        "action": "query",
-                        "format": "json",
-                        "prop": "extracts|pageimages",
-                        "titles": title,
-                        "exintro": True,
-                        "explaintext": True,
-                        "pithumbsize": 500,
-                    },
-                    timeout=15,
-                )
-                if resp.status_code == 429:
-                    wait = 5 * (2 ** attempt)
-                    print(f"  Rate-limited; waiting {wait}s before retry...")
-                    time.sleep(wait)
-                    continue
-                resp.raise_for_status()
-                page = next(iter(resp.json()["query"]["pages"].values()))
-                if page.get("missing"):
-                    return "", None
-                extract = page.get("extract", "")
-                image = page.get("thumbnail", {}).get("source")
-                return extract, image
-            except requests.exceptions.HTTPError:
-                raise
-            except Exception as exc:
-                print(f"  Warning: Wikipedia fetch failed for {wiki_url}: {exc}")
-                return "", None
-
-        print(f"  Giving up on Wikipedia fetch for {wiki_url} after retries.")
-        return "", None
+        return self.get_wikipedia_batch([wiki_url]).get(wiki_url, ("", None))
 
     # ------------------------------------------------------------------
     # Parsing
@@ -130,6 +129,16 @@ class NobelScraper:
         family = laureate.get("familyName", {}).get("en", "")
         return known or f"{given} {family}".strip() or "Unknown"
 
+    def _wikipedia_url(self, laureate):
+        wiki_url = laureate.get("wikipedia", {}).get("english", "")
+        if not wiki_url:
+            # Fall back to links array
+            for link in laureate.get("links", []):
+                if "wikipedia.org" in link.get("href", ""):
+                    wiki_url = link["href"]
+                    break
+        return wiki_url
+
     def parse_laureate(self, laureate):
         name = self._best_name(laureate)
         if name == "Unknown":
@@ -179,14 +188,7 @@ class NobelScraper:
                     })
                     break
 
-        # Wikipedia link
-        wiki_url = laureate.get("wikipedia", {}).get("english", "")
-        if not wiki_url:
-            # Fall back to links array
-            for link in laureate.get("links", []):
-                if "wikipedia.org" in link.get("href", ""):
-                    wiki_url = link["href"]
-                    break
+        wiki_url = self._wikipedia_url(laureate)
 
         biography = " ".join(motivations)
         image = None
@@ -205,7 +207,6 @@ class NobelScraper:
                 "url": wiki_url,
                 "accessed": datetime.now().strftime("%Y-%m-%d"),
             })
-            time.sleep(3)  # Respect Wikipedia's rate limit
 
         # Always list Nobel API as a source
         sources.insert(0, {
@@ -233,35 +234,87 @@ class NobelScraper:
     # Main entry point
     # ------------------------------------------------------------------
 
-    def scrape(self):
-        print("Fetching female Nobel laureates from Nobel Prize API...")
+    async def iter_laureates_pipelined(self, limit=100):
+        """Async-yield raw laureates page by page, with their Wikipedia data cached.
+
+        While one page's articles are looked up (in multi-title requests)
+        the next Nobel API page is already being fetched, so the two APIs
+        overlap instead of running one after the other.
+        """
+        offset = 0
+        next_page = asyncio.ensure_future(self._fetch_laureate_page(offset, limit))
+        try:
+            while next_page is not None:
+                try:
+                    page = await next_page
+                except Exception as exc:
+                    print(f"Error fetching Nobel laureates at offset {offset}: {exc}")
+                    return
+
+                laureates = page.get("laureates", [])
+                total = page.get("meta", {}).get("count", 0)
+                offset += limit
+                next_page = None
+                if laureates and offset < total:
+                    next_page = asyncio.ensure_future(self._fetch_laureate_page(offset, limit))
+
+                try:
+                    await self.get_wikipedia_batch_async([self._wikipedia_url(l) for l in laureates])
+                except Exception as exc:
+                    print(f"  Warning: Wikipedia lookups failed for offset {offset - limit}: {exc}")
+                for laureate in laureates:
+                    yield laureate
+        finally:
+            # Consumer stopped early: drop the prefetch
+            if next_page is not None:
+                next_page.cancel()
+
+    def _iter_laureates(self):
+        """Fetch every laureate, then every Wikipedia article, up front."""
         raw_laureates = self.fetch_female_laureates()
         print(f"Found {len(raw_laureates)} female laureates.")
 
-        results = []
-        for i, laureate in enumerate(raw_laureates, 1):
+        # Fetch every Wikipedia article up front in multi-title requests
+        wiki_urls = [self._wikipedia_url(l) for l in raw_laureates]
+        print(f"Fetching {sum(1 for u in wiki_urls if u)} Wikipedia articles in batches...")
+        self.get_wikipedia_batch(wiki_urls)
+        return raw_laureates
+
+    def iter_records(self, pipelined=False):
+        """Yield one parsed record per female laureate as it is built.
+
+        ``pipelined=True`` parses each Nobel API page as it arrives, with
+        its Wikipedia articles looked up while the next page downloads.
+        """
+        print("Fetching female Nobel laureates from Nobel Prize API...")
+        if pipelined:
+            laureates = self.engine.iterate(self.iter_laureates_pipelined())
+        else:
+            laureates = self._iter_laureates()
+
+        count = 0
+        for i, laureate in enumerate(laureates, 1):
             display_name = self._best_name(laureate)
-            print(f"[{i}/{len(raw_laureates)}] {display_name}")
+            print(f"[{i}] {display_name}")
             entry = self.parse_laureate(laureate)
             if entry:
-                results.append(entry)
+                count += 1
+                yield entry
+
+        print(f"\nNoble scraping complete. {count} entries.")
 
-        print(f"\nNoble scraping complete. {len(results)} entries.")
-        return results
+    def scrape(self, pipelined=False):
+        return list(self.iter_records(pipelined))
 
 
 def main():
     scraper = NobelScraper()
-    data = scraper.scrape()
-
-    output_file = "nobel_heroines.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-    images_found = sum(1 for d in data if d.get("image"))
-    print(f"Saved {len(data)} laureates to {output_file}")
-    print(f"Entries with images: {images_found}/{len(data)}")
+    output_file = "nobel_heroines.jsonl"
+    count = write_jsonl(scraper.iter_records(pipelined=True), output_file)
 
+    images_found = sum(1 for d in read_jsonl(output_file) if d.get("image"))
+    print(f"Saved {count} laureates to {output_file}")
+    print(f"Entries with images: {images_found}/{count}")
 
 if __name__ == "__main__":
     main()
@@ -1,46 +1,314 @@
 """
 NWHM (National Women's History Museum) Scraper
 Respectful web scraper with caching for the National Women's History Museum.
+Biography pages are discovered from the site's sitemaps (honouring robots.txt
+and its Crawl-delay); each page's sitemap lastmod is stored with its parsed
+record in an SQLite record store (nwhm_cache.sqlite), so a rerun only fetches
+pages that changed.
 """
 
 import requests
 from bs4 import BeautifulSoup
-import json
-import time
-from datetime import datetime
+from bs4.dammit import UnicodeDammit
+import asyncio
+import calendar
+import gzip
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from html.parser import HTMLParser
+from itertools import islice
 import os
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+try:
+    from lxml import etree
+except ImportError:  # optional: the standard library parser is used instead
+    etree = None
+
+from fetch_engine import FetchEngine, limit_host
+from jsonl_io import write_jsonl
+from record_store import DAY, RecordStore
+
+# Path of a single biography page (not the biographies index or its filters)
+BIOGRAPHY_PATH = re.compile(r"/education-resources/biographies/[^/]+/?")
+
+
+# Month names and abbreviations (plus "Sept") -> month number
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+MONTHS['sept'] = 9
+
+# Between the two dates of "1815 - 1852", "Dec. 10, 1815 – Nov. 27, 1852",
+# "1815-1852" or "1815 to 1852" (but not inside an ISO date)
+DATE_RANGE_SEPARATOR = re.compile(r"\s*[\u2013\u2014]\s*|\s+-\s+|(?<=\d)-(?=\d{3,4}\b)|\s+to\s+")
+
+
+def parse_date(text):
+    """Parse one date as NWHM writes it into YYYY-MM-DD ('' if it has no year).
+    
+    Accepts "December 10, 1815", "10 Dec. 1815", "December 1815", "c. 1815"
+    and ISO dates; a missing month or day becomes 01, as in SPARQL results.
+    """
+    iso = re.search(r"\b(\d{4})-(\d{2})-(\d{2})\b", text or "")
+    if iso:
+        return iso.group(0)
+    words = re.findall(r"[A-Za-z]+|\d+", text or "")
+    years = [w for w in words if w.isdigit() and 3 <= len(w) <= 4]
+    if not years:
+        return ""
+    year = int(years[-1])
+    month = next((MONTHS[w.lower()] for w in words if w.lower() in MONTHS), 1)
+    day = next((int(w) for w in words if w.isdigit() and len(w) <= 2 and 1 <= int(w) <= 31), 1)
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return date(year, month, 1).isoformat()
+
+
+def parse_dates(text):
+    """Split a "born - died" string into (birth_date, death_date) via parse_date."""
+    text = re.sub(r"\b(?:born|died|b\.|d\.)\s*", " ", (text or "").strip(" ()"), flags=re.IGNORECASE)
+    parts = DATE_RANGE_SEPARATOR.split(text, maxsplit=1)
+    birth = parse_date(parts[0])
+    death = parse_date(parts[1]) if len(parts) > 1 else ""
+    return birth, death
+
+
+def _clean(text):
+    return " ".join(text.split())
+
+
+def biography_record(name, biography, dates, url):
+    """Build a record from the extracted page text (shared by both parsers)."""
+    birth_date, death_date = parse_dates(dates) if dates else ("", "")
+    return {
+        'name': _clean(name) if name is not None else "Unknown",
+        'biography': _clean(biography or ""),
+        'birth_date': birth_date,
+        'death_date': death_date,
+        'sources': [{
+            'name': 'National Women\'s History Museum',
+            'url': url,
+            'accessed': datetime.now().strftime('%Y-%m-%d')
+        }],
+        'last_updated': datetime.now().strftime('%Y-%m-%d')
+    }
+
+
+def parse_biography_soup(html, url, parser='html.parser'):
+    """Parse a biography page by building a full BeautifulSoup tree."""
+    soup = BeautifulSoup(html, parser)
+    
+    name = soup.find('h1')
+    # Prefer the dedicated biography block over the whole article
+    bio_content = soup.find('div', class_='biography-content') or soup.find('article')
+    dates = soup.find('span', class_='dates')
+    return biography_record(name.get_text() if name else None,
+                            bio_content.get_text(" ") if bio_content else "",
+                            dates.get_text() if dates else "", url)
+
+
+class _BiographyTarget:
+    """Collects the text of the first h1, div.biography-content, article and
+    span.dates while a page streams past; no tree is built.
+    
+    Implements the lxml parser-target interface (start/end/data/close);
+    _StdlibFeeder drives it from html.parser when lxml is not installed.
+    """
+    
+    # key: (tag, required class)
+    TARGETS = {
+        'name': ('h1', None),
+        'content': ('div', 'biography-content'),
+        'article': ('article', None),
+        'dates': ('span', 'dates'),
+    }
+    SKIP = ('script', 'style')
+    
+    def __init__(self):
+        self.found = {}    # key -> text nodes
+        self._open = {}    # key -> nesting depth of its tag name
+        self._skip = 0
+        self._text = []
+    
+    def _flush(self):
+        if self._text:
+            text = "".join(self._text)
+            self._text = []
+            if not self._skip:
+                for key in self._open:
+                    self.found[key].append(text)
+    
+    def start(self, tag, attrib):
+        self._flush()
+        tag = tag.lower()
+        if tag in self.SKIP:
+            self._skip += 1
+        for key in self._open:
+            if self.TARGETS[key][0] == tag:
+                self._open[key] += 1
+        classes = (attrib.get('class') or "").split()
+        for key, (name, cls) in self.TARGETS.items():
+            if key not in self.found and tag == name and (cls is None or cls in classes):
+                self.found[key] = []
+                self._open[key] = 0
+    
+    def end(self, tag):
+        self._flush()
+        tag = tag.lower()
+        if tag in self.SKIP:
+            self._skip = max(self._skip - 1, 0)
+        for key in list(self._open):
+            if self.TARGETS[key][0] == tag:
+                if self._open[key]:
+                    self._open[key] -= 1
+                else:
+                    del self._open[key]
+    
+    def data(self, text):
+        self._text.append(text)
+    
+    def close(self):
+        self._flush()
+        return self.found
+
+
+class _StdlibFeeder(HTMLParser):
+    """Feeds html.parser events to a _BiographyTarget."""
+    
+    # Elements with no end tag must not open a nesting level
+    VOID = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+            'source', 'track', 'wbr'}
+    
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+    
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.VOID:
+            self.target.start(tag, {k: v or "" for k, v in attrs})
+    
+    def handle_startendtag(self, tag, attrs):
+        pass
+    
+    def handle_endtag(self, tag):
+        if tag not in self.VOID:
+            self.target.end(tag)
+    
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+FAST_PARSER = 'lxml' if etree is not None else 'html.parser'
+
+
+def parse_biography_fast(html, url):
+    """Parse a biography page by streaming it once (lxml if installed).
+    
+    Produces the same record as parse_biography_soup, but only the text of
+    the four elements it reads is kept.
+    """
+    if isinstance(html, bytes):
+        html = UnicodeDammit(html, is_html=True).unicode_markup if html else ""
+    target = _BiographyTarget()
+    if etree is not None:
+        if html.strip():   # lxml rejects an empty document
+            etree.fromstring(html, etree.HTMLParser(target=target))
+    else:
+        feeder = _StdlibFeeder(target)
+        feeder.feed(html)
+        feeder.close()
+    found = target.close()
+    content = found['content'] if 'content' in found else found.get('article')
+    name = found.get('name')
+    return biography_record("".join(name) if name is not None else None,
+                            " ".join(content or []), "".join(found.get('dates', [])), url)
+
+
+def parse_sitemap(content):
+    """Parse a sitemap or sitemap index (optionally gzipped).
+
+    Returns (child sitemap URLs, [(page URL, lastmod or None)]).
+    """
+    if content[:2] == b"\x1f\x8b":
+        content = gzip.decompress(content)
+    root = ET.fromstring(content)
+    children, pages = [], []
+    for node in root:
+        # Tags carry the sitemaps.org namespace: {http://...}url
+        kind = node.tag.rsplit("}", 1)[-1]
+        fields = {child.tag.rsplit("}", 1)[-1]: (child.text or "").strip() for child in node}
+        if not fields.get("loc"):
+            continue
+        if kind == "sitemap":
+            children.append(fields["loc"])
+        elif kind == "url":
+            pages.append((fields["loc"], fields.get("lastmod") or None))
+    return children, pages
 
 class NWHMScraper:
     """Scraper for National Women's History Museum biographies."""
     
     BASE_URL = "https://www.womenshistory.org"
     USER_AGENT = "TheUnsungHeroines/2.0 (Educational Project; Contact: your.email@example.com)"
-    CACHE_FILE = "nwhm_cache.json"
+    CACHE_FILE = "nwhm_cache.sqlite"
+    LEGACY_CACHE_FILE = "nwhm_cache.json"
+    CACHE_MAX_AGE_DAYS = 90
     
-    def __init__(self, use_cache=True):
+    def __init__(self, use_cache=True, store_html=False, max_age_days=CACHE_MAX_AGE_DAYS,
+                 fast_parse=True, parse_workers=None):
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': self.USER_AGENT})
+        # The engine spaces requests by the site's crawl delay
+        self.engine = FetchEngine(self.session)
         self.use_cache = use_cache
-        self.cache = self.load_cache() if use_cache else {}
+        self.store_html = store_html
+        self.max_age_days = max_age_days
+        self.cache = self.load_cache() if use_cache else None
+        self.robots = None
+        # Streaming extraction instead of a full soup; with parse_workers > 1
+        # pages are parsed in a process pool while the next ones download
+        self.fast_parse = fast_parse
+        self.parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers and parse_workers > 1 else None
     
     def load_cache(self):
-        """Load cached data to avoid re-scraping."""
-        if os.path.exists(self.CACHE_FILE):
+        """Open the record store (importing a legacy JSON cache once) and
+        delete entries older than ``max_age_days``."""
+        max_age = self.max_age_days * DAY if self.max_age_days else None
+        store = RecordStore(self.CACHE_FILE, max_age=max_age)
+        if os.path.exists(self.LEGACY_CACHE_FILE) and not len(store):
             try:
-                with open(self.CACHE_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                count = store.import_json(self.LEGACY_CACHE_FILE)
+                print(f"Imported {count} entries from {self.LEGACY_CACHE_FILE}")
             except Exception as e:
-                print(f"Error loading cache: {e}")
-        return {}
+                print(f"Error importing legacy cache: {e}")
+        # Expired rows are never read again, so they only grow the file
+        expired = store.expire()
+        if expired:
+            print(f"Removed {expired} expired entries from {self.CACHE_FILE}")
+        return store
     
     def save_cache(self):
-        """Save cache to file."""
+        """Commit cached records written since the last batch."""
+        if self.cache is None:
+            return
         try:
-            with open(self.CACHE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            self.cache.commit()
         except Exception as e:
             print(f"Error saving cache: {e}")
     
+    def close(self):
+        """Shut down the parse pool and close the record store."""
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown()
+            self.parse_pool = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+    
     def check_robots_txt(self):
         """Check robots.txt for scraping permissions."""
         try:
@@ -52,67 +320,114 @@ class NWHMScraper:
             print(f"Could not fetch robots.txt: {e}")
             return False
     
-    def get_biography_list(self):
+    def load_robots(self):
+        """Fetch and parse robots.txt, applying its Crawl-delay to the site's limiter.
+        
+        Follows RobotFileParser.read: a 401/403 forbids everything, other
+        4xx mean no restrictions. If robots.txt cannot be read at all,
+        nothing is crawled.
         """
-        Get list of biography URLs from NWHM.
-        Note: This is a placeholder - actual implementation would need to
-        navigate the site structure or use their search/browse features.
+        robots = RobotFileParser(f"{self.BASE_URL}/robots.txt")
+        try:
+            response = self.engine.run(self.engine.get(robots.url, timeout=10))
+            if response.status_code in (401, 403):
+                robots.disallow_all = True
+            elif response.status_code >= 400:
+                robots.allow_all = True
+            else:
+                robots.parse(response.text.splitlines())
+        except Exception as e:
+            print(f"Could not fetch robots.txt, not crawling: {e}")
+            robots.disallow_all = True
+        
+        delay = robots.crawl_delay(self.USER_AGENT)
+        if delay:
+            bucket = limit_host(urlsplit(self.BASE_URL).hostname, 1 / float(delay))
+            print(f"robots.txt Crawl-delay: {delay}s (rate now {bucket.rate:.3f}/s)")
+        self.robots = robots
+        return robots
+    
+    def is_biography(self, url):
+        """True for a biography page URL on this site."""
+        parts = urlsplit(url)
+        return (parts.hostname == urlsplit(self.BASE_URL).hostname
+                and BIOGRAPHY_PATH.fullmatch(parts.path) is not None)
+    
+    async def _fetch_sitemap(self, url):
+        response = await self.engine.get(url, timeout=30)
+        response.raise_for_status()
+        return parse_sitemap(response.content)
+    
+    def discover(self):
+        """Return {biography URL: sitemap lastmod or None} from the site's sitemaps.
+        
+        Starts from the Sitemap lines of robots.txt (or /sitemap.xml),
+        follows sitemap indexes, and keeps URLs that match the biography
+        pattern and that robots.txt allows.
         """
-        # This would need to be customized based on NWHM's actual site structure
-        # For now, returning empty list as we need to respect their site
-        print("Note: NWHM scraping requires manual URL collection or API access.")
-        print("Please check robots.txt and site terms before scraping.")
-        return []
+        robots = self.robots or self.load_robots()
+        pending = robots.site_maps() or [f"{self.BASE_URL}/sitemap.xml"]
+        seen = set()
+        found = {}
+        while pending:
+            batch = [url for url in dict.fromkeys(pending) if url not in seen]
+            seen.update(batch)
+            pending = []
+            for url, result in zip(batch, self.engine.map(self._fetch_sitemap, batch)):
+                if isinstance(result, Exception):
+                    print(f"Error reading sitemap {url}: {result}")
+                    continue
+                children, pages = result
+                pending.extend(children)
+                for loc, lastmod in pages:
+                    if self.is_biography(loc) and robots.can_fetch(self.USER_AGENT, loc):
+                        found[loc] = lastmod
+        print(f"Found {len(found)} biography pages in {len(seen)} sitemap(s)")
+        return found
     
-    def scrape_biography(self, url):
-        """Scrape a single biography page."""
+    def get_biography_list(self):
+        """Get list of biography URLs from NWHM (discovered from its sitemaps)."""
+        return list(self.discover())
+    
+    def is_unchanged(self, url, lastmod):
+        """True if the cached record for a URL is still current.
+        
+        A page is current when the sitemap lastmod matches the stored one;
+        pages without a lastmod fall back to the cache's expiry.
+        """
+        if self.cache is None or self.cache.get(url) is None:
+            return False
+        return lastmod is None or self.cache.lastmod(url) == lastmod
+    
+    def parse_biography(self, html, url):
+        """Parse a biography page into our record format."""
+        parse = parse_biography_fast if self.fast_parse else parse_biography_soup
+        return parse(html, url)
+    
+    async def _parse_async(self, html, url):
+        """Parse a page in the process pool (when enabled), off the event loop."""
+        if self.parse_pool is None:
+            return self.parse_biography(html, url)
+        parse = parse_biography_fast if self.fast_parse else parse_biography_soup
+        return await asyncio.get_running_loop().run_in_executor(self.parse_pool, parse, html, url)
+    
+    async def scrape_biography_async(self, url, lastmod=None):
+        """Coroutine version of scrape_biography."""
         # Check cache first
-        if url in self.cache:
-            print(f"Using cached data for {url}")
-            return self.cache[url]
+        if self.is_unchanged(url, lastmod):
+            return self.cache.get(url)
         
         try:
             print(f"Fetching {url}...")
-            response = self.session.get(url, timeout=15)
+            response = await self.engine.get(url, timeout=15)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract data (structure depends on NWHM's HTML)
-            # This is a template - actual selectors need to be determined
-            name = soup.find('h1')
-            name = name.text.strip() if name else "Unknown"
-            
-            # Look for biography content
-            bio_content = soup.find('div', class_='biography-content') or soup.find('article')
-            biography = bio_content.get_text(strip=True) if bio_content else ""
+            woman_data = await self._parse_async(response.content, url)
             
-            # Extract dates if available
-            dates = soup.find('span', class_='dates')
-            birth_date = ""
-            death_date = ""
-            if dates:
-                date_text = dates.text
-                # Parse dates (format varies)
-                # This would need custom parsing logic
-            
-            woman_data = {
-                'name': name,
-                'biography': biography,
-                'birth_date': birth_date,
-                'death_date': death_date,
-                'sources': [{
-                    'name': 'National Women\'s History Museum',
-                    'url': url,
-                    'accessed': datetime.now().strftime('%Y-%m-%d')
-                }],
-                'last_updated': datetime.now().strftime('%Y-%m-%d')
-            }
-            
-            # Cache the result
-            if self.use_cache:
-                self.cache[url] = woman_data
-                self.save_cache()
+            # Cache the result with its lastmod (committed in batches)
+            if self.cache is not None:
+                self.cache.put(url, woman_data, html=response.content if self.store_html else None,
+                               lastmod=lastmod)
             
             return woman_data
             
@@ -120,54 +435,74 @@ class NWHMScraper:
             print(f"Error scraping {url}: {e}")
             return None
     
+    def scrape_biography(self, url):
+        """Scrape a single biography page."""
+        try:
+            return self.engine.run(self.scrape_biography_async(url))
+        finally:
+            self.save_cache()
+    
     def scrape(self, urls=None):
-        """Scrape multiple biographies."""
+        """Scrape multiple biographies.
+        
+        ``urls`` is a list, or a {url: lastmod} dict as returned by
+        ``discover``; without it the sitemaps are read. Pages are fetched
+        concurrently; the engine enforces the site's crawl delay, so only
+        network latency overlaps.
+        """
+        return list(self.iter_records(urls))
+    
+    def iter_records(self, urls=None, chunk_size=50):
+        """Yield biography records, fetching only pages changed since the last run.
+        
+        Unchanged pages come from the record store; changed ones are fetched
+        ``chunk_size`` at a time and committed after each chunk.
+        """
+        if urls is None:
+            urls = self.discover()
+        if not isinstance(urls, dict):
+            urls = dict.fromkeys(urls)
         if not urls:
-            print("No URLs provided. Please provide a list of biography URLs.")
-            print("Example URLs should be collected manually or from a sitemap.")
-            return []
+            print("No biography URLs found.")
+            return
         
-        women_data = []
+        changed = [url for url, lastmod in urls.items() if not self.is_unchanged(url, lastmod)]
+        print(f"Processing {len(urls)} biography URLs ({len(changed)} new or changed)...")
         
-        for idx, url in enumerate(urls, 1):
-            print(f"Processing {idx}/{len(urls)}: {url}")
-            
-            data = self.scrape_biography(url)
-            if data:
-                women_data.append(data)
-            
-            # Respectful delay
-            time.sleep(3)
+        # Pages whose title could not be parsed are not records
+        named = lambda data: data and not isinstance(data, Exception) and data.get('name') not in (None, '', 'Unknown')
+        
+        fetch = set(changed)
+        for url in urls:
+            if url not in fetch:
+                record = self.cache.get(url)
+                if named(record):
+                    yield record
         
-        return women_data
+        it = iter(changed)
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if not chunk:
+                break
+            try:
+                results = self.engine.map(lambda url: self.scrape_biography_async(url, urls[url]), chunk)
+            finally:
+                self.save_cache()
+            for data in results:
+                if named(data):
+                    yield data
 
 def main():
-    """Main function - demonstrates usage."""
-    scraper = NWHMScraper(use_cache=True)
-    
-    # Check robots.txt first
-    print("Checking robots.txt...")
-    scraper.check_robots_txt()
-    
-    print("\n" + "="*60)
-    print("IMPORTANT: NWHM Scraping Guidelines")
-    print("="*60)
-    print("1. Always check robots.txt before scraping")
-    print("2. Use respectful delays (3+ seconds)")
-    print("3. Cache results to minimize requests")
-    print("4. Consider contacting NWHM for API access or data partnership")
-    print("5. Provide proper attribution on your website")
-    print("="*60)
-    
-    # Example usage (with manual URL list):
-    # example_urls = [
-    #     "https://www.womenshistory.org/education-resources/biographies/ada-lovelace",
-    #     # Add more URLs here
-    # ]
-    # women_data = scraper.scrape(example_urls)
-    # 
-    # with open('nwhm_heroines.json', 'w', encoding='utf-8') as f:
-    #     json.dump(women_data, f, ensure_ascii=False, indent=2)
+    """Discover NWHM biographies and write all of them to nwhm_heroines.jsonl.
+
+    Only changed pages are fetched; unchanged ones come from the record store.
+    """
+    scraper = NWHMScraper(use_cache=True, parse_workers=os.cpu_count())
+    try:
+        count = write_jsonl(scraper.iter_records(), 'nwhm_heroines.jsonl')
+        print(f"[OK] Saved {count} NWHM biographies to nwhm_heroines.jsonl")
+    finally:
+        scraper.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,147 @@
+"""
+Record store for The Unsung Heroines page scrapers
+Keeps parsed records (and optionally the raw page) per URL in SQLite instead
+of one JSON file rewritten after every page. Writes are grouped into
+transactions, so a crash loses at most the current batch and never corrupts
+what was stored before; payloads can be zlib-compressed and entries expire by
+fetch date.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DAY = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    url        TEXT PRIMARY KEY,
+    record     BLOB NOT NULL,
+    html       BLOB,
+    compressed INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    lastmod    TEXT
+);
+CREATE INDEX IF NOT EXISTS records_fetched ON records (fetched_at);
+"""
+
+
+class RecordStore:
+    """SQLite store of {url: record} with batched commits and expiry.
+
+    ``put`` writes inside an open transaction that is committed every
+    ``batch_size`` records and by ``commit``/``close``. ``max_age`` (seconds)
+    makes older entries invisible to ``get``; ``expire`` deletes them.
+    """
+
+    def __init__(self, path, batch_size=50, compress=True, max_age=None):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.compress = compress
+        self.max_age = max_age
+        self._pending = 0
+        # Pages are scraped from the fetch engine's event loop and worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(records)")}
+        if "lastmod" not in columns:   # store created before lastmod was tracked
+            self._conn.execute("ALTER TABLE records ADD COLUMN lastmod TEXT")
+
+    def _encode(self, data):
+        return zlib.compress(data) if self.compress else data
+
+    @staticmethod
+    def _decode(blob, compressed):
+        return zlib.decompress(blob) if compressed else blob
+
+    def get(self, url):
+        """Return the stored record for a URL, or None if absent or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, compressed, fetched_at FROM records WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        record, compressed, fetched_at = row
+        if self.max_age is not None and time.time() - fetched_at > self.max_age:
+            return None
+        return json.loads(self._decode(record, compressed))
+
+    def get_html(self, url):
+        """Return the stored raw page for a URL (bytes), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT html, compressed FROM records WHERE url = ?", (url,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return self._decode(row[0], row[1])
+
+    def lastmod(self, url):
+        """Return the source's last-modified stamp stored with a URL, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT lastmod FROM records WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, url):
+        return self.get(url) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def put(self, url, record, html=None, fetched_at=None, lastmod=None):
+        """Store a record (and optionally its raw page and the source's
+        last-modified stamp); committed in batches."""
+        payload = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records (url, record, html, compressed, fetched_at, lastmod) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, self._encode(payload), None if html is None else self._encode(html),
+                 int(self.compress), time.time() if fetched_at is None else fetched_at, lastmod))
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def commit(self):
+        """Commit records written since the last batch."""
+        with self._lock:
+            self._commit()
+
+    def expire(self, max_age=None):
+        """Delete entries fetched more than ``max_age`` seconds ago; returns the count."""
+        max_age = self.max_age if max_age is None else max_age
+        if max_age is None:
+            return 0
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM records WHERE fetched_at < ?",
+                                         (time.time() - max_age,)).rowcount
+            self._commit()
+        return deleted
+
+    def import_json(self, path):
+        """Load a legacy ``{url: record}`` JSON cache file; returns the count."""
+        with open(path, encoding="utf-8") as f:
+            legacy = json.load(f)
+        fetched_at = os.path.getmtime(path)
+        for url, record in legacy.items():
+            self.put(url, record, fetched_at=fetched_at)
+        self.commit()
+        return len(legacy)
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._conn.close()
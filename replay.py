@@ -0,0 +1,393 @@
+"""
+Offline record/replay harness for The Unsung Heroines scrapers
+FetchEngine mounts a transport adapter under every scraper session (below the
+HTTP cache). With HEROINES_RECORD set it appends each response that reaches
+the network to a cassette file; with HEROINES_STUB set it sends every request
+to a local stub server instead of the real host. The stub replays a cassette
+with configurable latency, injected 429 responses and re-paginated category
+listings, so the pipeline runs end to end offline and its throughput and
+rate-limiter behaviour can be measured reproducibly.
+
+Usage:
+    python replay.py record CASSETTE -- python enhanced_scraper.py
+    python replay.py run CASSETTE [--latency S] [--throttle-every N] [--page-size N] [--strict] -- python enhanced_scraper.py
+    python replay.py serve CASSETTE [--port N] [same options as run]
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+
+RECORD_ENV = "HEROINES_RECORD"
+STUB_ENV = "HEROINES_STUB"
+RATE_SCALE_ENV = "HEROINES_RATE_SCALE"
+
+# Bodies are stored decoded, so these headers no longer describe them
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+# Set by the stub's own BaseHTTPRequestHandler
+SERVER_HEADERS = {"date", "server"}
+
+
+def request_key(method, url, body=None):
+    """Return the cassette key of a request: method, URL with sorted query, body."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    key = f"{method.upper()} {urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))}"
+    if body:
+        key += " " + (body.decode("utf-8", "replace") if isinstance(body, bytes) else body)
+    return key
+
+
+def rate_scale():
+    """Factor applied to every host's rate limit; only honoured against the stub."""
+    if not os.environ.get(STUB_ENV):
+        return 1.0
+    return float(os.environ.get(RATE_SCALE_ENV) or 1)
+
+
+class Cassette:
+    """Recorded responses keyed by request, stored as JSON Lines (``.gz`` allowed).
+
+    A request recorded several times is replayed in recorded order; the last
+    response then repeats.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.responses = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with self._open("r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.responses.setdefault(entry["key"], []).append(entry)
+
+    def _open(self, mode):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.responses.values())
+
+    def add(self, method, url, status, headers, content, body=None):
+        """Store one response (and append it to the cassette file, if any)."""
+        entry = {"key": request_key(method, url, body), "status": status,
+                 "headers": {k: v for k, v in headers.items() if k.lower() not in DROP_HEADERS}}
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        try:
+            entry["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["base64"] = base64.b64encode(content).decode("ascii")
+        with self._lock:
+            self.responses.setdefault(entry["key"], []).append(entry)
+            if self.path:
+                with self._open("a") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    def record(self, request, response):
+        """Store a response received for a prepared request."""
+        # Refusals are the stub's to inject; a maxlag error would replay forever
+        if response.status_code == 429 or response.status_code >= 500 or "X-Database-Lag" in response.headers:
+            return None
+        return self.add(request.method, request.url, response.status_code, response.headers,
+                        response.content, request.body)
+
+    def peek(self, key):
+        """Return the first response recorded for a key without consuming it."""
+        entries = self.responses.get(key)
+        return entries[0] if entries else None
+
+    def lookup(self, key):
+        """Return the next response for a key, or None if it was never recorded."""
+        with self._lock:
+            entries = self.responses.get(key)
+            if not entries:
+                return None
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return entries[min(served, len(entries) - 1)]
+
+    @staticmethod
+    def content(entry):
+        if "base64" in entry:
+            return base64.b64decode(entry["base64"])
+        return entry.get("text", "").encode("utf-8")
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def shared_cassette(path):
+    """Return the process-wide cassette for a path (every session appends to it)."""
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+
+def stub_url_for(stub, url):
+    """Map https://host/path?query to <stub>/https/host/path?query."""
+    parts = urlsplit(url)
+    base = urlsplit(stub)
+    return urlunsplit((base.scheme, base.netloc, f"/{parts.scheme}/{parts.netloc}{parts.path}", parts.query, ""))
+
+
+def source_url(path):
+    """Inverse of stub_url_for for a request path received by the stub."""
+    scheme, _, rest = path.lstrip("/").partition("/")
+    return f"{scheme}://{rest}"
+
+
+class HarnessAdapter(HTTPAdapter):
+    """Transport that sends requests to the stub server and/or records responses.
+
+    Callers still see the original URL on the response, so host-based rate
+    limits, cache keys and parsing behave exactly as against the live sites.
+    """
+
+    def __init__(self, stub_url=None, cassette=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stub_url = stub_url
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        original = request.url
+        if self.stub_url:
+            request.url = stub_url_for(self.stub_url, original)
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            request.url = original
+        response.url = original
+        if self.cassette is not None:
+            self.cassette.record(request, response)
+        return response
+
+
+def install_harness(session):
+    """Mount the record/replay transport on a session when HEROINES_RECORD or
+    HEROINES_STUB is set; returns the session.
+
+    An adapter with a ``transport`` slot (the HTTP cache) keeps its place and
+    sends its misses through the harness.
+    """
+    stub_url = os.environ.get(STUB_ENV)
+    record = os.environ.get(RECORD_ENV)
+    if not stub_url and not record:
+        return session
+    for prefix in ("https://", "http://"):
+        current = session.adapters.get(prefix)
+        if isinstance(current, HarnessAdapter) or isinstance(getattr(current, "transport", None), HarnessAdapter):
+            continue
+        harness = HarnessAdapter(stub_url, shared_cassette(record) if record else None)
+        if hasattr(current, "transport"):
+            current.transport = harness
+        else:
+            session.mount(prefix, harness)
+    return session
+
+
+class StubServer:
+    """Local HTTP server replaying a cassette.
+
+    Every response is delayed by ``latency`` seconds (requests are served on
+    separate threads, so delays overlap). Every ``throttle_every``-th request
+    is refused with 429 and ``Retry-After: retry_after``. With ``page_size``,
+    recorded ``list=categorymembers`` listings are served ``page_size``
+    members at a time with the stub's own cmcontinue tokens. Requests that
+    were never recorded get a 404.
+    """
+
+    def __init__(self, cassette, host="127.0.0.1", port=0, latency=0.0, throttle_every=0,
+                 retry_after=1, page_size=None):
+        self.cassette = cassette if isinstance(cassette, Cassette) else Cassette(cassette)
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.stats = {"requests": 0, "throttled": 0, "missing": 0, "hosts": {}}
+        self.url = None
+        self._server = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                status, headers, content = stub.respond(self.command, self.path, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    if name.lower() not in SERVER_HEADERS:
+                        self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(content)
+
+            do_GET = do_POST = do_HEAD = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://{self.host}:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, method, path, body=None):
+        """Return (status, headers, content) for a request received by the stub."""
+        url = source_url(path)
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["hosts"][host] = self.stats["hosts"].get(host, 0) + 1
+            count = self.stats["requests"]
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.throttle_every and count % self.throttle_every == 0:
+            with self._lock:
+                self.stats["throttled"] += 1
+            return 429, {"Retry-After": str(self.retry_after), "Content-Type": "text/plain"}, b"Too Many Requests"
+
+        params = dict(parse_qsl(urlsplit(url).query, keep_blank_values=True))
+        if self.page_size and params.get("list") == "categorymembers":
+            page = self._member_page(method, url, params)
+            if page is not None:
+                return 200, {"Content-Type": "application/json; charset=utf-8"}, page
+
+        entry = self.cassette.lookup(request_key(method, url, body))
+        if entry is None:
+            with self._lock:
+                self.stats["missing"] += 1
+            return 404, {"Content-Type": "application/json"}, json.dumps(
+                {"error": f"not recorded: {method} {url}"}).encode("utf-8")
+        return entry["status"], entry["headers"], Cassette.content(entry)
+
+    def _members(self, method, url, params):
+        """All recorded members of a listing, following its recorded cmcontinue chain."""
+        params = {k: v for k, v in params.items() if k != "cmcontinue"}
+        members = []
+        seen = set()
+        while True:
+            query = urlencode(params)
+            entry = self.cassette.peek(request_key(method, urlunsplit(urlsplit(url)._replace(query=query))))
+            if entry is None:
+                return members if seen else None
+            data = json.loads(Cassette.content(entry))
+            members.extend(data.get("query", {}).get("categorymembers", []))
+            token = data.get("continue", {}).get("cmcontinue")
+            if not token or token in seen:
+                return members
+            seen.add(token)
+            params["cmcontinue"] = token
+
+    def _member_page(self, method, url, params):
+        token = params.get("cmcontinue", "")
+        if token and not token.startswith("stub|"):
+            return None
+        members = self._members(method, url, params)
+        if members is None:
+            return None
+        start = int(token.split("|")[1]) if token else 0
+        data = {"batchcomplete": "", "query": {"categorymembers": members[start:start + self.page_size]}}
+        if start + self.page_size < len(members):
+            data["continue"] = {"cmcontinue": f"stub|{start + self.page_size}", "continue": "-||"}
+        return json.dumps(data).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=("record", "run", "serve"))
+    parser.add_argument("cassette")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of injected 429s")
+    parser.add_argument("--page-size", type=int, default=None, help="re-paginate category listings")
+    parser.add_argument("--rate-scale", type=float, default=1.0,
+                        help="multiply every host's rate limit (stub runs only)")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit 1 if the command made a request the cassette does not have")
+    # Everything after "--" is the command to run
+    argv = sys.argv[1:]
+    command = argv[argv.index("--") + 1:] if "--" in argv else []
+    args = parser.parse_args(argv[:argv.index("--")] if "--" in argv else argv)
+
+    # Every response must reach the harness, and a run must not resume old state
+    env = dict(os.environ, HEROINES_HTTP_CACHE="off", HEROINES_CHECKPOINTS="off")
+
+    if args.mode == "record":
+        if not command:
+            parser.error("record needs a command to run")
+        env[RECORD_ENV] = args.cassette
+        sys.exit(subprocess.call(command, env=env))
+
+    stub = StubServer(args.cassette, port=args.port, latency=args.latency, throttle_every=args.throttle_every,
+                      retry_after=args.retry_after, page_size=args.page_size).start()
+    print(f"Replaying {len(stub.cassette)} responses from {args.cassette} at {stub.url}")
+    if args.mode == "serve":
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stub.stop()
+        return
+
+    if not command:
+        parser.error("run needs a command to run")
+    env[STUB_ENV] = stub.url
+    env[RATE_SCALE_ENV] = str(args.rate_scale)
+    start = time.perf_counter()
+    try:
+        code = subprocess.call(command, env=env)
+    finally:
+        stub.stop()
+    elapsed = time.perf_counter() - start
+    stats = stub.stats
+    print(f"Stub: {stats['requests']} requests in {elapsed:.1f}s "
+          f"({stats['requests'] / max(elapsed, 1e-9):.1f}/s), {stats['throttled']} throttled, "
+          f"{stats['missing']} not recorded; per host: {stats['hosts']}")
+    if args.strict and stats["missing"] and not code:
+        print("Requests missing from the cassette; failing (--strict)")
+        code = 1
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import requests
 import json
 import time
 
+from wikipedia_client import CategoryCrawler, WikipediaClient
+
 def get_unsung_heroine_data(page_title):
     """Retrieves data from Wikipedia API for a given page title (Unsung Heroines)."""
     headers = {
@@ -32,18 +34,18 @@ def get_unsung_heroine_data(page_title):
         print(f"An unexpected error occured: {e}")
         return None
 
-def get_unsung_heroines_from_category(category_title):
-    """Gets a list of women page titles from a wikipedia category (Unsung Heroines)."""
-    headers = {
+def get_unsung_heroines_from_category(category_title, depth=0):
+    """Gets a list of women page titles from a wikipedia category (Unsung Heroines).
+
+    Follows continuation past the first 500 members and lists articles only;
+    subcategories are crawled down to ``depth``.
+    """
+    client = WikipediaClient()
+    client.session.headers.update({
         'User-Agent': 'TheUnsungHeroines/1.0 (your.email@example.com)'
-    }
-    url = f"https://en.wikipedia.org/w/api.php?action=query&format=json&list=categorymembers&cmtitle=Category:{category_title}&cmlimit=500"
+    })
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        women_titles = [member['title'] for member in data['query']['categorymembers']]
-        return women_titles
+        return list(CategoryCrawler(client, category_title, depth=depth))
     except requests.exceptions.RequestException as e:
         print(f"Error during request: {e}")
         return None
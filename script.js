@@ -1,10 +1,34 @@
 // ── Data loading ──────────────────────────────────────────────────────────
-fetch('unsung_heroines_data.json')
-    .then(r => r.json())
-    .then(data => {
+// The build step (data_merger.export_bundle) writes data/featured.json for the
+// current week and the next, so a normal page view downloads a single file. If
+// the bundle is older than that, the index points at the shard holding this
+// week's entry.
+const WEEK_MS = 7 * 24 * 60 * 60 * 1000;
+
+function fetchJSON(url) {
+    return fetch(url).then(r => {
+        if (!r.ok) throw new Error(`${url}: HTTP ${r.status}`);
+        return r.json();
+    });
+}
+
+function loadHeroine(weekNumber) {
+    return fetchJSON('data/featured.json').then(featured => {
+        const current = [featured, featured.next].find(f => f && f.week === weekNumber);
+        if (current) return current.heroine;
+
+        return fetchJSON('data/index.json').then(index => {
+            if (!index.count) return null;
+            const position = weekNumber % index.count;
+            const shard = index.shards[Math.floor(position / index.shard_size)];
+            return fetchJSON(`data/${shard}`).then(entries => entries[position % index.shard_size]);
+        });
+    });
+}
+
+loadHeroine(Math.floor(Date.now() / WEEK_MS))
+    .then(heroine => {
         const container = document.getElementById('heroine-content');
-        const weekNumber = Math.floor(Date.now() / (7 * 24 * 60 * 60 * 1000));
-        const heroine = data[weekNumber % data.length];
 
         if (!heroine || !heroine.name) {
             container.innerHTML = '<p class="state-message">No featured heroine this week.</p>';
@@ -35,9 +59,13 @@ function buildCard(h) {
 function buildPortrait(h) {
     if (h.image) {
         const credit = h.image_credit || '';
+        // Intrinsic size from the image pipeline lets the browser reserve space
+        const size = h.image_width && h.image_height
+            ? ` width="${h.image_width}" height="${h.image_height}"`
+            : '';
         return `
           <div class="heroine-portrait">
-            <img src="${h.image}" alt="Portrait of ${h.name}" loading="lazy">
+            <img src="${h.image}" alt="Portrait of ${h.name}"${size} loading="lazy">
             ${credit ? `<p class="image-credit">${credit}</p>` : ''}
           </div>`;
     }
@@ -51,6 +51,49 @@ SAMPLE_DIFFERENT_WOMAN = {
     'last_updated': '2025-11-29'
 }
 
+class FakeResponse:
+    """Minimal stand-in for requests.Response."""
+    
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+        # Text/bytes payloads stand in for page bodies
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        self.content = payload if isinstance(payload, bytes) else b''
+        self.text = self.content.decode('utf-8', 'replace')
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+    
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Replays canned responses and records the params of each request.
+    
+    ``responses`` is a list replayed in order, or a function of
+    (url, params) for requests whose order is not fixed.
+    """
+    
+    def __init__(self, responses):
+        self.route = responses if callable(responses) else None
+        self.responses = [] if self.route else list(responses)
+        self.calls = []
+    
+    def request(self, method, url, params=None, **kwargs):
+        self.calls.append(dict(params or {}))
+        if self.route:
+            return self.route(url, dict(params or {}))
+        return self.responses.pop(0)
+    
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+
 class TestSuite:
     """Automated test suite for scraper system."""
     
@@ -143,6 +186,1137 @@ class TestSuite:
         except Exception as e:
             self.test_failed("Data Merger Import", str(e))
     
+    def test_merger_index(self):
+        """Test that the candidate index reproduces linear-scan decisions."""
+        print("\n=== Testing Merger Index ===")
+        
+        try:
+            from data_merger import DataMerger, blocking_keys
+            
+            fixtures = [
+                SAMPLE_WIKIDATA_ENTRY, SAMPLE_WIKIPEDIA_ENTRY, SAMPLE_DIFFERENT_WOMAN,
+                {'name': 'Ada King', 'birth_date': '1815-12-10', 'sources': []},
+                {'name': 'Grace Hoppre', 'birth_date': '1906-12-09', 'sources': []},
+            ]
+            decisions = {}
+            for use_index in (True, False):
+                merger = DataMerger(use_index=use_index)
+                for woman in fixtures:
+                    merger.add_woman(woman)
+                decisions[use_index] = list(merger.merged_data.items())
+            self.assert_equal(decisions[True], decisions[False], "Indexed merge matches linear scan")
+            
+            merger = DataMerger()
+            merger.add_woman(SAMPLE_DIFFERENT_WOMAN)
+            self.assert_equal(
+                merger.find_matching_entry({'name': 'G. M. Hopper', 'wikidata_id': 'Q11641'}, merger.merged_data),
+                'Q11641',
+                "Wikidata ID lookup bypasses name blocking"
+            )
+            self.assert_true(
+                blocking_keys('Grace Hopper') & blocking_keys('Grace Hoppre'),
+                "Transposed surname shares a blocking key"
+            )
+            self.assert_true(
+                blocking_keys('Mary Jane Smith') & blocking_keys('Maryjane Smith'),
+                "Spacing variant shares a blocking key"
+            )
+            self.assert_true(
+                blocking_keys('Lise Meitner') & blocking_keys('Lise Maitnar'),
+                "Phonetic variant shares a blocking key"
+            )
+            self.assert_true(
+                not blocking_keys('Ada Kalovelace') & blocking_keys('Ada Kolafelt'),
+                "Surnames sharing only a four-character Soundex prefix are not blocked together"
+            )
+            
+        except Exception as e:
+            self.test_failed("Merger Index", str(e))
+    
+    def test_wikipedia_client(self):
+        """Test batched title fetches with normalisation, redirects and continuation."""
+        print("\n=== Testing Wikipedia Client ===")
+        
+        try:
+            from wikipedia_client import WikipediaClient
+            
+            first = {
+                'continue': {'excontinue': 1, 'continue': '||pageimages'},
+                'query': {
+                    'normalized': [{'from': 'ada_lovelace', 'to': 'Ada lovelace'}],
+                    'redirects': [{'from': 'Ada lovelace', 'to': 'Ada Lovelace'}],
+                    'pages': {
+                        '1': {'pageid': 1, 'title': 'Ada Lovelace', 'extract': 'Ada was...'},
+                        '2': {'pageid': 2, 'title': 'Grace Hopper',
+                              'thumbnail': {'source': 'https://example.com/grace.jpg'}},
+                        '-1': {'title': 'Nobody Atall', 'missing': ''},
+                    },
+                },
+            }
+            second = {
+                'query': {
+                    'pages': {
+                        '1': {'pageid': 1, 'title': 'Ada Lovelace'},
+                        '2': {'pageid': 2, 'title': 'Grace Hopper', 'extract': 'Grace was...'},
+                        '-1': {'title': 'Nobody Atall', 'missing': ''},
+                    },
+                },
+            }
+            session = FakeSession([FakeResponse(first), FakeResponse(second)])
+            client = WikipediaClient(session)
+            summaries = client.fetch_summaries(['ada_lovelace', 'Grace Hopper', 'Nobody Atall'])
+            
+            self.assert_equal(len(session.calls), 2, "One request plus one continuation")
+            self.assert_equal(session.calls[0]['titles'], 'ada_lovelace|Grace Hopper|Nobody Atall',
+                              "Titles packed into a single request")
+            self.assert_equal(session.calls[1].get('excontinue'), 1, "Continuation token forwarded")
+            self.assert_equal(summaries['ada_lovelace'], ('Ada was...', None),
+                              "Normalised + redirected title mapped back to input")
+            self.assert_equal(summaries['Grace Hopper'], ('Grace was...', 'https://example.com/grace.jpg'),
+                              "Continued extract merged into page")
+            self.assert_equal(summaries['Nobody Atall'], (None, None), "Missing page maps to None")
+
+            # A batch that fails part-way is unknown, not missing
+            session = FakeSession([FakeResponse(first), FakeResponse({}, status_code=404)])
+            pages = WikipediaClient(session).query_titles(['Ada Lovelace', 'Nobody Atall'])
+            self.assert_equal(pages, {}, "Failed batch leaves its titles out")
+
+        except Exception as e:
+            self.test_failed("Wikipedia Client", str(e))
+    
+    def test_fetch_engine(self):
+        """Test token-bucket pacing, AIMD rate changes and Retry-After/maxlag handling."""
+        print("\n=== Testing Fetch Engine ===")
+        
+        try:
+            from fetch_engine import FetchEngine, TokenBucket, limiter_stats, retry_after_seconds
+            
+            bucket = TokenBucket(rate=10, burst=2)
+            waits = [bucket.reserve() for _ in range(3)]
+            self.assert_equal(waits[:2], [0.0, 0.0], "Burst requests go out immediately")
+            self.assert_true(0.05 < waits[2] <= 0.1, "Request beyond burst is spaced by 1/rate",
+                             f"waited {waits[2]:.3f}s")
+            
+            self.assert_equal(retry_after_seconds('7', 1), 7, "Retry-After seconds parsed")
+            self.assert_equal(retry_after_seconds('soon', 1), 1, "Unparseable Retry-After falls back")
+            
+            session = FakeSession([
+                FakeResponse({}, status_code=429, headers={'Retry-After': '0'}),
+                FakeResponse({'ok': True}),
+            ])
+            engine = FetchEngine(session)
+            results = engine.map(lambda url: engine.get_json(url), ['https://test.invalid/a'])
+            self.assert_equal(results, [{'ok': True}], "429 retried after Retry-After")
+            self.assert_equal(engine.requests_made, 2, "Retry counted as a request")
+            
+            # AIMD: healthy responses add a tenth of the start rate, throttling halves it
+            bucket = TokenBucket(rate=1.0, max_rate=1.25)
+            for _ in range(5):
+                bucket.succeed()
+            self.assert_equal(bucket.rate, 1.25, "Rate rises while healthy, capped at max_rate")
+            bucket.throttle(0)
+            self.assert_equal(bucket.rate, 0.625, "Rate halved when throttled")
+            
+            session = FakeSession([
+                FakeResponse({'error': {'code': 'maxlag'}}, headers={'X-Database-Lag': '7', 'Retry-After': '0'}),
+                FakeResponse({'query': {}}),
+            ])
+            engine = FetchEngine(session)
+            result = engine.run(engine.get_json('https://en.wikipedia.org/w/api.php', params={'action': 'query'}))
+            self.assert_equal(result, {'query': {}}, "maxlag refusal retried")
+            self.assert_equal(session.calls[0].get('maxlag'), 5, "maxlag sent to MediaWiki APIs")
+            self.assert_true('en.wikipedia.org' in limiter_stats(), "Current rate exposed per host")
+            
+            # One attempt: the 429 is returned as-is; zero attempts are refused up front
+            engine = FetchEngine(FakeSession([FakeResponse({}, status_code=429, headers={'Retry-After': '0'})]),
+                                 retries=1)
+            resp = engine.run(engine.get('https://test.invalid/b'))
+            self.assert_equal(resp.status_code, 429, "Last throttled response returned")
+            try:
+                FetchEngine(retries=0)
+                self.test_failed("retries=0 rejected", "no error raised")
+            except ValueError:
+                self.test_passed("retries=0 rejected")
+            
+        except Exception as e:
+            self.test_failed("Fetch Engine", str(e))
+    
+    def test_http_cache(self):
+        """Test cache keys, storage round-trip and LRU eviction."""
+        print("\n=== Testing HTTP Cache ===")
+        
+        try:
+            import os
+            import tempfile
+            from http_cache import HTTPCache, normalize_url
+            
+            self.assert_equal(
+                normalize_url('HTTPS://En.Wikipedia.org/w/api.php?titles=A&action=query#x'),
+                normalize_url('https://en.wikipedia.org/w/api.php?action=query&titles=A'),
+                "Cache key ignores param order, host case and fragment"
+            )
+            
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = HTTPCache(os.path.join(tmp, 'cache.sqlite'), max_bytes=20)
+                response = FakeResponse({}, headers={'ETag': '"v1"'})
+                response.content = b'x' * 1000
+                cache.set('a', response)
+                entry = cache.get('a')
+                self.assert_equal((entry['body'], entry['etag']), (b'x' * 1000, '"v1"'),
+                                  "Stored body and ETag round-trip")
+                
+                response.content = b'y' * 1000
+                cache.set('b', response)
+                self.assert_true(cache.get('a') is None and cache.get('b') is not None,
+                                 "Least recently used entry evicted over size limit")
+                cache.close()
+            
+        except Exception as e:
+            self.test_failed("HTTP Cache", str(e))
+    
+    def test_incremental_merge(self):
+        """Test that incremental merges skip unchanged records."""
+        print("\n=== Testing Incremental Merge ===")
+        
+        try:
+            import copy
+            from data_merger import DataMerger
+            
+            merger = DataMerger()
+            merger.merge_datasets([SAMPLE_WIKIDATA_ENTRY, SAMPLE_DIFFERENT_WOMAN])
+            snapshot = copy.deepcopy(list(merger.merged_data.values()))
+            for entry in snapshot:
+                entry['last_updated'] = '2000-01-01'
+            
+            merger = DataMerger()
+            merger.load_snapshot(copy.deepcopy(snapshot))
+            touched = merger.merge_incremental([SAMPLE_WIKIPEDIA_ENTRY])
+            self.assert_equal(touched, ['Q7251'], "Changed record touches only its entry")
+            self.assert_equal(merger.merged_data['Q11641'], snapshot[1], "Untouched entry left as-is")
+            
+            rerun = dict(SAMPLE_WIKIPEDIA_ENTRY, last_updated='2030-01-01')
+            rerun['sources'] = [dict(rerun['sources'][0], accessed='2030-01-01')]
+            self.assert_equal(merger.merge_incremental([rerun]), [],
+                              "Record differing only in dates is skipped")
+            
+            merger = DataMerger()
+            merger.load_snapshot(copy.deepcopy(snapshot))
+            merger.merge_incremental([SAMPLE_DIFFERENT_WOMAN])
+            self.assert_equal(merger.merged_data['Q11641']['last_updated'], '2000-01-01',
+                              "No-op merge keeps last_updated")
+            
+        except Exception as e:
+            self.test_failed("Incremental Merge", str(e))
+    
+    def test_wikidata_keyset(self):
+        """Test keyset row parsing and cursor handling."""
+        print("\n=== Testing Wikidata Keyset Pagination ===")
+        
+        try:
+            from wikidata_scraper import WikidataScraper
+            
+            scraper = WikidataScraper()
+            def binding(qid, name):
+                return {'person': {'value': f"http://www.wikidata.org/entity/{qid}"},
+                        'personLabel': {'value': name},
+                        'occupations': {'value': 'physicist|chemist'}}
+            
+            pages = [
+                {'results': {'bindings': [binding('Q1', 'Ada Example'), binding('Q2', 'Bea Example')]}},
+                {'results': {'bindings': [binding('Q3', 'Cy Example')]}},
+            ]
+            cursors = []
+            def fake_query(limit, after_qid=None):
+                cursors.append(after_qid)
+                return pages[len(cursors) - 1]
+            scraper.query_wikidata_keyset = fake_query
+            
+            women = scraper.parse_results(pages[0])
+            self.assert_equal(women[0]['fields'], ['physicist', 'chemist'], "Aggregated occupations split into fields")
+            self.assert_equal(women[0]['sources'][0]['url'], 'https://www.wikidata.org/wiki/Q1',
+                              "Wikidata URL built from QID")
+            
+            batches = list(scraper.iter_keyset_pages(total_limit=10, batch_size=2))
+            self.assert_equal(cursors, [None, 'Q2'], "Each page resumes after the previous page's last QID")
+            self.assert_equal([qid for qid, _ in batches], ['Q2', 'Q3'], "Pages yield their resume cursor")
+            
+        except Exception as e:
+            self.test_failed("Wikidata Keyset Pagination", str(e))
+    
+    def test_wikidata_entities(self):
+        """Test batched wbgetentities lookups and claim parsing."""
+        print("\n=== Testing Wikidata Entity Lookup ===")
+        
+        try:
+            from wikidata_scraper import WikidataScraper
+            
+            def time_claim(value, precision, rank='normal'):
+                return {'rank': rank, 'mainsnak': {'snaktype': 'value', 'datavalue': {
+                    'value': {'time': value, 'precision': precision}}}}
+            
+            people = {'entities': {
+                'Q7251': {
+                    'id': 'Q7251',
+                    'labels': {'en': {'value': 'Ada Lovelace'}},
+                    'claims': {
+                        'P569': [time_claim('+1815-12-10T00:00:00Z', 11)],
+                        'P570': [time_claim('+1850-00-00T00:00:00Z', 9),
+                                 time_claim('+1852-11-27T00:00:00Z', 11, rank='preferred')],
+                        'P106': [{'rank': 'normal', 'mainsnak': {'snaktype': 'value',
+                                  'datavalue': {'value': {'id': 'Q170790'}}}}],
+                        'P18': [{'rank': 'normal', 'mainsnak': {'snaktype': 'value',
+                                 'datavalue': {'value': 'Ada Lovelace portrait.jpg'}}}],
+                    },
+                    'sitelinks': {'enwiki': {'url': 'https://en.wikipedia.org/wiki/Ada_Lovelace'}},
+                },
+                'Q404': {'id': 'Q404', 'missing': ''},
+            }}
+            labels = {'entities': {'Q170790': {'id': 'Q170790', 'labels': {'en': {'value': 'mathematician'}}}}}
+            
+            scraper = WikidataScraper()
+            session = FakeSession([FakeResponse(people), FakeResponse(labels)])
+            scraper.engine.session = session
+            records = scraper.fetch_entity_records(['Q7251', 'Q404', 'Q7251'])
+            
+            self.assert_equal(session.calls[0]['ids'], 'Q7251|Q404', "QIDs deduplicated into one call")
+            self.assert_equal(session.calls[1]['ids'], 'Q170790', "Occupation labels fetched in a second call")
+            self.assert_equal(len(records), 1, "Missing entity skipped")
+            ada = records[0]
+            self.assert_equal((ada['birth_date'], ada['death_date']), ('1815-12-10', '1852-11-27'),
+                              "Dates parsed with preferred rank first")
+            self.assert_equal(ada['fields'], ['mathematician'], "Occupation labels resolved")
+            self.assert_true('Ada_Lovelace_portrait.jpg' in ada['image'], "Commons image turned into thumbnail URL")
+            self.assert_equal(WikidataScraper._entity_date({'time': '+1850-00-00T00:00:00Z', 'precision': 9}),
+                              '1850-01-01', "Year precision padded like SPARQL")
+            
+        except Exception as e:
+            self.test_failed("Wikidata Entity Lookup", str(e))
+    
+    def test_jsonl_stream(self):
+        """Test JSON Lines round-trip, truncated lines and streamed merging."""
+        print("\n=== Testing JSON Lines Streaming ===")
+        
+        try:
+            import os
+            import tempfile
+            from data_merger import DataMerger
+            from jsonl_io import read_jsonl, write_jsonl
+            
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'stage.jsonl')
+                records = [SAMPLE_WIKIDATA_ENTRY, SAMPLE_WIKIPEDIA_ENTRY, SAMPLE_DIFFERENT_WOMAN]
+                self.assert_equal(write_jsonl(iter(records), path), 3, "Generator written line by line")
+                self.assert_equal(list(read_jsonl(path)), records, "Records round-trip")
+                
+                # Simulate a crash part-way through writing the last record
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write('{"name": "Half writ')
+                self.assert_equal(len(list(read_jsonl(path))), 3, "Truncated last line dropped")
+                
+                merger = DataMerger()
+                merged = merger.merge_datasets(read_jsonl(path))
+                self.assert_equal(len(merged), 2, "Merger consumes a record stream")
+            
+        except Exception as e:
+            self.test_failed("JSON Lines Streaming", str(e))
+    
+    def test_checkpoints(self):
+        """Test checkpoint cursors, done sets and resumed scraping."""
+        print("\n=== Testing Checkpoints ===")
+        
+        try:
+            import os
+            import tempfile
+            from checkpoint import CheckpointStore
+            from wikidata_scraper import WikidataScraper
+            import enrich_bios
+            
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'checkpoints.sqlite')
+                store = CheckpointStore('test', path)
+                store.set('wikidata', {'after_qid': 'Q2', 'fetched': 2})
+                store.mark_done('wikipedia', ['Women scientists|Ada Lovelace'])
+                store.close()
+                
+                store = CheckpointStore('test', path)
+                self.assert_equal(store.get('wikidata'), {'after_qid': 'Q2', 'fetched': 2},
+                                  "Cursor survives reopening")
+                self.assert_equal(store.done('wikipedia'), {'Women scientists|Ada Lovelace'},
+                                  "Done set survives reopening")
+                self.assert_equal(CheckpointStore('other', path).get('wikidata'), None,
+                                  "Scopes are independent")
+                
+                # Resume the SPARQL scrape from the stored cursor
+                scraper = WikidataScraper()
+                calls = []
+                def fake_pages(total_limit, after_qid=None):
+                    calls.append((total_limit, after_qid))
+                    yield 'Q3', [{'wikidata_id': 'Q3'}]
+                scraper.iter_keyset_pages = fake_pages
+                records = list(scraper.iter_records(total_limit=5, checkpoint=store))
+                self.assert_equal(calls, [(3, 'Q2')], "Wikidata resumes after saved QID with remaining limit")
+                self.assert_equal((len(records), store.get('wikidata')), (1, {'after_qid': 'Q3', 'fetched': 3}),
+                                  "Cursor advanced after the page is consumed")
+                
+                # Enrichment restores finished work without refetching it
+                enrich_store = CheckpointStore('enrich_bios', path)
+                enrich_store.set('patch:Q1', {'biography': 'x' * 400})
+                enrich_store.mark_done('enriched', ['Q1'])
+                data = [{'id': 'Q1', 'name': 'Ada', 'image': 'a.jpg', 'biography': 'short'}]
+                enrich_bios.enrich(data, enrich_store)
+                self.assert_equal(len(data[0]['biography']), 400, "Saved enrichment reapplied on resume")
+                
+                # Progress is tied to the input it was made from
+                self.assert_true(not enrich_store.bind('hash-a'), "First bind starts fresh")
+                enrich_store.mark_done('enriched', ['Q1'])
+                self.assert_true(enrich_store.bind('hash-a'), "Same input keeps its progress")
+                self.assert_true(not enrich_store.bind('hash-b') and not enrich_store.done('enriched'),
+                                 "Progress for another input discarded")
+                store.close()
+                enrich_store.close()
+            
+        except Exception as e:
+            self.test_failed("Checkpoints", str(e))
+    
+    def test_parallel_merge(self):
+        """Test that the process-pool match phase gives identical output."""
+        print("\n=== Testing Parallel Merge ===")
+        
+        try:
+            import contextlib
+            import io
+            from benchmark import synthetic_datasets
+            from data_merger import DataMerger
+            
+            datasets = synthetic_datasets(200)
+            outputs = []
+            for workers in (None, 2):
+                merger = DataMerger(workers=workers)
+                merger.MATCH_BATCH_SIZE = 64
+                with contextlib.redirect_stdout(io.StringIO()):
+                    merged = merger.merge_datasets(*datasets)
+                outputs.append(json.dumps(merged, ensure_ascii=False, indent=2))
+            self.assert_equal(outputs[0], outputs[1], "workers=2 output byte-identical to serial")
+            
+        except Exception as e:
+            self.test_failed("Parallel Merge", str(e))
+    
+    def test_similarity_backends(self):
+        """Test the reference and n-gram similarity backends."""
+        print("\n=== Testing Similarity Backends ===")
+        
+        try:
+            from data_merger import DataMerger
+            from similarity import NgramBackend, get_backend
+            
+            reference = get_backend()
+            self.assert_equal(reference.ratio('Ada Lovelace', 'ada lovelace'), 1.0, "Reference ignores case")
+            
+            ngram = NgramBackend()
+            self.assert_equal(round(ngram.ratio('Lovelace, Ada', 'Ada Lovelace'), 6), 1.0,
+                              "N-gram profile is token-sorted and punctuation-free")
+            self.assert_equal(round(ngram.ratio('Émilie du Châtelet', 'Emilie du Chatelet'), 6), 1.0,
+                              "N-gram profile folds accents")
+            candidates = ['Ada Lovelace', 'Grace Hopper', 'Ada Lovelase', '']
+            self.assert_equal([round(s, 9) for s in ngram.scores('Ada Lovelace', candidates)],
+                              [round(ngram.ratio('Ada Lovelace', c), 9) for c in candidates],
+                              "Batched scores equal pairwise scores")
+            
+            merger = DataMerger(similarity='ngram')
+            merged = merger.merge_datasets([SAMPLE_WIKIDATA_ENTRY, SAMPLE_DIFFERENT_WOMAN],
+                                           [dict(SAMPLE_WIKIPEDIA_ENTRY, wikidata_id=None)])
+            self.assert_equal(len(merged), 2, "N-gram backend still merges name matches")
+            
+            try:
+                get_backend('nope')
+                self.test_failed("Unknown backend rejected", "No error raised")
+            except ValueError:
+                self.test_passed("Unknown backend rejected")
+            
+        except Exception as e:
+            self.test_failed("Similarity Backends", str(e))
+    
+    def test_merge_lists(self):
+        """Test canonical-key merging of fields and sources."""
+        print("\n=== Testing List Merging ===")
+        
+        try:
+            from data_merger import DataMerger
+            
+            merger = DataMerger()
+            self.assert_equal(merger.merge_lists(['Physics', 'Chemistry'], ['physics ', 'Mathematics', 'Chemistry']),
+                              ['Physics', 'Chemistry', 'Mathematics'],
+                              "Fields deduplicated by casefolded text in first-seen order")
+            
+            existing = [{'name': 'Wikipedia', 'url': 'https://en.wikipedia.org/wiki/Ada_Lovelace', 'accessed': '2025-11-29'},
+                        {'name': 'Wikidata', 'url': 'https://www.wikidata.org/wiki/Q7251', 'accessed': '2025-11-29'}]
+            new = [{'name': 'Wikipedia', 'url': 'http://en.wikipedia.org/wiki/Ada%20Lovelace#Life', 'accessed': '2026-01-05'},
+                   {'name': 'Nobel', 'url': 'https://www.nobelprize.org/', 'accessed': '2026-01-05'}]
+            merged = merger.merge_sources(existing, new)
+            self.assert_equal([s['name'] for s in merged], ['Wikipedia', 'Wikidata', 'Nobel'],
+                              "Sources keyed by normalized URL")
+            self.assert_equal((merged[0]['url'], merged[0]['accessed']),
+                              ('https://en.wikipedia.org/wiki/Ada_Lovelace', '2026-01-05'),
+                              "Repeated source keeps first entry with newest access date")
+            self.assert_equal(merger.merge_sources(merged, new), merged, "Source merge is idempotent")
+            
+        except Exception as e:
+            self.test_failed("List Merging", str(e))
+    
+    def test_category_crawler(self):
+        """Test category continuation, subcategory depth and crawl resumption."""
+        print("\n=== Testing Category Crawler ===")
+        
+        try:
+            from itertools import islice
+            from wikipedia_client import NON_PERSON_PREFIXES, CategoryCrawler, WikipediaClient
+            
+            def member(title, ns=0):
+                return {'ns': ns, 'title': title}
+            def pages():
+                return [
+                    FakeResponse({'continue': {'cmcontinue': 'page|2'}, 'query': {'categorymembers': [
+                        member('Ada Lovelace'), member('Category:Women chemists', 14),
+                        member('List of women scientists')]}}),
+                    FakeResponse({'query': {'categorymembers': [
+                        member('Grace Hopper'), member('Category:Women scientists', 14)]}}),
+                    FakeResponse({'query': {'categorymembers': [
+                        member('Marie Curie'), member('Ada Lovelace')]}}),
+                ]
+            
+            session = FakeSession(pages())
+            crawler = CategoryCrawler(WikipediaClient(session), 'Women scientists', depth=1,
+                                      exclude=NON_PERSON_PREFIXES)
+            self.assert_equal(list(crawler), ['Ada Lovelace', 'Grace Hopper', 'Marie Curie'],
+                              "Pages, continuation and subcategory crawled once each")
+            self.assert_equal((session.calls[0]['cmnamespace'], session.calls[0]['cmtype']),
+                              ('0|14', 'page|subcat'), "Namespaces filtered server-side")
+            self.assert_equal(session.calls[1].get('cmcontinue'), 'page|2', "Continuation token forwarded")
+            self.assert_equal(session.calls[2]['cmtitle'], 'Category:Women chemists', "Subcategory visited")
+            self.assert_true(crawler.state['complete'], "Crawl marked complete")
+            
+            session = FakeSession(pages())
+            flat = CategoryCrawler(WikipediaClient(session), 'Women scientists')
+            self.assert_equal(list(flat), ['Ada Lovelace', 'List of women scientists', 'Grace Hopper'],
+                              "Depth 0 stays in the category")
+            self.assert_equal(session.calls[0]['cmtype'], 'page', "Depth 0 lists articles only")
+            
+            # Stop after one title, then resume from the saved state
+            crawler = CategoryCrawler(WikipediaClient(FakeSession(pages())), 'Women scientists', depth=1)
+            first = list(islice(crawler, 1))
+            session = FakeSession(pages())
+            resumed = CategoryCrawler(WikipediaClient(session), 'Women scientists', depth=1, state=crawler.state)
+            self.assert_equal(first + list(resumed),
+                              ['Ada Lovelace', 'List of women scientists', 'Grace Hopper', 'Marie Curie'],
+                              "Resumed crawl continues after the last title")
+            
+        except Exception as e:
+            self.test_failed("Category Crawler", str(e))
+    
+    def test_category_generator(self):
+        """Test generator=categorymembers crawling with property continuation."""
+        print("\n=== Testing Category Generator Mode ===")
+        
+        try:
+            from enhanced_scraper import wikipedia_page_to_record
+            from wikipedia_client import DEFAULT_PAGE_PARAMS, CategoryCrawler, WikipediaClient
+            
+            ada = {'pageid': 1, 'ns': 0, 'title': 'Ada Lovelace', 'fullurl': 'https://en.wikipedia.org/wiki/Ada_Lovelace',
+                   'pageprops': {'wikibase_item': 'Q7259'}}
+            grace = {'pageid': 2, 'ns': 0, 'title': 'Grace Hopper'}
+            session = FakeSession([
+                # Extracts still pending for this batch: same generator batch continues
+                FakeResponse({'continue': {'excontinue': 1, 'continue': '||pageimages'},
+                              'query': {'pages': {'1': ada, '2': grace}}}),
+                FakeResponse({'continue': {'gcmcontinue': 'page|2', 'continue': 'gcmcontinue||'},
+                              'query': {'pages': {'1': {'pageid': 1, 'ns': 0, 'title': 'Ada Lovelace'},
+                                                  '2': dict(grace, extract='Grace was...')}}}),
+                FakeResponse({'query': {'pages': {'3': {'pageid': 3, 'ns': 0, 'title': 'Marie Curie'}}}}),
+            ])
+            crawler = CategoryCrawler(WikipediaClient(session), 'Women scientists',
+                                      page_params=DEFAULT_PAGE_PARAMS)
+            pages = list(crawler)
+            
+            self.assert_equal([p['title'] for p in pages], ['Ada Lovelace', 'Grace Hopper', 'Marie Curie'],
+                              "Generator batches followed to the end")
+            self.assert_equal(session.calls[0]['generator'], 'categorymembers', "Members and pages in one query")
+            self.assert_equal(session.calls[1].get('excontinue'), 1, "Property continuation forwarded")
+            self.assert_equal(session.calls[2].get('gcmcontinue'), 'page|2', "Generator continuation forwarded")
+            self.assert_equal(pages[1].get('extract'), 'Grace was...', "Continued properties merged into page")
+            
+            record = wikipedia_page_to_record(pages[0])
+            self.assert_equal(sorted(record), ['biography', 'image', 'last_updated', 'name', 'sources', 'wikidata_id'],
+                              "Same record shape as title lookups")
+            self.assert_equal(record['wikidata_id'], 'Q7259', "Wikidata ID taken from pageprops")
+            
+        except Exception as e:
+            self.test_failed("Category Generator Mode", str(e))
+    
+    def test_nobel_pipeline(self):
+        """Test pipelined Nobel paging joined with batched Wikipedia lookups."""
+        print("\n=== Testing Nobel Pipeline ===")
+        
+        try:
+            from nobel_scraper import NobelScraper
+            
+            def laureate(qid, name, article):
+                return {'id': qid, 'knownName': {'en': name},
+                        'wikipedia': {'english': f'https://en.wikipedia.org/wiki/{article}'}}
+            nobel_pages = [
+                [laureate('6', 'Marie Curie', 'Marie_Curie'), laureate('7', 'Irène Joliot-Curie', 'Ir%C3%A8ne_Joliot-Curie')],
+                [laureate('8', 'Dorothy Hodgkin', 'Dorothy_Hodgkin')],
+            ]
+            order = []
+            def route(url, params):
+                if 'nobelprize' in url:
+                    order.append(f"nobel:{params['offset']}")
+                    return FakeResponse({'laureates': nobel_pages[params['offset'] // 2], 'meta': {'count': 3}})
+                titles = params['titles'].split('|')
+                order.append(f"wiki:{len(titles)}")
+                return FakeResponse({'query': {'pages': {
+                    str(i): {'pageid': i, 'title': t, 'extract': f'{t} was...'} for i, t in enumerate(titles)}}})
+            
+            scraper = NobelScraper()
+            scraper.engine.session = FakeSession(route)
+            laureates = list(scraper.engine.iterate(scraper.iter_laureates_pipelined(limit=2)))
+            
+            self.assert_equal(len(laureates), 3, "Every Nobel page consumed")
+            self.assert_equal(order[:2], ['nobel:0', 'nobel:2'], "Next Nobel page requested before articles arrive")
+            self.assert_equal(sorted(order[2:]), ['wiki:1', 'wiki:2'], "One multi-title lookup per Nobel page")
+            entry = scraper.parse_laureate(laureates[1])
+            self.assert_equal(entry['biography'], 'Irène Joliot-Curie was...', "Article joined back by URL")
+            
+        except Exception as e:
+            self.test_failed("Nobel Pipeline", str(e))
+    
+    def test_site_bundle(self):
+        """Test the sharded static bundle and the featured entry."""
+        print("\n=== Testing Site Bundle ===")
+        
+        try:
+            import json
+            import os
+            import tempfile
+            from data_merger import export_bundle
+            
+            records = [{'name': f'Heroine {i}', 'last_updated': f'2025-11-{10 + i}'} for i in range(10)]
+            with tempfile.TemporaryDirectory() as tmp:
+                export_bundle(records * 2, tmp, shard_size=4, week=7)
+                index = export_bundle(records, tmp, shard_size=4, week=2913)
+                self.assert_equal(sorted(os.listdir(os.path.join(tmp, 'shards'))),
+                                  ['0000.json', '0001.json', '0002.json'], "Stale shards removed")
+                self.assert_equal(index['last_updated'], '2025-11-19', "Index dated by its newest entry")
+                
+                with open(os.path.join(tmp, 'featured.json'), encoding='utf-8') as f:
+                    featured = json.load(f)
+                self.assert_equal(featured['heroine'], records[2913 % 10], "Featured entry is week % count")
+                self.assert_equal((featured['next']['week'], featured['next']['heroine']),
+                                  (2914, records[2914 % 10]), "Next week's entry precomputed")
+                
+                with open(os.path.join(tmp, 'index.json'), 'rb') as f:
+                    first = f.read()
+                export_bundle(records, tmp, shard_size=4, week=2913)
+                with open(os.path.join(tmp, 'index.json'), 'rb') as f:
+                    self.assert_equal(f.read(), first, "Unchanged data gives an identical index")
+                
+                # What script.js does when featured.json is from another week
+                week = 2921
+                position = week % index['count']
+                with open(os.path.join(tmp, index['shards'][position // index['shard_size']]), encoding='utf-8') as f:
+                    shard = json.load(f)
+                self.assert_equal(shard[position % index['shard_size']], records[week % 10],
+                                  "Shard lookup finds the same entry as the full list")
+            
+        except Exception as e:
+            self.test_failed("Site Bundle", str(e))
+    
+    def test_canonical_output(self):
+        """Test canonical minified output and its compressed variants."""
+        print("\n=== Testing Canonical Output ===")
+        
+        try:
+            import gzip
+            import json
+            import os
+            import tempfile
+            from data_merger import write_canonical_json
+            
+            records = [SAMPLE_WIKIPEDIA_ENTRY, SAMPLE_DIFFERENT_WOMAN, SAMPLE_WIKIDATA_ENTRY]
+            with tempfile.TemporaryDirectory() as tmp:
+                first = os.path.join(tmp, 'a.json')
+                second = os.path.join(tmp, 'b.json')
+                write_canonical_json(records, first, pretty=True)
+                write_canonical_json(reversed(records), second)
+                
+                with open(first, 'rb') as f:
+                    payload = f.read()
+                with open(second, 'rb') as f:
+                    self.assert_equal(f.read(), payload, "Same data gives identical bytes in any order")
+                self.assert_true(b'\n' not in payload and b'": ' not in payload, "Output is minified")
+                with open(first + '.gz', 'rb') as f:
+                    gz = f.read()
+                self.assert_equal(gzip.decompress(gz), payload, ".gz holds the same bytes")
+                with open(second + '.gz', 'rb') as f:
+                    self.assert_equal(f.read(), gz, ".gz is reproducible")
+                with open(os.path.join(tmp, 'a.pretty.json'), encoding='utf-8') as f:
+                    self.assert_equal(json.load(f), json.loads(payload), "Readable copy matches")
+            
+        except Exception as e:
+            self.test_failed("Canonical Output", str(e))
+    
+    def test_image_pipeline(self):
+        """Test image URL resolution, width normalisation and liveness checks."""
+        print("\n=== Testing Image Pipeline ===")
+        
+        try:
+            from fetch_engine import FetchEngine
+            from image_pipeline import process_images, wikimedia_file_name
+            
+            self.assert_equal(
+                wikimedia_file_name('https://commons.wikimedia.org/w/index.php?title=Special:FilePath/Ada_Lovelace.jpg&width=400'),
+                'Ada Lovelace.jpg', "Special:FilePath link resolved to file name")
+            self.assert_equal(
+                wikimedia_file_name('https://upload.wikimedia.org/wikipedia/commons/thumb/a/ab/Grace_Hopper.jpg/300px-Grace_Hopper.jpg'),
+                'Grace Hopper.jpg', "Thumbnail URL resolved to file name")
+            self.assert_equal(wikimedia_file_name('https://example.org/x.jpg'), None, "Other hosts left alone")
+            
+            thumb = 'https://upload.wikimedia.org/wikipedia/commons/thumb/a/ab/Ada_Lovelace.jpg/500px-Ada_Lovelace.jpg'
+            dead = 'https://upload.wikimedia.org/wikipedia/commons/thumb/c/cd/Marie.jpg/500px-Marie.jpg'
+            flaky = 'https://example.org/flaky.jpg'
+            busy = 'https://example.org/busy.jpg'
+            def route(url, params):
+                if url.endswith('api.php'):
+                    self.assert_equal(params['iiurlwidth'], 500, "One thumbnail width requested")
+                    # Shapes en.wikipedia.org returns: Commons files are "missing"
+                    # locally but "known" with a shared repository and imageinfo
+                    return FakeResponse({'query': {'pages': {
+                        '-1': {'ns': 6, 'title': 'File:Ada Lovelace.jpg', 'missing': '', 'known': '',
+                               'imagerepository': 'shared', 'imageinfo': [
+                                   {'thumburl': thumb, 'thumbwidth': 500, 'thumbheight': 640}]},
+                        '-2': {'ns': 6, 'title': 'File:Marie.jpg', 'missing': '', 'known': '',
+                               'imagerepository': 'shared', 'imageinfo': [{'thumburl': dead}]},
+                        '-3': {'ns': 6, 'title': 'File:Grace Hopper.jpg', 'missing': '',
+                               'imagerepository': ''},
+                    }}})
+                if url == flaky:
+                    raise ConnectionError("connection reset")
+                return FakeResponse({}, status_code={dead: 404, busy: 500}.get(url, 200))
+            
+            entries = [
+                {'name': 'Ada', 'image': 'https://commons.wikimedia.org/wiki/Special:FilePath/Ada_Lovelace.jpg',
+                 'image_credit': 'Wikimedia Commons'},
+                {'name': 'Grace', 'image': 'https://upload.wikimedia.org/wikipedia/commons/thumb/a/ab/Grace_Hopper.jpg/300px-Grace_Hopper.jpg',
+                 'image_credit': 'Wikimedia Commons'},
+                {'name': 'Marie', 'image': 'https://upload.wikimedia.org/wikipedia/commons/c/cd/Marie.jpg'},
+                {'name': 'Other', 'image': 'https://example.org/x.jpg'},
+                {'name': 'None', 'image': None},
+                {'name': 'Flaky', 'image': flaky},
+                {'name': 'Busy', 'image': busy},
+            ]
+            session = FakeSession(route)
+            stats = process_images(entries, FetchEngine(session))
+            
+            self.assert_equal((entries[0]['image'], entries[0]['image_width'], entries[0]['image_height']),
+                              (thumb, 500, 640), "FilePath redirect replaced by sized upload URL")
+            self.assert_equal((entries[1]['image'], entries[1]['image_credit']), (None, ''),
+                              "Missing file cleared for backfill")
+            self.assert_equal(entries[2]['image'], None, "Image failing HEAD check cleared")
+            self.assert_equal(entries[3]['image'], 'https://example.org/x.jpg', "Live external image kept")
+            self.assert_equal((entries[5]['image'], entries[6]['image']), (flaky, busy),
+                              "Images kept when the HEAD check errors or gets a 5xx")
+            self.assert_equal(stats, {'checked': 6, 'normalized': 2, 'broken': 2, 'unverified': 2},
+                              "Pipeline counters")
+            
+            # A failed imageinfo lookup keeps every image it could not resolve
+            def failing(url, params):
+                if url.endswith('api.php'):
+                    return FakeResponse({}, status_code=500)
+                return FakeResponse({})
+            entries = [{'name': 'Ada', 'image': 'https://commons.wikimedia.org/wiki/Special:FilePath/Ada_Lovelace.jpg'}]
+            stats = process_images(entries, FetchEngine(FakeSession(failing)))
+            self.assert_equal((entries[0]['image'], stats['broken']),
+                              ('https://commons.wikimedia.org/wiki/Special:FilePath/Ada_Lovelace.jpg', 0),
+                              "Image kept when the imageinfo lookup fails")
+            
+        except Exception as e:
+            self.test_failed("Image Pipeline", str(e))
+    
+    def test_enrich_revisions(self):
+        """Test that enrichment skips entries whose article has not changed."""
+        print("\n=== Testing Revision-Based Enrichment ===")
+        
+        try:
+            from datetime import datetime
+            import enrich_bios
+            
+            def route(url, params):
+                titles = params['titles'].split('|')
+                fetched.extend(titles if 'extracts' in params['prop'] else [])
+                return FakeResponse({'query': {'pages': {
+                    str(i): {'pageid': i, 'title': t, 'lastrevid': 10, 'extract': f'{t} ' + 'x' * 400}
+                    for i, t in enumerate(titles, 1)}}})
+            
+            today = datetime.now().strftime('%Y-%m-%d')
+            state = {
+                # The article offered nothing longer than what the entry holds
+                'ada': {'title': 'Ada Lovelace', 'lastrevid': 10, 'extract_length': 5, 'image': None,
+                        'checked': '2026-01-01'},
+                'grace': {'title': 'Grace Hopper', 'lastrevid': 9, 'checked': '2026-01-01'},
+                'nobody': {'title': None, 'checked': today},
+            }
+            data = [
+                {'id': 'ada', 'name': 'Ada Lovelace', 'biography': 'short', 'image': 'a.jpg'},
+                {'id': 'grace', 'name': 'Grace Hopper', 'biography': 'short', 'image': 'g.jpg'},
+                {'id': 'nobody', 'name': 'Nobody Atall', 'biography': 'short', 'image': 'n.jpg'},
+            ]
+            fetched = []
+            sessions = enrich_bios.engine.session, enrich_bios.live_wiki.engine.session
+            enrich_bios.engine.session = enrich_bios.live_wiki.engine.session = FakeSession(route)
+            try:
+                bios, _ = enrich_bios.enrich(data, state=state)
+            finally:
+                enrich_bios.engine.session, enrich_bios.live_wiki.engine.session = sessions
+            
+            self.assert_equal(fetched, ['Grace Hopper'], "Only the changed article is fetched")
+            self.assert_equal((bios, data[0]['biography']), (1, 'short'), "Unchanged entry left alone")
+            self.assert_equal(state['grace']['lastrevid'], 10, "New revision recorded")
+            self.assert_equal(state['nobody'], {'title': None, 'checked': today}, "Recent not-found kept")
+            
+            def broken(url, params):
+                raise ConnectionError("connection reset")
+            
+            # A rebuilt dataset lost the enriched bio: the unchanged article is
+            # fetched again, live (the cached client is never asked)
+            state = {'ada': {'title': 'Ada Lovelace', 'lastrevid': 10, 'extract_length': 413, 'image': None,
+                             'checked': '2026-01-01'}}
+            data = [{'id': 'ada', 'name': 'Ada Lovelace', 'biography': 'English mathematician', 'image': 'a.jpg'}]
+            fetched = []
+            enrich_bios.engine.session = FakeSession(broken)
+            enrich_bios.live_wiki.engine.session = FakeSession(route)
+            try:
+                enrich_bios.enrich(data, state=state)
+            finally:
+                enrich_bios.engine.session, enrich_bios.live_wiki.engine.session = sessions
+            self.assert_equal((fetched, len(data[0]['biography'])), (['Ada Lovelace'], 413),
+                              "Rebuilt entry enriched again from the live article")
+            self.assert_equal(state['ada']['extract_length'], 413, "Applied extract recorded")
+            
+            # Network errors are not answers: nothing is recorded, so the next run retries
+            state = {}
+            data = [
+                {'id': 'ada', 'name': 'Ada Lovelace', 'biography': 'short', 'image': 'a.jpg'},
+                {'id': 'grace', 'name': 'Grace Hopper', 'biography': 'short', 'image': 'g.jpg',
+                 'sources': [{'url': 'https://en.wikipedia.org/wiki/Grace_Hopper'}]},
+            ]
+            enrich_bios.engine.session = enrich_bios.live_wiki.engine.session = FakeSession(broken)
+            try:
+                enrich_bios.enrich(data, state=state)
+                todo = enrich_bios.skip_unchanged(data, state)
+            finally:
+                enrich_bios.engine.session, enrich_bios.live_wiki.engine.session = sessions
+            self.assert_equal(state, {}, "Failed search and fetch leave no state")
+            self.assert_equal(len(todo), 2, "Entries retried after a network error")
+            
+        except Exception as e:
+            self.test_failed("Revision-Based Enrichment", str(e))
+    
+    def test_record_store(self):
+        """Test the SQLite record store: batched commits, compression and expiry."""
+        print("\n=== Testing Record Store ===")
+        
+        try:
+            import json
+            import os
+            import tempfile
+            import time
+            from record_store import RecordStore
+            
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'store.sqlite')
+                store = RecordStore(path, batch_size=2)
+                store.put('https://a', SAMPLE_WIKIPEDIA_ENTRY, html='<h1>Ada</h1>')
+                self.assert_equal(len(RecordStore(path)), 0, "Open batch not visible to other readers")
+                store.put('https://b', SAMPLE_DIFFERENT_WOMAN)
+                self.assert_equal(len(RecordStore(path)), 2, "Batch committed atomically")
+                
+                self.assert_equal(store.get('https://a'), SAMPLE_WIKIPEDIA_ENTRY, "Record round-trip")
+                self.assert_equal(store.get_html('https://a'), b'<h1>Ada</h1>', "Compressed page round-trip")
+                
+                store.put('https://old', {'name': 'Old'}, fetched_at=time.time() - 10 * 86400)
+                store.commit()
+                self.assert_equal(RecordStore(path, max_age=86400).get('https://old'), None,
+                                  "Expired entry hidden")
+                self.assert_equal((store.expire(86400), len(store)), (1, 2), "Expired entry deleted")
+                store.close()
+                
+                legacy = os.path.join(tmp, 'legacy.json')
+                with open(legacy, 'w', encoding='utf-8') as f:
+                    json.dump({'https://c': {'name': 'C'}}, f)
+                store = RecordStore(path, compress=False)
+                self.assert_equal(store.import_json(legacy), 1, "Legacy JSON cache imported")
+                self.assert_equal(store.get('https://c'), {'name': 'C'}, "Uncompressed record round-trip")
+                store.close()
+            
+        except Exception as e:
+            self.test_failed("Record Store", str(e))
+    
+    def test_nwhm_sitemap(self):
+        """Test NWHM discovery from sitemaps, robots.txt rules and lastmod skipping."""
+        print("\n=== Testing NWHM Sitemap Discovery ===")
+        
+        try:
+            import gzip
+            import os
+            import tempfile
+            import time
+            import fetch_engine
+            from nwhm_scraper import NWHMScraper
+            from record_store import RecordStore
+            
+            base = 'https://nwhm.test'
+            bios = f'{base}/education-resources/biographies'
+            robots = [f'User-agent: *\nDisallow: /education-resources/biographies/private\n'
+                      f'Crawl-delay: 2\nSitemap: {base}/sitemap_index.xml\n']
+            index = ('<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                     f'<sitemap><loc>{base}/pages.xml.gz</loc></sitemap></sitemapindex>')
+            
+            def urlset(lastmod):
+                urls = [(f'{bios}/ada-lovelace', lastmod), (f'{bios}/grace-hopper', '2024-01-01'),
+                        (f'{bios}/private', '2024-01-01'), (f'{bios}', '2024-01-01'),
+                        (f'{base}/about', '2024-01-01')]
+                return ('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        + ''.join(f'<url><loc>{u}</loc><lastmod>{m}</lastmod></url>' for u, m in urls)
+                        + '</urlset>').encode()
+            
+            fetched = []
+            def route(lastmod):
+                def respond(url, params):
+                    if url.endswith('/robots.txt'):
+                        return FakeResponse(robots[0])
+                    if url.endswith('sitemap_index.xml'):
+                        return FakeResponse(index)
+                    if url.endswith('pages.xml.gz'):
+                        return FakeResponse(gzip.compress(urlset(lastmod)))
+                    fetched.append(url)
+                    name = url.rsplit('/', 1)[-1].replace('-', ' ').title()
+                    return FakeResponse(f'<h1>{name}</h1><article>Biography of {name}.</article>')
+                return respond
+            
+            # A fast bucket for the fake host; robots.txt then caps it
+            fetch_engine._BUCKETS['nwhm.test'] = fetch_engine.TokenBucket(100.0, 10, 100.0)
+            
+            with tempfile.TemporaryDirectory() as tmp:
+                class TestScraper(NWHMScraper):
+                    BASE_URL = base
+                    CACHE_FILE = os.path.join(tmp, 'nwhm.sqlite')
+                    LEGACY_CACHE_FILE = os.path.join(tmp, 'nwhm.json')
+                
+                scraper = TestScraper()
+                scraper.engine.session = FakeSession(route('2024-01-01'))
+                found = scraper.discover()
+                self.assert_equal(sorted(found), [f'{bios}/ada-lovelace', f'{bios}/grace-hopper'],
+                                  "Biography pages allowed by robots.txt discovered")
+                self.assert_equal(fetch_engine._BUCKETS['nwhm.test'].max_rate, 0.5,
+                                  "Crawl-delay caps the host rate")
+                
+                # Keep the rest of the test fast
+                robots[0] = robots[0].replace('Crawl-delay: 2\n', '')
+                fetch_engine._BUCKETS['nwhm.test'] = fetch_engine.TokenBucket(100.0, 10, 100.0)
+                
+                records = scraper.scrape(found)
+                self.assert_equal(sorted(r['name'] for r in records), ['Ada Lovelace', 'Grace Hopper'],
+                                  "Biographies parsed")
+                scraper.cache.close()
+                
+                # Rows past max_age are deleted when the store is opened
+                old = RecordStore(TestScraper.CACHE_FILE)
+                old.put(f'{bios}/gone', {'name': 'Gone'}, fetched_at=time.time() - 200 * 86400)
+                old.close()
+                
+                # Next run: only the page whose lastmod moved is fetched again
+                fetched.clear()
+                scraper = TestScraper()
+                self.assert_equal(len(scraper.cache), 2, "Expired entry removed on load")
+                scraper.engine.session = FakeSession(route('2024-06-01'))
+                records = list(scraper.iter_records())
+                self.assert_equal(fetched, [f'{bios}/ada-lovelace'], "Only changed page refetched")
+                self.assert_equal(len(records), 2, "Unchanged page served from the record store")
+                scraper.cache.close()
+            
+            fetch_engine._BUCKETS.pop('nwhm.test', None)
+            
+        except Exception as e:
+            self.test_failed("NWHM Sitemap Discovery", str(e))
+    
+    def test_nwhm_parsing(self):
+        """Test NWHM date parsing and that the streaming parser matches the soup one."""
+        print("\n=== Testing NWHM Page Parsing ===")
+        
+        try:
+            import glob
+            from nwhm_scraper import NWHMScraper, parse_biography_fast, parse_biography_soup, parse_dates
+            
+            cases = {
+                'December 10, 1815 \u2013 November 27, 1852': ('1815-12-10', '1852-11-27'),
+                '(1906-1992)': ('1906-01-01', '1992-01-01'),
+                'c. 1797 - Nov. 26, 1883': ('1797-01-01', '1883-11-26'),
+                'Born 3 March 1931': ('1931-03-03', ''),
+                '1920 to present': ('1920-01-01', ''),
+                '1815-12-10': ('1815-12-10', ''),
+            }
+            for text, expected in cases.items():
+                self.assert_equal(parse_dates(text), expected, f"Dates parsed from '{text}'")
+            
+            pages = sorted(glob.glob('fixtures/nwhm/*.html'))
+            self.assert_true(len(pages) >= 3, "HTML fixtures present")
+            for path in pages:
+                with open(path, 'rb') as f:
+                    html = f.read()
+                fast = parse_biography_fast(html, path)
+                self.assert_equal(fast, parse_biography_soup(html, path), f"Same record from {path}")
+            self.assert_equal((fast['name'], fast['birth_date']), ('Sojourner Truth', '1797-01-01'),
+                              "Fields extracted")
+            self.assert_true('<' not in fast['biography'] and 'bioLoaded' not in fast['biography'],
+                             "Markup and scripts left out of biography")
+            self.assert_equal(parse_biography_fast(b'', 'u')['name'], 'Unknown', "Empty page handled")
+            
+            scraper = NWHMScraper(use_cache=False, parse_workers=2)
+            try:
+                pooled = scraper.engine.run(scraper._parse_async(html, path))
+            finally:
+                scraper.close()
+            self.assert_equal(pooled['biography'], fast['biography'], "Page parsed in the process pool")
+            
+        except Exception as e:
+            self.test_failed("NWHM Page Parsing", str(e))
+    
+    def test_replay_harness(self):
+        """Test recording through the harness and replaying via the stub server."""
+        print("\n=== Testing Record/Replay Harness ===")
+        
+        try:
+            import os
+            import tempfile
+            from urllib.parse import parse_qsl, urlsplit
+            import requests
+            import fetch_engine
+            from fetch_engine import FetchEngine
+            from http_cache import CachingAdapter, install_cache
+            from replay import STUB_ENV, Cassette, HarnessAdapter, StubServer
+            from wikipedia_client import CategoryCrawler, WikipediaClient
+            
+            titles = ['Ada Lovelace', 'Grace Hopper', 'Marie Curie', 'Emmy Noether', 'Lise Meitner']
+            
+            class LiveWiki(StubServer):
+                """Stands in for en.wikipedia.org: 3 members per page."""
+                def respond(self, method, path, body=None):
+                    params = dict(parse_qsl(urlsplit(path).query))
+                    start = int(params.get('cmcontinue', 0))
+                    data = {'query': {'categorymembers': [{'ns': 0, 'title': t} for t in titles[start:start + 3]]}}
+                    if start + 3 < len(titles):
+                        data['continue'] = {'cmcontinue': str(start + 3), 'continue': '-||'}
+                    return 200, {'Content-Type': 'application/json'}, json.dumps(data).encode()
+            
+            def crawl(adapter):
+                session = requests.Session()
+                session.mount('https://', adapter)
+                return list(CategoryCrawler(WikipediaClient(engine=FetchEngine(session)), 'Test women'))
+            
+            saved = fetch_engine._BUCKETS.get('en.wikipedia.org')
+            fetch_engine._BUCKETS['en.wikipedia.org'] = fetch_engine.TokenBucket(100.0, 10, 100.0)
+            try:
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, 'cassette.jsonl.gz')
+                    with LiveWiki(None) as live:
+                        recorded = crawl(HarnessAdapter(live.url, Cassette(path)))
+                    self.assert_equal(recorded, titles, "Crawl recorded through the harness")
+                    self.assert_equal(len(Cassette(path)), 2, "Both listing pages in the cassette")
+                    
+                    with StubServer(path, page_size=2, throttle_every=2, retry_after=0) as stub:
+                        replayed = crawl(HarnessAdapter(stub.url))
+                        self.assert_equal(replayed, titles, "Replay re-paginated and retried after 429s")
+                        self.assert_equal((stub.stats['requests'], stub.stats['throttled']), (5, 2),
+                                          "3 pages of 2 plus 2 injected 429s served")
+                        self.assert_equal(fetch_engine._BUCKETS['en.wikipedia.org'].throttled, 2,
+                                          "Injected 429s reach the rate limiter")
+                    self.assert_equal(StubServer(path).respond('GET', '/https/example.org/missing')[0], 404,
+                                      "Unrecorded request answered with 404")
+            finally:
+                if saved is None:
+                    fetch_engine._BUCKETS.pop('en.wikipedia.org', None)
+                else:
+                    fetch_engine._BUCKETS['en.wikipedia.org'] = saved
+            
+            # HEROINES_STUB mounts the harness under the HTTP cache
+            os.environ[STUB_ENV] = 'http://127.0.0.1:9'
+            try:
+                session = install_cache(requests.Session(), cache=object())
+                adapter = FetchEngine(session).session.get_adapter('https://en.wikipedia.org')
+            finally:
+                del os.environ[STUB_ENV]
+            self.assert_true(isinstance(adapter, CachingAdapter) and isinstance(adapter.transport, HarnessAdapter),
+                             "Harness installed below the cache")
+
+            # The synthetic cassette the Offline Pipeline workflow replays
+            cassette = Cassette('fixtures/cassettes/pipeline.jsonl.gz')
+            hosts = {urlsplit(key.split(' ')[1]).hostname for key in cassette.responses}
+            self.assert_equal(hosts, {'api.nobelprize.org', 'query.wikidata.org', 'www.wikidata.org',
+                                      'en.wikipedia.org', 'www.womenshistory.org'},
+                              "Pipeline cassette covers every source")
+
+        except Exception as e:
+            self.test_failed("Record/Replay Harness", str(e))
+    
+    def test_benchmark_suite(self):
+        """Test the synthetic heroine generator and the benchmark regression budget."""
+        print("\n=== Testing Benchmark Suite ===")
+        
+        try:
+            import contextlib
+            import copy
+            import io
+            from benchmark import bench_suite, check_budget, synthetic_sources
+            
+            sources = synthetic_sources(200)
+            self.assert_equal(sources, synthetic_sources(200), "Generator is deterministic")
+            qids = [b['person']['value'] for b in sources['sparql']['results']['bindings']]
+            self.assert_true(len(qids) > len(set(qids)), "SPARQL rows repeat QIDs per occupation")
+            shared = {w['wikidata_id'] for w in sources['wikipedia']} & {q.rsplit('/', 1)[-1] for q in qids}
+            self.assert_true(len(shared) > 50, "Wikipedia records share QIDs with Wikidata")
+            self.assert_true(any(w['wikidata_id'] is None for w in sources['wikipedia']),
+                             "Name variants without QIDs generated")
+            self.assert_true(min(len(w['biography'].split()) for w in sources['wikipedia']) >= 150,
+                             "Long biographies generated")
+            
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = bench_suite([200])
+            rows = results['sizes']['200']
+            self.assert_equal(list(rows), ['parse_results', 'parse_laureate', 'merge_datasets', 'save_json', 'load_json'],
+                              "Every hot path timed")
+            self.assert_equal(rows['load_json']['items'], rows['merge_datasets']['items'], "Saved data loads back")
+            self.assert_true(all(row['peak_mb'] > 0 for row in rows.values()), "Peak memory recorded")
+            
+            import benchmark
+            limit, benchmark.MEMORY_MAX_SIZE = benchmark.MEMORY_MAX_SIZE, 100
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    untraced = bench_suite([200])
+            finally:
+                benchmark.MEMORY_MAX_SIZE = limit
+            self.assert_true(all(row['peak_mb'] is None for row in untraced['sizes']['200'].values()),
+                             "Sizes above MEMORY_MAX_SIZE are timed only")
+            
+            self.assert_equal(check_budget(results, results), [], "No regression against itself")
+            slower = copy.deepcopy(results)
+            slower['sizes']['200']['merge_datasets']['secs'] += 10
+            slower['sizes']['200']['parse_results']['secs'] *= 1.5   # under the noise floor
+            failures = check_budget(slower, results)
+            self.assert_equal(len(failures), 1, "Slowdown past the budget reported")
+            self.assert_in('merge_datasets', failures[0], "Regression names the hot path")
+            
+        except Exception as e:
+            self.test_failed("Benchmark Suite", str(e))
+    
     def test_data_structure(self):
         """Test that data structure is valid."""
         print("\n=== Testing Data Structure ===")
@@ -232,6 +1406,30 @@ class TestSuite:
         self.test_json_validity()
         self.test_date_format()
         self.test_data_merger()
+        self.test_merger_index()
+        self.test_incremental_merge()
+        self.test_wikipedia_client()
+        self.test_category_crawler()
+        self.test_category_generator()
+        self.test_nobel_pipeline()
+        self.test_fetch_engine()
+        self.test_http_cache()
+        self.test_wikidata_keyset()
+        self.test_wikidata_entities()
+        self.test_jsonl_stream()
+        self.test_checkpoints()
+        self.test_parallel_merge()
+        self.test_similarity_backends()
+        self.test_merge_lists()
+        self.test_site_bundle()
+        self.test_canonical_output()
+        self.test_image_pipeline()
+        self.test_enrich_revisions()
+        self.test_record_store()
+        self.test_nwhm_sitemap()
+        self.test_nwhm_parsing()
+        self.test_replay_harness()
+        self.test_benchmark_suite()
         self.test_existing_data_file()
         
         # Print summary
@@ -3,10 +3,14 @@ Wikidata SPARQL Scraper for The Unsung Heroines
 Queries Wikidata for women in various fields with verifiable sources.
 """
 
+import asyncio
 import requests
-import json
 from datetime import datetime
-import time
+from urllib.parse import quote
+
+from fetch_engine import FetchEngine
+from http_cache import install_cache
+from jsonl_io import write_jsonl
 
 class WikidataScraper:
     """Scraper for Wikidata using SPARQL queries."""
@@ -14,6 +18,15 @@ class WikidataScraper:
     ENDPOINT = "https://query.wikidata.org/sparql"
     USER_AGENT = "TheUnsungHeroines/2.0 (Educational Project; https://github.com/yourusername/theunsungheroines)"
     
+    # Occupations: science, medicine, arts, activism, politics, literature, music
+    OCCUPATIONS = """
+        wd:Q901    wd:Q11063  wd:Q593644  wd:Q169470  wd:Q82955
+        wd:Q1650915 wd:Q864503 wd:Q1622272 wd:Q205375
+        wd:Q36180  wd:Q482980 wd:Q33999   wd:Q483501  wd:Q36834
+        wd:Q177220 wd:Q170790 wd:Q1234099 wd:Q15627169
+        wd:Q4220920 wd:Q1281618 wd:Q11569986 wd:Q18939491
+    """
+    
     # Broader SPARQL query: science, arts, activism, politics, literature, music.
     # Only returns entries that have a portrait image (wdt:P18) and an English
     # Wikipedia article, which dramatically improves data quality.
@@ -33,13 +46,7 @@ class WikidataScraper:
       BIND(STR(?article) AS ?wikipediaUrl)
 
       # Occupations: science, medicine, arts, activism, politics, literature, music
-      VALUES ?occupation {{
-        wd:Q901    wd:Q11063  wd:Q593644  wd:Q169470  wd:Q82955
-        wd:Q1650915 wd:Q864503 wd:Q1622272 wd:Q205375
-        wd:Q36180  wd:Q482980 wd:Q33999   wd:Q483501  wd:Q36834
-        wd:Q177220 wd:Q170790 wd:Q1234099 wd:Q15627169
-        wd:Q4220920 wd:Q1281618 wd:Q11569986 wd:Q18939491
-      }}
+      VALUES ?occupation {{ {occupations} }}
 
       OPTIONAL {{ ?person wdt:P569 ?birthDate . }}
       OPTIONAL {{ ?person wdt:P570 ?deathDate . }}
@@ -55,26 +62,110 @@ class WikidataScraper:
     OFFSET {offset}
     """
     
+    # Keyset-paginated variant: one row per person (occupations aggregated
+    # with GROUP_CONCAT), ordered by entity IRI and resumed after the last
+    # IRI seen. WDQS still evaluates and sorts the whole join for every
+    # page; what this removes is skipping OFFSET rows, and pages shifting
+    # when results change between requests.
+    KEYSET_QUERY_TEMPLATE = """
+    SELECT ?person
+           (SAMPLE(?label) AS ?personLabel)
+           (SAMPLE(?birth) AS ?birthDate)
+           (SAMPLE(?death) AS ?deathDate)
+           (GROUP_CONCAT(DISTINCT ?occupationName; separator="|") AS ?occupations)
+           (SAMPLE(?desc) AS ?description)
+           (SAMPLE(?img) AS ?image)
+           (SAMPLE(?articleUrl) AS ?wikipediaUrl)
+    WHERE {{
+      ?person wdt:P31 wd:Q5 .              # instance of human
+      ?person wdt:P21 wd:Q6581072 .        # gender: female
+      ?person wdt:P106 ?occupation .       # has occupation
+      ?person wdt:P18 ?img .               # must have a portrait image
+      {after_filter}
+
+      ?article schema:about ?person ;
+               schema:inLanguage "en" ;
+               schema:isPartOf <https://en.wikipedia.org/> .
+      BIND(STR(?article) AS ?articleUrl)
+
+      VALUES ?occupation {{ {occupations} }}
+
+      OPTIONAL {{ ?person wdt:P569 ?birth . }}
+      OPTIONAL {{ ?person wdt:P570 ?death . }}
+      OPTIONAL {{ ?person schema:description ?desc .
+                  FILTER(LANG(?desc) = "en") }}
+
+      SERVICE wikibase:label {{
+        bd:serviceParam wikibase:language "en" .
+        ?person rdfs:label ?label .
+        ?occupation rdfs:label ?occupationName .
+      }}
+    }}
+    GROUP BY ?person
+    ORDER BY STR(?person)
+    LIMIT {limit}
+    """
+    ENTITY_PREFIX = "http://www.wikidata.org/entity/"
+    
+    KEYSET_BATCH_SIZE = 1000
+    
+    # wbgetentities: structured data for QIDs we already know, 50 per call
+    ENTITY_API = "https://www.wikidata.org/w/api.php"
+    ENTITY_BATCH_SIZE = 50
+    ENTITY_PROPS = 'labels|descriptions|claims|sitelinks/urls'
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': self.USER_AGENT})
+        install_cache(self.session)
+        self.engine = FetchEngine(self.session)
     
-    def query_wikidata(self, limit=100, offset=0):
-        """Execute SPARQL query against Wikidata endpoint."""
-        query = self.QUERY_TEMPLATE.format(limit=limit, offset=offset)
+    async def query_wikidata_async(self, limit=100, offset=0):
+        """Coroutine version of query_wikidata."""
+        query = self.QUERY_TEMPLATE.format(limit=limit, offset=offset, occupations=self.OCCUPATIONS)
         
         try:
-            response = self.session.get(
+            response = await self.engine.get(
                 self.ENDPOINT,
                 params={'query': query, 'format': 'json'},
                 timeout=30
             )
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Error querying Wikidata: {e}")
             return None
     
+    def query_wikidata(self, limit=100, offset=0):
+        """Execute SPARQL query against Wikidata endpoint."""
+        return self.engine.run(self.query_wikidata_async(limit=limit, offset=offset))
+    
+    def query_wikidata_keyset(self, limit=1000, after_qid=None):
+        """Fetch the next ``limit`` people whose entity IRI sorts after ``after_qid``."""
+        after_filter = ''
+        if after_qid:
+            after_filter = f'FILTER(STR(?person) > "{self.ENTITY_PREFIX}{after_qid}")'
+        query = self.KEYSET_QUERY_TEMPLATE.format(
+            limit=limit,
+            after_filter=after_filter,
+            occupations=self.OCCUPATIONS,
+        )
+        
+        async def run():
+            try:
+                response = await self.engine.get(
+                    self.ENDPOINT,
+                    params={'query': query, 'format': 'json'},
+                    timeout=60
+                )
+                response.raise_for_status()
+                return response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Error querying Wikidata: {e}")
+                return None
+        
+        return self.engine.run(run())
+    
     @staticmethod
     def _thumbnail_url(commons_url, width=400):
         """Convert a Wikimedia Commons FilePath URL to a sized thumbnail URL."""
@@ -106,6 +197,8 @@ class WikidataScraper:
                 image_url = self._thumbnail_url(raw_image)
 
                 wikidata_url = binding.get('wikidataUrl', {}).get('value', '')
+                if not wikidata_url and wikidata_id:
+                    wikidata_url = f"https://www.wikidata.org/wiki/{wikidata_id}"
                 wikipedia_url = binding.get('wikipediaUrl', {}).get('value', '')
 
                 sources = [{'name': 'Wikidata', 'url': wikidata_url,
@@ -127,6 +220,11 @@ class WikidataScraper:
                     'wikidata_id': wikidata_id,
                     'last_updated': datetime.now().strftime('%Y-%m-%d'),
                 }
+                # Keyset queries aggregate every occupation into one row
+                if 'occupations' in binding:
+                    occupations = [o for o in binding['occupations']['value'].split('|') if o]
+                    woman_data['occupation'] = occupations[0] if occupations else ''
+                    woman_data['fields'] = occupations
 
                 women_data.append(woman_data)
             except Exception as e:
@@ -135,17 +233,18 @@ class WikidataScraper:
 
         return women_data
     
-    def scrape(self, total_limit=500):
-        """Scrape women data from Wikidata."""
-        all_women = []
-        batch_size = 100
-        offset = 0
+    def iter_keyset_pages(self, total_limit=500, after_qid=None, batch_size=None):
+        """Yield (last_qid, women_batch) pages in QID order using keyset pagination.
         
-        print(f"Starting Wikidata scrape (target: {total_limit} entries)...")
+        ``last_qid`` is the cursor to pass as ``after_qid`` to continue later.
+        """
+        batch_size = batch_size or self.KEYSET_BATCH_SIZE
+        fetched = 0
         
-        while offset < total_limit:
-            print(f"Fetching batch at offset {offset}...")
-            results = self.query_wikidata(limit=batch_size, offset=offset)
+        while fetched < total_limit:
+            limit = min(batch_size, total_limit - fetched)
+            print(f"Fetching {limit} entries after {after_qid or 'the start'}...")
+            results = self.query_wikidata_keyset(limit=limit, after_qid=after_qid)
             
             if not results:
                 print("No more results or error occurred.")
@@ -156,27 +255,217 @@ class WikidataScraper:
                 print("No women found in this batch.")
                 break
             
-            all_women.extend(women_batch)
-            print(f"Retrieved {len(women_batch)} entries. Total: {len(all_women)}")
+            fetched += len(women_batch)
+            after_qid = women_batch[-1]['wikidata_id']
+            yield after_qid, women_batch
             
-            offset += batch_size
-            time.sleep(2)  # Respectful delay
+            if len(women_batch) < limit:
+                break
+    
+    def iter_records(self, total_limit=500, after_qid=None, checkpoint=None):
+        """Yield parsed records page by page using keyset pagination.
+        
+        With a CheckpointStore the QID cursor is saved after each page has
+        been consumed, and a rerun continues after the last saved page.
+        """
+        total = 0
+        if checkpoint:
+            state = checkpoint.get('wikidata', {})
+            after_qid = state.get('after_qid', after_qid)
+            total = state.get('fetched', 0)
+            if total:
+                print(f"Resuming Wikidata scrape after {after_qid} ({total} entries already saved)")
+        
+        for last_qid, women_batch in self.iter_keyset_pages(total_limit - total, after_qid=after_qid):
+            total += len(women_batch)
+            print(f"Retrieved {len(women_batch)} entries. Total: {total}")
+            yield from women_batch
+            # Reached only once the consumer has taken the whole page
+            if checkpoint:
+                checkpoint.set('wikidata', {'after_qid': last_qid, 'fetched': total})
+    
+    def scrape(self, total_limit=500, pagination='keyset'):
+        """Scrape women data from Wikidata.
+        
+        ``pagination='keyset'`` (default) walks people in QID order, one row
+        per person. ``pagination='offset'`` runs the original LIMIT/OFFSET
+        query with all pages requested concurrently; it returns one row per
+        occupation and gets slow at high offsets.
+        """
+        if pagination == 'offset':
+            return self._scrape_offset(total_limit)
         
+        print(f"Starting Wikidata scrape (target: {total_limit} entries, keyset pagination)...")
+        all_women = list(self.iter_records(total_limit))
         print(f"Wikidata scrape complete. Total entries: {len(all_women)}")
         return all_women
+    
+    def _scrape_offset(self, total_limit):
+        """Scrape with LIMIT/OFFSET pages fetched concurrently."""
+        all_women = []
+        batch_size = 100
+        offsets = list(range(0, total_limit, batch_size))
+        
+        print(f"Starting Wikidata scrape (target: {total_limit} entries, offset pagination)...")
+        print(f"Fetching {len(offsets)} batches of {batch_size}...")
+        pages = self.engine.map(
+            lambda offset: self.query_wikidata_async(limit=batch_size, offset=offset),
+            offsets
+        )
+        
+        for offset, results in zip(offsets, pages):
+            if not results or isinstance(results, Exception):
+                print(f"No more results or error occurred at offset {offset}.")
+                break
+            
+            women_batch = self.parse_results(results)
+            if not women_batch:
+                print("No women found in this batch.")
+                break
+            
+            all_women.extend(women_batch)
+            print(f"Retrieved {len(women_batch)} entries at offset {offset}. Total: {len(all_women)}")
+        
+        print(f"Wikidata scrape complete. Total entries: {len(all_women)}")
+        return all_women
+
+    # ------------------------------------------------------------------
+    # Bulk entity lookup (wbgetentities)
+    # ------------------------------------------------------------------
+    
+    async def _get_entities_batch(self, qids, props):
+        """Fetch one batch of at most 50 entities; returns {qid: entity}."""
+        params = {
+            'action': 'wbgetentities',
+            'format': 'json',
+            'ids': '|'.join(qids),
+            'props': props,
+            'languages': 'en',
+            'languagefallback': 1,
+            'sitefilter': 'enwiki',
+        }
+        try:
+            response = await self.engine.get(self.ENTITY_API, params=params, timeout=30)
+            response.raise_for_status()
+            entities = response.json().get('entities', {})
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching Wikidata entities: {e}")
+            return {}
+        
+        return {qid: entity for qid, entity in entities.items() if 'missing' not in entity}
+    
+    async def fetch_entities_async(self, qids, props=None):
+        """Coroutine version of fetch_entities."""
+        unique = list(dict.fromkeys(q for q in qids if q))
+        batches = [unique[i:i + self.ENTITY_BATCH_SIZE]
+                   for i in range(0, len(unique), self.ENTITY_BATCH_SIZE)]
+        answers = await asyncio.gather(
+            *(self._get_entities_batch(batch, props or self.ENTITY_PROPS) for batch in batches))
+        
+        entities = {}
+        for answer in answers:
+            entities.update(answer)
+        return entities
+    
+    def fetch_entities(self, qids, props=None):
+        """Return {qid: entity JSON} for the given QIDs (missing ones left out)."""
+        return self.engine.run(self.fetch_entities_async(qids, props))
+    
+    @staticmethod
+    def _claim_values(entity, prop):
+        """Return the datavalues of a property, preferred-rank statements first."""
+        statements = [s for s in entity.get('claims', {}).get(prop, [])
+                      if s.get('rank') != 'deprecated'
+                      and s.get('mainsnak', {}).get('snaktype') == 'value']
+        statements.sort(key=lambda s: s.get('rank') != 'preferred')
+        return [s['mainsnak']['datavalue']['value'] for s in statements]
+    
+    @staticmethod
+    def _entity_date(value):
+        """Convert a Wikidata time value to YYYY-MM-DD ('' if coarser than a year).
+        
+        Month/day precision gaps become 01, as in SPARQL results.
+        """
+        time_str = value.get('time', '')
+        if value.get('precision', 0) < 9 or not time_str.startswith('+'):
+            return ''
+        date = time_str[1:].split('T')[0]
+        year, month, day = date.split('-')
+        return f"{year.zfill(4)}-{month.replace('00', '01')}-{day.replace('00', '01')}"
+    
+    def parse_entity(self, entity, occupation_labels=None):
+        """Convert a wbgetentities entity into a record shaped like parse_results rows."""
+        occupation_labels = occupation_labels or {}
+        # Keep the QID we asked for when the item has been merged into another
+        qid = entity.get('redirects', {}).get('from', entity['id'])
+        
+        birth = self._claim_values(entity, 'P569')
+        death = self._claim_values(entity, 'P570')
+        occupations = [occupation_labels.get(v['id'], '') for v in self._claim_values(entity, 'P106')]
+        occupations = [o for o in occupations if o]
+        images = self._claim_values(entity, 'P18')
+        image_url = None
+        if images:
+            filename = quote(images[0].replace(' ', '_'))
+            image_url = self._thumbnail_url(
+                f"http://commons.wikimedia.org/wiki/Special:FilePath/{filename}")
+        
+        sources = [{'name': 'Wikidata', 'url': f"https://www.wikidata.org/wiki/{qid}",
+                    'accessed': datetime.now().strftime('%Y-%m-%d')}]
+        wikipedia_url = entity.get('sitelinks', {}).get('enwiki', {}).get('url')
+        if wikipedia_url:
+            sources.append({'name': 'Wikipedia', 'url': wikipedia_url,
+                            'accessed': datetime.now().strftime('%Y-%m-%d')})
+        
+        return {
+            'id': qid,
+            'name': entity.get('labels', {}).get('en', {}).get('value', 'Unknown'),
+            'birth_date': self._entity_date(birth[0]) if birth else '',
+            'death_date': self._entity_date(death[0]) if death else '',
+            'description': entity.get('descriptions', {}).get('en', {}).get('value', ''),
+            'occupation': occupations[0] if occupations else '',
+            'fields': occupations,
+            'image': image_url,
+            'image_credit': 'Image: Wikimedia Commons' if image_url else '',
+            'sources': sources,
+            'wikidata_id': qid,
+            'last_updated': datetime.now().strftime('%Y-%m-%d'),
+        }
+    
+    def fetch_entity_records(self, qids):
+        """Return records with dates, occupations and image for known QIDs.
+        
+        Two passes of batched wbgetentities calls: the people, then the
+        English labels of their occupations.
+        """
+        entities = self.fetch_entities(qids)
+        occupation_ids = {v['id'] for entity in entities.values()
+                          for v in self._claim_values(entity, 'P106')}
+        labels = self.fetch_entities(sorted(occupation_ids), props='labels')
+        occupation_labels = {qid: e.get('labels', {}).get('en', {}).get('value', '')
+                             for qid, e in labels.items()}
+        
+        records = []
+        for qid in dict.fromkeys(q for q in qids if q):
+            entity = entities.get(qid)
+            if entity is None:
+                continue
+            try:
+                records.append(self.parse_entity(entity, occupation_labels))
+            except Exception as e:
+                print(f"Error parsing entity {qid}: {e}")
+        return records
 
 def main():
     """Main function to run Wikidata scraper."""
     scraper = WikidataScraper()
-    women_data = scraper.scrape(total_limit=500)
     
-    # Save to JSON
-    output_file = 'wikidata_heroines.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(women_data, f, ensure_ascii=False, indent=2)
+    # Stream to JSON Lines as pages arrive
+    output_file = 'wikidata_heroines.jsonl'
+    count = write_jsonl(scraper.iter_records(total_limit=500), output_file)
     
     print(f"Data saved to {output_file}")
-    print(f"Total women scraped: {len(women_data)}")
+    print(f"Total women scraped: {count}")
 
 if __name__ == "__main__":
     main()
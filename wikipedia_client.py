@@ -0,0 +1,316 @@
+"""
+Batched Wikipedia client for The Unsung Heroines
+Fetches many articles per MediaWiki API call (up to 50 titles each) and maps
+the returned pages back to the titles that were asked for, following
+normalisation, redirects and result continuation. Also lists category trees
+lazily (CategoryCrawler).
+"""
+
+import asyncio
+
+import requests
+
+from fetch_engine import FetchEngine
+
+WIKI_API = "https://en.wikipedia.org/w/api.php"
+
+# Page properties shared by every scraper: intro extract, lead image,
+# canonical URL and the linked Wikidata item.
+DEFAULT_PAGE_PARAMS = {
+    "prop": "extracts|pageimages|info|pageprops",
+    "exintro": True,
+    "explaintext": True,
+    "exlimit": "max",
+    "pithumbsize": 500,
+    "pilimit": "max",
+    "inprop": "url",
+    "ppprop": "wikibase_item",
+}
+
+# Intro extract and lead image only, for enriching records we already have.
+SUMMARY_PARAMS = {
+    "prop": "extracts|pageimages",
+    "exintro": True,
+    "explaintext": True,
+    "exlimit": "max",
+    "pithumbsize": 500,
+    "pilimit": "max",
+}
+
+
+# Article-namespace pages that are collections rather than biographies
+NON_PERSON_PREFIXES = ("List of", "Index of", "Timeline of", "Women in")
+
+ARTICLE_NS = 0
+CATEGORY_NS = 14
+
+
+def page_exists(page):
+    """True unless the API reported the page missing or invalid.
+
+    File pages hosted on a shared repository (Commons) come back from
+    en.wikipedia.org marked ``missing`` as well as ``known``, with their
+    ``imagerepository`` and ``imageinfo``; those exist.
+    """
+    if "invalid" in page:
+        return False
+    if "missing" not in page:
+        return True
+    return "known" in page or bool(page.get("imagerepository")) or bool(page.get("imageinfo"))
+
+
+def title_from_url(url):
+    """Return the article title for an en.wikipedia.org/wiki/... URL."""
+    raw = url.rstrip("/").split("/wiki/")[-1]
+    return requests.utils.unquote(raw).replace("_", " ")
+
+
+class WikipediaClient:
+    """Fetches Wikipedia pages in batches of up to 50 titles per request.
+
+    Batches are sent concurrently through a FetchEngine, which keeps the
+    requests within en.wikipedia.org's rate budget.
+    """
+
+    BATCH_SIZE = 50
+
+    def __init__(self, session=None, engine=None):
+        self.engine = engine or FetchEngine(session)
+        self.session = self.engine.session
+        self.requests_made = 0
+
+    # ------------------------------------------------------------------
+    # Low-level API access
+    # ------------------------------------------------------------------
+
+    async def _get(self, params):
+        """GET the API (429s are retried by the engine); returns parsed JSON."""
+        resp = await self.engine.get(WIKI_API, params=params)
+        self.requests_made += 1
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _query_batch(self, titles, params):
+        """Run one title batch to completion, following ``continue`` tokens.
+
+        Returns (pages_by_title, aliases) where aliases maps each
+        normalised/converted/redirected title to the title it points at,
+        or None if any request of the batch failed (a partial answer cannot
+        tell a missing page from one that was never returned).
+        """
+        request = {"action": "query", "format": "json", "redirects": 1,
+                   "titles": "|".join(titles), **params}
+        pages = {}
+        aliases = {}
+        cont = {}
+
+        try:
+            while True:
+                data = await self._get({**request, **cont})
+                query = data.get("query", {})
+                for key in ("normalized", "converted", "redirects"):
+                    for mapping in query.get(key, []):
+                        aliases[mapping["from"]] = mapping["to"]
+                for page in query.get("pages", {}).values():
+                    # Continuation responses repeat every page; merge their fields
+                    pages.setdefault(page["title"], {}).update(page)
+                if "continue" not in data:
+                    break
+                cont = data["continue"]
+        except Exception as exc:
+            print(f"  Warning: Wikipedia batch fetch failed: {exc}")
+            return None
+
+        return pages, aliases
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def query_titles_async(self, titles, **params):
+        """Coroutine version of :meth:`query_titles`."""
+        unique = list(dict.fromkeys(t for t in titles if t))
+        batches = [unique[i:i + self.BATCH_SIZE] for i in range(0, len(unique), self.BATCH_SIZE)]
+        answers = await asyncio.gather(*(self._query_batch(batch, params) for batch in batches))
+        results = {}
+
+        for batch, answer in zip(batches, answers):
+            if answer is None:
+                continue   # failed batch: its titles stay unknown
+            pages, aliases = answer
+            for title in batch:
+                resolved = title
+                # Follow normalised -> redirected chains (bounded for safety)
+                for _ in range(5):
+                    if resolved not in aliases:
+                        break
+                    resolved = aliases[resolved]
+                page = pages.get(resolved)
+                if page is None or not page_exists(page):
+                    results[title] = None
+                else:
+                    results[title] = page
+
+        return results
+
+    def query_titles(self, titles, **params):
+        """Return {input title: page dict or None} for every requested title.
+
+        ``params`` are extra ``action=query`` parameters (``prop`` etc.).
+        Missing and invalid titles map to None. Titles whose batch failed
+        (network or HTTP error) are left out, so callers can tell "does not
+        exist" from "unknown" and keep what they had.
+        """
+        return self.engine.run(self.query_titles_async(titles, **params))
+
+    def fetch_pages(self, titles):
+        """Return {input title: page} with extract, image, URL and Wikidata ID."""
+        return self.query_titles(titles, **DEFAULT_PAGE_PARAMS)
+
+    async def fetch_summaries_async(self, titles):
+        """Coroutine version of :meth:`fetch_summaries`."""
+        summaries = {}
+        for title, page in (await self.query_titles_async(titles, **SUMMARY_PARAMS)).items():
+            if page is None:
+                summaries[title] = (None, None)
+            else:
+                summaries[title] = (page.get("extract") or None, page.get("thumbnail", {}).get("source"))
+        return summaries
+
+    def fetch_summaries(self, titles):
+        """Return {input title: (extract, thumbnail_url)}; (None, None) if missing.
+
+        Titles whose batch failed are left out, as in :meth:`query_titles`.
+        """
+        return self.engine.run(self.fetch_summaries_async(titles))
+
+
+class CategoryCrawler:
+    """Lazily yields the article titles in a category tree.
+
+    Follows ``cmcontinue`` page by page and descends breadth-first into
+    subcategories up to ``depth`` levels, with a visited set against cycles.
+    Namespaces are filtered server-side: only articles (and subcategories
+    when descending) are listed. Titles starting with one of ``exclude``
+    (e.g. NON_PERSON_PREFIXES) are dropped and do not count towards
+    ``limit``; titles found in several subcategories are yielded once.
+
+    With ``page_params`` (e.g. DEFAULT_PAGE_PARAMS) the crawler runs a
+    ``generator=categorymembers`` query instead and yields full page dicts:
+    members and their properties arrive together, so no second round of
+    title lookups is needed.
+
+    ``state`` is a JSON-serialisable position just after the last item
+    yielded; pass it back as ``state=`` to resume there.
+    """
+
+    def __init__(self, client, category, depth=0, limit=None, exclude=(), page_params=None,
+                 state=None):
+        self.client = client
+        self.depth = depth
+        self.limit = limit
+        self.exclude = tuple(exclude)
+        self.page_params = page_params
+        state = state or {}
+        self.queue = state.get("queue", [[category, 0]])   # [category, level]
+        self.visited = set(state.get("visited", [category]))
+        self.cmcontinue = state.get("cmcontinue")
+        self.skip = state.get("skip", 0)     # members of the current page already handled
+        self.seen = set(state.get("seen", []))
+
+    @property
+    def state(self):
+        return {
+            "queue": self.queue,
+            "visited": sorted(self.visited),
+            "cmcontinue": self.cmcontinue,
+            "skip": self.skip,
+            "seen": sorted(self.seen),
+            "count": self.count,
+            "complete": self.complete,
+        }
+
+    @property
+    def count(self):
+        return len(self.seen)
+
+    @property
+    def complete(self):
+        return not self.queue or (self.limit is not None and self.count >= self.limit)
+
+    def _params(self, category):
+        descend = self.depth > 0
+        namespaces = f"{ARTICLE_NS}|{CATEGORY_NS}" if descend else ARTICLE_NS
+        types = "page|subcat" if descend else "page"
+        if self.page_params is not None:
+            params = {
+                "action": "query",
+                "format": "json",
+                "generator": "categorymembers",
+                "gcmtitle": f"Category:{category}",
+                "gcmlimit": self.client.BATCH_SIZE,
+                "gcmnamespace": namespaces,
+                "gcmtype": types,
+                **self.page_params,
+            }
+            if self.cmcontinue:
+                params["gcmcontinue"] = self.cmcontinue
+            return params
+
+        params = {
+            "action": "query",
+            "format": "json",
+            "list": "categorymembers",
+            "cmtitle": f"Category:{category}",
+            "cmlimit": "max",
+            "cmnamespace": namespaces,
+            "cmtype": types,
+        }
+        if self.cmcontinue:
+            params["cmcontinue"] = self.cmcontinue
+        return params
+
+    async def _fetch(self, category):
+        """Return (members, next continuation token) for the current page."""
+        params = self._params(category)
+        if self.page_params is None:
+            data = await self.client._get(params)
+            members = data.get("query", {}).get("categorymembers", [])
+            return members, data.get("continue", {}).get("cmcontinue")
+
+        # Generator mode: property modules (extracts are capped at 20 pages
+        # per call) may need several continuations before the batch is whole
+        pages = {}
+        cont = {}
+        while True:
+            data = await self.client._get({**params, **cont})
+            for page in data.get("query", {}).get("pages", {}).values():
+                pages.setdefault(page["title"], {}).update(page)
+            cont = data.get("continue", {})
+            if not set(cont) - {"continue", "gcmcontinue"}:
+                return list(pages.values()), cont.get("gcmcontinue")
+
+    def __iter__(self):
+        while not self.complete:
+            category, level = self.queue[0]
+            members, next_continue = self.client.engine.run(self._fetch(category))
+
+            for i, member in enumerate(members[self.skip:], self.skip):
+                if self.limit is not None and self.count >= self.limit:
+                    return
+                self.skip = i + 1
+                title = member["title"]
+                if member.get("ns") == CATEGORY_NS:
+                    subcategory = title.split(":", 1)[-1]
+                    if level < self.depth and subcategory not in self.visited:
+                        self.visited.add(subcategory)
+                        self.queue.append([subcategory, level + 1])
+                elif title not in self.seen and not title.startswith(self.exclude):
+                    self.seen.add(title)
+                    yield title if self.page_params is None else member
+
+            # Page finished: move to the next page or the next category
+            self.skip = 0
+            self.cmcontinue = next_continue
+            if not self.cmcontinue:
+                self.queue.pop(0)